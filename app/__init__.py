@@ -5,9 +5,13 @@ from flask_login import LoginManager
 from dotenv import load_dotenv
 import os
 import json
-import markdown
 from datetime import datetime
 from markupsafe import Markup
+from app.jobs import JobQueue
+from app.ai.cache import LLMCache
+from app.ai.client import AIClient
+from app.rendering import MarkdownRenderer
+from app.querycount import QueryCounter
 
 # Load environment variables from .env file
 load_dotenv()
@@ -16,6 +20,11 @@ db = SQLAlchemy()
 login_manager = LoginManager()
 login_manager.login_view = 'auth.login'
 login_manager.login_message_category = 'info'
+job_queue = JobQueue()
+llm_cache = LLMCache()
+ai_client = AIClient()
+markdown_renderer = MarkdownRenderer()
+query_counter = QueryCounter()
 
 def format_datetime(value):
     return value.strftime('%B %d, %Y')
@@ -25,14 +34,20 @@ def create_app(config_class=Config):
     app.config.from_object(config_class)
     app.jinja_env.filters['format_datetime'] = format_datetime
 
-    db.init_app(app)
+    from app.database import init_database
+    init_database(app)  # engine options and SQLite pragmas for the configured backend
     login_manager.init_app(app)
+    job_queue.init_app(app)
+    llm_cache.init_app(app)
+    ai_client.init_app(app)
+    markdown_renderer.init_app(app)
+    query_counter.init_app(app)
 
-    from app.models import User # Import User model for user_loader
+    from app.profile.context import load_user as load_user_with_profile
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return load_user_with_profile(user_id)
 
     # Custom Jinja2 filter for parsing JSON strings
     @app.template_filter('from_json')
@@ -47,7 +62,7 @@ def create_app(config_class=Config):
     # Custom Jinja2 filter for rendering Markdown to HTML
     @app.template_filter('markdown')
     def markdown_filter(text):
-        return Markup(markdown.markdown(text))
+        return Markup(markdown_renderer.render(text))
 
     # Add current_time to all templates
     @app.context_processor
@@ -67,7 +82,9 @@ def create_app(config_class=Config):
     from app.main import bp as main_bp
     app.register_blueprint(main_bp)
 
+    from app.schema import init_migrations
+    init_migrations(app, db)  # `flask db-upgrade`; SQLite databases also upgrade on startup
     with app.app_context():
-        db.create_all()  # Create database tables for the first time if they don't exist
+        job_queue.fail_stale_jobs()  # jobs whose worker went away never finish
 
     return app
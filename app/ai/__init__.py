@@ -0,0 +1,14 @@
+def response_text(response):
+    """Return the text of a Gemini response, falling back to candidate parts."""
+    text = (getattr(response, 'text', None) or '').strip()
+    if not text and getattr(response, 'candidates', None):
+        parts = []
+        try:
+            for cand in response.candidates:
+                for part in getattr(cand.content, 'parts', []) or []:
+                    if hasattr(part, 'text') and part.text:
+                        parts.append(part.text)
+        except Exception:
+            pass
+        text = "\n".join(parts).strip()
+    return text
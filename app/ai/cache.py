@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class LLMCache:
+    """Content-addressed cache for model responses, stored in a SQLite file.
+
+    Entries are keyed on a hash of (model name, generation config, prompt), so
+    byte-identical requests are served without calling the model. The file is
+    shared by every gunicorn worker on the box. Entries expire after
+    LLM_CACHE_TTL seconds and the least recently used ones are evicted once the
+    cache holds more than LLM_CACHE_MAX_ENTRIES rows. Hit/miss counters are
+    kept both per process and as shared totals in the cache file.
+    """
+
+    def __init__(self, app=None):
+        self.path = None
+        self.enabled = False
+        self.ttl = 0
+        self.max_entries = 0
+        self.hits = 0
+        self.misses = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LLM_CACHE_ENABLED', True)
+        app.config.setdefault('LLM_CACHE_PATH', os.path.join(app.instance_path, 'llm_cache.db'))
+        app.config.setdefault('LLM_CACHE_TTL', 7 * 24 * 3600)
+        app.config.setdefault('LLM_CACHE_MAX_ENTRIES', 5000)
+        self.enabled = bool(app.config['LLM_CACHE_ENABLED'])
+        self.path = app.config['LLM_CACHE_PATH']
+        self.ttl = int(app.config['LLM_CACHE_TTL'])
+        self.max_entries = int(app.config['LLM_CACHE_MAX_ENTRIES'])
+        app.extensions['llm_cache'] = self
+        if self.enabled:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._init_schema()
+
+        @app.cli.command('llm-cache-stats')
+        def llm_cache_stats_command():
+            """Print LLM response cache hit/miss counters."""
+            print(json.dumps(self.stats(), indent=2))
+
+        @app.cli.command('llm-cache-clear')
+        def llm_cache_clear_command():
+            """Remove every cached LLM response."""
+            self.clear()
+            print('LLM cache cleared.')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS llm_cache ('
+            ' key TEXT PRIMARY KEY, model TEXT, value TEXT NOT NULL,'
+            ' created_at REAL NOT NULL, accessed_at REAL NOT NULL)'
+        )
+        conn.execute('CREATE INDEX IF NOT EXISTS ix_llm_cache_accessed_at ON llm_cache (accessed_at)')
+        conn.execute('CREATE TABLE IF NOT EXISTS llm_cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        conn.execute("INSERT OR IGNORE INTO llm_cache_stats (name, value) VALUES ('hits', 0), ('misses', 0)")
+
+    @staticmethod
+    def make_key(model_name, generation_config, prompt):
+        payload = json.dumps(
+            [model_name, generation_config or {}, prompt],
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _count(self, conn, name):
+        with self._lock:
+            if name == 'hits':
+                self.hits += 1
+            else:
+                self.misses += 1
+        conn.execute('UPDATE llm_cache_stats SET value = value + 1 WHERE name = ?', (name,))
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        try:
+            conn = self._connect()
+            now = time.time()
+            row = conn.execute('SELECT value, created_at FROM llm_cache WHERE key = ?', (key,)).fetchone()
+            if row and (not self.ttl or now - row[1] <= self.ttl):
+                conn.execute('UPDATE llm_cache SET accessed_at = ? WHERE key = ?', (now, key))
+                self._count(conn, 'hits')
+                return row[0]
+            if row:
+                conn.execute('DELETE FROM llm_cache WHERE key = ?', (key,))
+            self._count(conn, 'misses')
+        except sqlite3.Error as e:
+            print('Warning: LLM cache read failed:', e)
+        return None
+
+    def set(self, key, value, model_name=None):
+        if not self.enabled or not value:
+            return
+        try:
+            conn = self._connect()
+            now = time.time()
+            conn.execute(
+                'INSERT OR REPLACE INTO llm_cache (key, model, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                (key, model_name, value, now, now)
+            )
+            self._evict(conn)
+        except sqlite3.Error as e:
+            print('Warning: LLM cache write failed:', e)
+
+    def _evict(self, conn):
+        if self.ttl:
+            conn.execute('DELETE FROM llm_cache WHERE created_at < ?', (time.time() - self.ttl,))
+        if self.max_entries:
+            conn.execute(
+                'DELETE FROM llm_cache WHERE key IN ('
+                ' SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        if not self.enabled:
+            return
+        conn = self._connect()
+        conn.execute('DELETE FROM llm_cache')
+        conn.execute('UPDATE llm_cache_stats SET value = 0')
+
+    def stats(self):
+        data = {'enabled': self.enabled, 'process_hits': self.hits, 'process_misses': self.misses}
+        if not self.enabled:
+            return data
+        conn = self._connect()
+        totals = dict(conn.execute('SELECT name, value FROM llm_cache_stats').fetchall())
+        data['hits'] = totals.get('hits', 0)
+        data['misses'] = totals.get('misses', 0)
+        data['entries'] = conn.execute('SELECT COUNT(*) FROM llm_cache').fetchone()[0]
+        lookups = data['hits'] + data['misses']
+        data['hit_rate'] = round(data['hits'] / lookups, 3) if lookups else 0.0
+        return data
@@ -0,0 +1,291 @@
+import json
+import random
+import threading
+import time
+
+from app.ai import response_text
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Thread-safe token bucket; `acquire` blocks until a token is available."""
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = max(float(rate_per_minute), 0.0) / 60.0
+        self.capacity = float(burst or max(1, int(rate_per_minute // 6) or 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class FakeModel:
+    """Offline stand-in for genai.GenerativeModel used by the `fake` backend.
+
+    `responder(prompt, generation_config)` returns the reply text; the default
+    returns `{}` for JSON requests and a fixed sentence otherwise.
+    """
+
+    def __init__(self, model_name, generation_config=None, responder=None):
+        self.model_name = model_name
+        self.generation_config = generation_config or {}
+        self.responder = responder or self.default_responder
+        self.calls = []
+
+    @staticmethod
+    def default_responder(prompt, generation_config):
+        if (generation_config or {}).get('response_mime_type') == 'application/json':
+            return '{}'
+        return 'This is a placeholder reply from the local AI backend.'
+
+    def generate_content(self, contents, generation_config=None, stream=False, **kwargs):
+        config = dict(self.generation_config, **(generation_config or {}))
+        self.calls.append((contents, config))
+        text = self.responder(contents, config)
+        if stream:
+            return iter(_FakeResponse(word) for word in _split_keep_spaces(text))
+        return _FakeResponse(text)
+
+
+class _FakeResponse:
+    def __init__(self, text):
+        self.text = text
+        self.candidates = []
+
+
+def _split_keep_spaces(text):
+    pieces = []
+    buf = ''
+    for ch in text:
+        buf += ch
+        if ch == ' ':
+            pieces.append(buf)
+            buf = ''
+    if buf:
+        pieces.append(buf)
+    return pieces
+
+
+def _is_retryable(exc):
+    code = getattr(exc, 'code', None)
+    if callable(code):
+        try:
+            code = code()
+        except Exception:
+            code = None
+    if isinstance(code, int) and code in RETRYABLE_STATUS_CODES:
+        return True
+    try:
+        from google.api_core import exceptions as gexc
+    except ImportError:
+        return False
+    return isinstance(exc, (
+        gexc.TooManyRequests, gexc.ResourceExhausted, gexc.InternalServerError,
+        gexc.BadGateway, gexc.ServiceUnavailable, gexc.GatewayTimeout, gexc.DeadlineExceeded,
+    ))
+
+
+class AIClient:
+    """Process-wide owner of Gemini models and outbound call policy.
+
+    Model instances are built once per (model name, generation config) and
+    reused. Every call passes through a concurrency semaphore
+    (AI_MAX_CONCURRENCY) and a token-bucket rate limiter (AI_RATE_PER_MINUTE),
+    is retried with exponential backoff on 429/5xx, and is served from the
+    shared LLM cache when possible. AI_BACKEND=fake swaps in FakeModel so the
+    app and its tests run without network access or an API key.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.api_key = None
+        self.default_model = 'gemini-1.5-flash'
+        self.max_retries = 3
+        self.retry_base_delay = 1.0
+        self.fake_responder = None
+        self._models = {}
+        self._models_lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(4)
+        self._bucket = TokenBucket(0)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('GEMINI_API_KEY', None)
+        app.config.setdefault('GEMINI_MODEL', 'gemini-1.5-flash')
+        app.config.setdefault('AI_BACKEND', 'gemini')
+        app.config.setdefault('AI_MAX_CONCURRENCY', 8)
+        app.config.setdefault('AI_RATE_PER_MINUTE', 60)
+        app.config.setdefault('AI_RATE_BURST', None)
+        app.config.setdefault('AI_MAX_RETRIES', 3)
+        app.config.setdefault('AI_RETRY_BASE_DELAY', 1.0)
+        app.extensions['ai_client'] = self
+
+        self.api_key = app.config['GEMINI_API_KEY']
+        self.default_model = app.config['GEMINI_MODEL']
+        self.max_retries = int(app.config['AI_MAX_RETRIES'])
+        self.retry_base_delay = float(app.config['AI_RETRY_BASE_DELAY'])
+        self._semaphore = threading.BoundedSemaphore(int(app.config['AI_MAX_CONCURRENCY']))
+        self._bucket = TokenBucket(app.config['AI_RATE_PER_MINUTE'], app.config['AI_RATE_BURST'])
+        self._models = {}
+
+        backend = (app.config['AI_BACKEND'] or 'gemini').lower()
+        if backend == 'fake':
+            self.backend = 'fake'
+        elif self.api_key:
+            import google.generativeai as genai
+            genai.configure(api_key=self.api_key)
+            self.backend = 'gemini'
+        else:
+            print("GEMINI_API_KEY not found. AI features will be limited.")
+            self.backend = None
+
+    def use_fake(self, responder=None):
+        """Switch to the offline FakeModel backend (for tests and local runs)."""
+        self.backend = 'fake'
+        self.fake_responder = responder
+        self._models = {}
+
+    @property
+    def available(self):
+        return self.backend is not None
+
+    @staticmethod
+    def _config_key(generation_config):
+        return json.dumps(generation_config or {}, sort_keys=True, default=str)
+
+    def get_model(self, generation_config=None, model_name=None):
+        """Return the shared model instance for (model name, generation config)."""
+        if not self.available:
+            return None
+        model_name = model_name or self.default_model
+        key = (model_name, self._config_key(generation_config))
+        model = self._models.get(key)
+        if model is None:
+            with self._models_lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = self._build_model(model_name, generation_config)
+                    self._models[key] = model
+        return model
+
+    def _build_model(self, model_name, generation_config):
+        if self.backend == 'fake':
+            return FakeModel(model_name, generation_config, self.fake_responder)
+        import google.generativeai as genai
+        try:
+            return genai.GenerativeModel(model_name, generation_config=generation_config or None)
+        except TypeError:
+            # Older SDKs may not support generation_config in constructor
+            return genai.GenerativeModel(model_name)
+
+    def _backoff_delay(self, attempt):
+        delay = self.retry_base_delay * (2 ** attempt)
+        return delay + random.uniform(0, delay / 2)
+
+    def _with_retries(self, call):
+        attempt = 0
+        while True:
+            self._bucket.acquire()
+            try:
+                with self._semaphore:
+                    return call()
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = self._backoff_delay(attempt)
+                print(f"Gemini call failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+
+    def generate_text(self, prompt, generation_config=None, model_name=None, use_cache=True, cache_if=None):
+        """Return the reply text for `prompt`, using the shared LLM cache.
+
+        Empty replies are never cached, nor replies rejected by the optional
+        `cache_if(text)` predicate (e.g. output that fails to parse as JSON).
+        Raises RuntimeError when no backend is configured; model errors
+        propagate once retries are exhausted.
+        """
+        from app import llm_cache
+
+        model = self.get_model(generation_config, model_name)
+        if model is None:
+            raise RuntimeError('AI features are not configured. Please set GEMINI_API_KEY.')
+        model_name = model_name or self.default_model
+
+        key = llm_cache.make_key(model_name, generation_config, prompt) if use_cache else None
+        if key:
+            cached = llm_cache.get(key)
+            if cached is not None:
+                return cached
+
+        text = response_text(self._with_retries(lambda: model.generate_content(prompt)))
+
+        if key and text and (cache_if is None or cache_if(text)):
+            llm_cache.set(key, text, model_name=model_name)
+        return text
+
+    def stream_text(self, prompt, generation_config=None, model_name=None, use_cache=True):
+        """Yield reply text chunks, serving the whole reply at once on a cache hit.
+
+        Retries apply only until the first chunk arrives; the concurrency slot
+        is held while the stream is open and released during backoff.
+        """
+        from app import llm_cache
+
+        model = self.get_model(generation_config, model_name)
+        if model is None:
+            raise RuntimeError('AI features are not configured. Please set GEMINI_API_KEY.')
+        model_name = model_name or self.default_model
+
+        key = llm_cache.make_key(model_name, generation_config, prompt) if use_cache else None
+        if key:
+            cached = llm_cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        parts = []
+        attempt = 0
+        while True:
+            self._bucket.acquire()
+            self._semaphore.acquire()
+            try:
+                for chunk in model.generate_content(prompt, stream=True):
+                    piece = getattr(chunk, 'text', None) or ''
+                    if piece:
+                        parts.append(piece)
+                        yield piece
+                break
+            except Exception as e:
+                if parts or attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                error = e
+            finally:
+                self._semaphore.release()
+            # Back off without holding a concurrency slot
+            delay = self._backoff_delay(attempt)
+            print(f"Gemini stream failed ({error}); retrying in {delay:.1f}s")
+            time.sleep(delay)
+            attempt += 1
+
+        text = ''.join(parts).strip()
+        if key and text:
+            llm_cache.set(key, text, model_name=model_name)
@@ -0,0 +1,171 @@
+import json
+import re
+
+_TRAILING_COMMA = re.compile(r',\s*([\]}])')
+
+
+class JsonStreamParser:
+    """Incremental parser for model output holding one top-level JSON array or object.
+
+    `feed` accepts the text in one piece or in chunks and returns the
+    top-level members completed by that call: each array element as
+    `(None, value)` and each object field as `(key, value)`. Every character is
+    scanned once and each member is decoded once, so cost is linear in the
+    output size. Text before the first `[`/`{` is skipped, a stray trailing
+    comma inside a member is tolerated, and on a truncated reply `result`
+    still holds every member that closed before the cut. `end` is the offset
+    just past the closing bracket once the container is complete.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.pos = 0
+        self.container = None  # '[' or '{' once the top level has opened
+        self.complete = False
+        self.end = None
+        self.items = []
+        self.fields = {}
+        self._depth = 0
+        self._in_str = False
+        self._esc = False
+        self._member_start = None
+        self._key = None
+        self._key_start = None
+
+    @property
+    def result(self):
+        if self.container == '[':
+            return self.items
+        if self.container == '{':
+            return self.fields
+        return None
+
+    def feed(self, chunk):
+        self.buffer += chunk or ''
+        completed = []
+        buf = self.buffer
+        i = self.pos
+        n = len(buf)
+        while i < n and not self.complete:
+            ch = buf[i]
+            if self.container is None:
+                if ch in '[{':
+                    self.container = ch
+                    self._depth = 1
+                i += 1
+                continue
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == '\\':
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                    if self._depth == 1 and self.container == '{' and self._key is None and self._member_start is None:
+                        self._key = json.loads(buf[self._key_start:i + 1])
+                i += 1
+                continue
+            if ch == '"':
+                self._in_str = True
+                if self._depth == 1 and self.container == '{' and self._key is None and self._member_start is None:
+                    self._key_start = i
+                elif self._depth == 1 and self._member_start is None:
+                    self._member_start = i
+            elif self._depth == 1 and ch in ',]}':
+                self._close_member(buf, i, completed)
+                if ch != ',':
+                    self.complete = True
+                    self.end = i + 1
+            elif ch in '[{':
+                if self._depth == 1 and self._member_start is None:
+                    self._member_start = i
+                self._depth += 1
+            elif ch in ']}':
+                self._depth -= 1
+                if self._depth == 1:
+                    # A nested array/object member is complete as soon as it closes
+                    self._close_member(buf, i + 1, completed)
+            elif ch == ':' and self._depth == 1:
+                pass
+            elif self._depth == 1 and self._member_start is None and not ch.isspace():
+                if self.container == '[' or self._key is not None:
+                    self._member_start = i
+            i += 1
+        self.pos = i
+        return completed
+
+    def _close_member(self, buf, end, completed):
+        start = self._member_start
+        key = self._key
+        self._member_start = None
+        self._key = None
+        if start is None:
+            return
+        value = self._decode(buf[start:end].strip())
+        if value is _INVALID:
+            return
+        if self.container == '[':
+            self.items.append(value)
+        else:
+            self.fields[key] = value
+        completed.append((key, value))
+
+    @staticmethod
+    def _decode(fragment):
+        try:
+            return json.loads(fragment)
+        except ValueError:
+            pass
+        try:
+            return json.loads(_TRAILING_COMMA.sub(r'\1', fragment))
+        except ValueError:
+            return _INVALID
+
+
+_INVALID = object()
+
+
+_OPEN_RE = re.compile(r'[\[{]')
+
+
+def parse_json_text(text, allow_partial=True, expect=None):
+    """Parse the top-level JSON array/object in a model reply.
+
+    Returns a list or dict, or None when none was found. Bracketed prose
+    before the JSON ("the plan [as requested]:", "(see {below})") decodes to
+    nothing and is skipped, as is a container that is not an `expect`
+    instance (list, dict or a tuple of them); scanning resumes after it, never
+    inside it. Prose with a bracket that never closes ("Result [see below:")
+    is retried from the next opening bracket. A literal `[]`/`{}` is returned
+    only when nothing better follows. A truncated reply yields the members
+    that completed unless `allow_partial` is False.
+    """
+    text = text or ''
+    empty = partial = None
+    match = _OPEN_RE.search(text)
+    while match:
+        start = match.start()
+        parser = JsonStreamParser()
+        parser.feed(text[start:])
+        result = parser.result
+        if not parser.complete:
+            if result:
+                # Truncated JSON: its members decoded, and it runs to the end of the reply
+                if allow_partial and (expect is None or isinstance(result, expect)):
+                    return result
+                break
+            # Nothing decoded: an unclosed bracket in prose, or JSON cut before its first member
+            if partial is None and (expect is None or isinstance(result, expect)):
+                partial = result
+            match = _OPEN_RE.search(text, start + 1)
+            continue
+        end = start + parser.end
+        if expect is None or isinstance(result, expect):
+            if result:
+                return result
+            if empty is None and not text[start + 1:end - 1].strip():
+                empty = result
+        match = _OPEN_RE.search(text, end)
+    if empty is None and allow_partial:
+        return partial
+    return empty
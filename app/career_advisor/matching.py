@@ -0,0 +1,132 @@
+"""Local keyword matching between a resume and a job description.
+
+A small BM25 index over resume bullets ranks them against the job description
+without a model call, and a keyword coverage report shows which of the job's
+keywords the resume already mentions. Tailoring uses both to send the model
+only the bullets worth rewriting. A resume has tens of bullets, so plain
+dicts are plenty; no vector library is needed.
+"""
+
+import math
+import re
+from collections import Counter
+
+STOPWORDS = set("""
+a about above across after all also an and any are as at be been being both but by can could do does
+during each either etc for from has have having how if in into is it its may more most must not of on
+one or other our ours out over own per plus should so some such than that the their them then there
+these they this those through to under up us using via was we were what when where which while who will
+with within without would you your role team teams work working ability able strong good great excellent
+including include includes new join looking candidate candidates company position job years year
+responsibilities requirements required preferred qualifications skills skill experience knowledge
+understanding e.g i.e well day days based related relevant bonus nice familiarity love loves passionate
+""".split())
+
+TOKEN_RE = re.compile(r"[A-Za-z][A-Za-z0-9+#.\-/]*[A-Za-z0-9+#]|[A-Za-z]")
+
+# Sections whose lines are individual achievements worth rewriting
+BULLET_SECTIONS = ('experience', 'projects', 'activities')
+
+
+def tokenize(text):
+    """Lower-cased content tokens; keeps tech names like c++, node.js and ci/cd intact."""
+    tokens = []
+    for token in TOKEN_RE.findall(text or ''):
+        key = token.lower().rstrip('.')
+        if len(key) >= 2 and key not in STOPWORDS:
+            tokens.append(key)
+    return tokens
+
+
+def rank_keywords(text, limit=40):
+    """Most prominent terms of a job description as (key, display form), best first."""
+    counts = Counter()
+    display = {}
+    for token in TOKEN_RE.findall(text or ''):
+        key = token.lower().rstrip('.')
+        if len(key) < 2 or key in STOPWORDS:
+            continue
+        # Tool and technology names (Python, C++, Node.js, AWS) count extra
+        weight = 2 if (token[0].isupper() or any(ch in token for ch in '+#./') or token.isupper()) else 1
+        counts[key] += weight
+        display.setdefault(key, token.rstrip('.'))
+    return [(k, display[k]) for k, _ in counts.most_common(limit)]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of documents."""
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.docs = [Counter(tokenize(d)) for d in documents]
+        self.lengths = [sum(d.values()) for d in self.docs]
+        self.avgdl = (sum(self.lengths) / len(self.docs)) if self.docs else 0.0
+        df = Counter()
+        for doc in self.docs:
+            df.update(doc.keys())
+        n = len(self.docs)
+        self.idf = {term: math.log(1 + (n - f + 0.5) / (f + 0.5)) for term, f in df.items()}
+
+    def scores(self, query):
+        """BM25 score of every document for `query` (text), in document order."""
+        terms = Counter(tokenize(query))
+        results = []
+        for doc, length in zip(self.docs, self.lengths):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * length / (self.avgdl or 1))
+            for term, qtf in terms.items():
+                tf = doc.get(term)
+                if tf:
+                    score += self.idf[term] * tf * (self.k1 + 1) / (tf + norm) * qtf
+            results.append(score)
+        return results
+
+
+def resume_bullets(sections):
+    """(section name, text) for each bullet in the rewritable sections."""
+    bullets = []
+    for name in BULLET_SECTIONS:
+        body = sections.get(name)
+        if not body:
+            continue
+        for line in body.split('\n'):
+            line = line[2:] if line.startswith('- ') else line
+            line = line.strip()
+            # Role/date header lines are short; achievements are sentences
+            if len(line) >= 40:
+                bullets.append((name, line))
+    return bullets
+
+
+def keyword_coverage(sections, job_description, limit=30):
+    """ATS-style report: which of the job's top keywords the resume mentions."""
+    keywords = rank_keywords(job_description, limit)
+    resume_text = '\n'.join(sections.values()).lower()
+    resume_tokens = set(tokenize(resume_text))
+    matched, missing = [], []
+    for key, label in keywords:
+        # Names with punctuation (ci/cd, node.js) may be split differently in the resume
+        found = key in resume_tokens or (not key.isalnum() and key in resume_text)
+        (matched if found else missing).append(label)
+    total = len(keywords)
+    return {
+        'score': round(100 * len(matched) / total) if total else 0,
+        'matched': matched,
+        'missing': missing,
+    }
+
+
+def select_bullets(sections, job_description, top_k=8):
+    """The `top_k` bullets most relevant to the job, as {'section', 'text', 'score'}.
+
+    These are the ones worth rewriting toward the job's wording; bullets with
+    no overlap at all are left alone.
+    """
+    bullets = resume_bullets(sections)
+    if not bullets:
+        return []
+    index = BM25Index([text for _, text in bullets])
+    scored = sorted(zip(bullets, index.scores(job_description)), key=lambda pair: pair[1], reverse=True)
+    return [{'section': name, 'text': text, 'score': round(score, 3)}
+            for (name, text), score in scored[:top_k] if score > 0]
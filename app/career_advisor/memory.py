@@ -0,0 +1,220 @@
+import re
+
+from flask import current_app
+from app import db, ai_client, job_queue
+from app.models import ChatSession, ChatMessage
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough heuristic (~4 characters per token) that avoids a tokenizer round trip
+    return len(text or '') // 4 + 1
+
+
+def _format_line(message) -> str:
+    role = 'User' if message.sender == 'user' else 'AI'
+    return f"{role}: {message.content}"
+
+
+def recent_messages(chat_session, limit=None):
+    """Return the newest `limit` messages of a session, oldest first."""
+    if limit is None:
+        limit = current_app.config['CHAT_MEMORY_TURNS'] * 2
+    rows = (ChatMessage.query
+            .filter_by(session_id=chat_session.id)
+            .order_by(ChatMessage.id.desc())
+            .limit(limit)
+            .all())
+    rows.reverse()
+    return rows
+
+
+def load_turn_history(chat_session):
+    """Messages a chat turn needs, loaded once: (newest messages oldest first, has_more).
+
+    Covers the verbatim window plus CHAT_SUMMARY_BATCH older messages, which
+    is enough for both `build_history_block` and `schedule_summary_update`.
+    When the summary lags further behind (its refresh is still queued or
+    failed), the older messages it does not cover yet are loaded as well, so
+    the prompt never loses them.
+    """
+    if not chat_session or not getattr(chat_session, 'id', None):
+        return [], False
+    config = current_app.config
+    limit = config['CHAT_MEMORY_TURNS'] * 2 + config['CHAT_SUMMARY_BATCH']
+    messages = recent_messages(chat_session, limit)
+    has_more = len(messages) == limit
+    summarized = chat_session.summarized_through_id or 0
+    if has_more and messages[0].id > summarized:
+        older = (ChatMessage.query
+                 .filter(ChatMessage.session_id == chat_session.id,
+                         ChatMessage.id > summarized,
+                         ChatMessage.id < messages[0].id)
+                 .order_by(ChatMessage.id.desc())
+                 .limit(limit)
+                 .all())
+        older.reverse()
+        messages = older + messages
+    return messages, has_more
+
+
+_SENTENCE_END_RE = re.compile(r'[.!?]["\')\]]?\s+')
+
+
+def _truncate_summary(summary, max_chars):
+    """The end of `summary` within `max_chars`, starting at a sentence (or at least a word) boundary."""
+    if len(summary) <= max_chars:
+        return summary
+    tail = summary[-max_chars:]
+    match = _SENTENCE_END_RE.search(tail)
+    if match and match.end() < len(tail):
+        return tail[match.end():]
+    space = tail.find(' ')
+    return tail[space + 1:] if 0 <= space < len(tail) - 1 else tail
+
+
+def build_history_block(chat_session, messages=None) -> str:
+    """Return the conversation context for the next prompt.
+
+    Consists of the running summary of older turns plus every message the
+    summary does not cover yet (at least the last CHAT_MEMORY_TURNS turns)
+    verbatim, trimmed from the oldest side so the whole block stays within
+    CHAT_HISTORY_TOKEN_BUDGET. Cost is constant in the length of the
+    session. Pass `messages` (oldest first, from `load_turn_history`) when
+    they are already loaded.
+    """
+    if not chat_session or not getattr(chat_session, 'id', None):
+        return ''
+    budget = current_app.config['CHAT_HISTORY_TOKEN_BUDGET']
+
+    summary = (chat_session.history_summary or '').strip()
+    if summary:
+        summary = _truncate_summary(summary, (budget // 3) * 4)
+        budget -= estimate_tokens(summary)
+
+    if messages is None:
+        messages, _ = load_turn_history(chat_session)
+    summarized = chat_session.summarized_through_id or 0
+    messages = [m for m in messages if m.id > summarized]
+
+    lines = []
+    for message in reversed(messages):
+        line = _format_line(message)
+        cost = estimate_tokens(line)
+        if cost > budget:
+            break
+        lines.append(line)
+        budget -= cost
+    lines.reverse()
+
+    parts = []
+    if summary:
+        parts.append(f"Summary of earlier conversation: {summary}")
+    parts.extend(lines)
+    return "\n".join(parts)
+
+
+# Longest message text a summary refresh sends; together with CHAT_SUMMARY_MAX_MESSAGES this bounds its prompt
+SUMMARY_LINE_CHARS = 1000
+
+
+def _summarize(previous_summary: str, lines: list[str]) -> str:
+    prompt = (
+        "You maintain a running summary of a career-advice chat. Update the summary with the new messages below. "
+        "Keep the user's goals, background, constraints, decisions and any proposed plan (goal, duration, modules). "
+        "Plain text, at most 120 words, no preamble.\n\n"
+        f"Current summary:\n{previous_summary or '(none)'}\n\n"
+        "New messages:\n" + "\n".join(lines) + "\n\nUpdated summary:"
+    )
+    return ai_client.generate_text(prompt, {"max_output_tokens": 256, "temperature": 0.2})
+
+
+def summarize_session(session_id):
+    """Fold the oldest messages that have left the verbatim window into the running summary.
+
+    At most CHAT_SUMMARY_MAX_MESSAGES per run, so a long backlog (e.g. a
+    session from before summaries existed) is caught up over several runs
+    rather than sent in one prompt.
+    """
+    chat_session = ChatSession.query.get(session_id)
+    if not chat_session or not ai_client.available:
+        return
+    window = recent_messages(chat_session)
+    if not window:
+        return
+    pending = (ChatMessage.query
+               .filter(ChatMessage.session_id == session_id,
+                       ChatMessage.id > (chat_session.summarized_through_id or 0),
+                       ChatMessage.id < window[0].id)
+               .order_by(ChatMessage.id.asc())
+               .limit(current_app.config['CHAT_SUMMARY_MAX_MESSAGES'])
+               .all())
+    if not pending:
+        return
+    previous, through_id = chat_session.history_summary, pending[-1].id
+    lines = [_format_line(m)[:SUMMARY_LINE_CHARS] for m in pending]
+    db.session.commit()  # no connection held while the model summarizes
+    summary = _summarize(previous, lines)
+    if not summary:
+        raise RuntimeError('Model returned an empty summary')
+    (ChatSession.query
+     .filter_by(id=session_id)
+     .update({'history_summary': summary.strip(), 'summarized_through_id': through_id},
+             synchronize_session=False))
+    db.session.commit()
+
+
+def _queue_summary(chat_session):
+    # One refresh at a time per session; a later turn queues the next batch
+    job_queue.submit('summarize_chat', summarize_session, chat_session.id, user_id=chat_session.user_id,
+                     ref=f'chat_session:{chat_session.id}', once=True)
+
+
+def _summary_due(chat_session, message_ids, has_more):
+    """Decide from already-loaded ids; None when they do not reach back far enough."""
+    config = current_app.config
+    older = message_ids[:-config['CHAT_MEMORY_TURNS'] * 2]
+    summarized = chat_session.summarized_through_id or 0
+    pending = [i for i in older if i > summarized]
+    if len(pending) >= config['CHAT_SUMMARY_BATCH']:
+        return True
+    if not has_more or len(pending) < len(older):
+        # Everything older than what was loaded is already summarized
+        return False
+    return None
+
+
+def schedule_summary_update(chat_session, message_ids=None, has_more=True):
+    """Queue a summary refresh once enough messages have left the verbatim window.
+
+    Summaries are refreshed in batches of CHAT_SUMMARY_BATCH messages on the
+    background job queue, so the chat turn itself never waits on it, and no
+    refresh is queued while one for the session is still pending.
+    `message_ids` may list the session's newest message ids (oldest first,
+    e.g. from `load_turn_history` plus the new turn); the decision then
+    needs no queries.
+    """
+    if not ai_client.available:
+        return
+    if message_ids is not None:
+        due = _summary_due(chat_session, message_ids, has_more)
+        if due is not None:
+            if due:
+                _queue_summary(chat_session)
+            return
+    config = current_app.config
+    window_start = (ChatMessage.query
+                    .with_entities(ChatMessage.id)
+                    .filter_by(session_id=chat_session.id)
+                    .order_by(ChatMessage.id.desc())
+                    .offset(config['CHAT_MEMORY_TURNS'] * 2 - 1)
+                    .limit(1)
+                    .scalar())
+    if window_start is None:
+        return
+    pending = (ChatMessage.query
+               .filter(ChatMessage.session_id == chat_session.id,
+                       ChatMessage.id > (chat_session.summarized_through_id or 0),
+                       ChatMessage.id < window_start)
+               .count())
+    if pending >= config['CHAT_SUMMARY_BATCH']:
+        _queue_summary(chat_session)
@@ -0,0 +1,161 @@
+from datetime import datetime, timedelta
+from app import db
+from sqlalchemy import func
+from sqlalchemy.orm import contains_eager
+from app.models import CareerPlan, DailyTask
+
+# Upper bound on task updates accepted in one batch request
+MAX_TASK_BATCH = 100
+
+
+def save_career_plan(user_id, career_goal, plan_data, chat_session=None, commit=True):
+    """Replace the user's active plan with a new one in a single transaction.
+
+    Deactivates the current plan, inserts the new CareerPlan, bulk-inserts its
+    DailyTasks and flags the originating chat session, committing once. On any
+    error the transaction is rolled back, so the previous plan stays active.
+    Anything else already added to the session (e.g. a chat note) commits with it.
+    With `commit=False` the changes are only flushed and the caller commits.
+    """
+    now = datetime.utcnow()
+    try:
+        if chat_session is not None:
+            # Set first, so it is flushed with the caller's pending changes rather than on its own
+            chat_session.has_career_plan = True
+        CareerPlan.query.filter_by(user_id=user_id, is_active=True).update(
+            {'is_active': False, 'last_updated': now}, synchronize_session=False
+        )
+        plan = CareerPlan(
+            user_id=user_id,
+            career_goal=career_goal,
+            created_date=now,
+            last_updated=now,
+            is_active=True,
+            total_tasks=len(plan_data),
+            next_due_day=min((t['day'] for t in plan_data), default=None),
+        )
+        db.session.add(plan)
+        db.session.flush()  # assigns plan.id without committing
+
+        db.session.bulk_insert_mappings(DailyTask, [
+            {
+                'career_plan_id': plan.id,
+                'day_number': day_task['day'],
+                'task_description': day_task['task'],
+                'resources': day_task.get('resources') or [],
+                'is_completed': False,
+            }
+            for day_task in plan_data
+        ])
+
+        if commit:
+            db.session.commit()
+        else:
+            db.session.flush()
+    except Exception:
+        db.session.rollback()
+        raise
+    return plan
+
+
+def compute_streak(dates):
+    """Length of the run of consecutive days ending at the latest of `dates`."""
+    days = sorted({d for d in dates if d}, reverse=True)
+    streak = 0
+    for i, day in enumerate(days):
+        if day != days[0] - timedelta(days=i):
+            break
+        streak += 1
+    return streak
+
+
+def _next_open_day(plan):
+    return (db.session.query(func.min(DailyTask.day_number))
+            .filter(DailyTask.career_plan_id == plan.id, DailyTask.is_completed.is_(False))
+            .scalar())
+
+
+def set_task_completion(plan, task, completed, now=None, refresh=True):
+    """Mark `task` (of `plan`) completed or open and update the plan's aggregates.
+
+    Completing is O(1) apart from finding the next open day when the current
+    one was just finished. Re-opening a task that fed the current streak
+    recomputes the streak from the remaining completion dates. With
+    `refresh=False` those two lookups are skipped and left to a single
+    `refresh_plan_progress` call (see `apply_task_updates`). The caller
+    commits.
+    """
+    if bool(task.is_completed) == bool(completed):
+        return False
+    now = now or datetime.utcnow()
+    today = now.date()
+    if completed:
+        task.is_completed = True
+        task.completed_date = now
+        plan.completed_count += 1
+        if plan.last_completed_on is None or today > plan.last_completed_on:
+            continued = plan.last_completed_on == today - timedelta(days=1)
+            plan.streak = plan.streak + 1 if continued else 1
+            plan.last_completed_on = today
+        if refresh and plan.next_due_day == task.day_number:
+            db.session.flush()
+            plan.next_due_day = _next_open_day(plan)
+    else:
+        done_on = task.completed_date.date() if task.completed_date else None
+        task.is_completed = False
+        task.completed_date = None
+        plan.completed_count = max(0, plan.completed_count - 1)
+        if plan.next_due_day is None or task.day_number < plan.next_due_day:
+            plan.next_due_day = task.day_number
+        streak_start = plan.last_completed_on - timedelta(days=max(plan.streak, 1) - 1) \
+            if plan.last_completed_on else None
+        if refresh and done_on is not None and streak_start is not None and done_on >= streak_start:
+            db.session.flush()
+            _refresh_streak(plan)
+    plan.last_updated = now
+    return True
+
+
+def refresh_plan_progress(plan):
+    """Recompute the next open day and the streak from the plan's tasks."""
+    db.session.flush()
+    plan.next_due_day = _next_open_day(plan)
+    _refresh_streak(plan)
+
+
+def _refresh_streak(plan):
+    dates = [d.date() for (d,) in db.session.query(DailyTask.completed_date)
+             .filter(DailyTask.career_plan_id == plan.id, DailyTask.is_completed.is_(True),
+                     DailyTask.completed_date.isnot(None))]
+    plan.streak = compute_streak(dates)
+    plan.last_completed_on = max(dates) if dates else None
+
+
+def apply_task_updates(user_id, updates, now=None):
+    """Apply {task_id: completed} for tasks owned by `user_id` as one batch.
+
+    Ownership is checked with a single joined query; if any id is missing or
+    belongs to someone else nothing is changed and LookupError is raised with
+    the offending ids. Counts are updated per task, the next open day and the
+    streak once per plan. Returns (plans touched, updated tasks). The caller
+    commits.
+    """
+    ids = sorted(updates)
+    tasks = (DailyTask.query
+             .join(CareerPlan, DailyTask.career_plan_id == CareerPlan.id)
+             .filter(DailyTask.id.in_(ids), CareerPlan.user_id == user_id)
+             .options(contains_eager(DailyTask.career_plan))
+             .all())
+    found = {t.id: t for t in tasks}
+    missing = [i for i in ids if i not in found]
+    if missing:
+        raise LookupError(missing)
+
+    now = now or datetime.utcnow()
+    plans = {}
+    for task in tasks:
+        if set_task_completion(task.career_plan, task, updates[task.id], now, refresh=False):
+            plans[task.career_plan_id] = task.career_plan
+    for plan in plans.values():
+        refresh_plan_progress(plan)
+    return list(plans.values()), [found[i] for i in ids]
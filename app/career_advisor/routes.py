@@ -1,28 +1,25 @@
-from flask import render_template, url_for, flash, redirect, request, jsonify, current_app
+from flask import render_template, url_for, flash, redirect, request, jsonify, current_app, Response, stream_with_context
 from app.career_advisor import bp
 from flask_login import current_user, login_required
-import google.generativeai as genai
 import os
-from app import db
-from app.models import CareerPlan, DailyTask, ChatSession, ChatMessage
-from datetime import datetime
+from app import db, ai_client, markdown_renderer, job_queue
+from app.ai.jsonstream import parse_json_text
+from app.models import CareerPlan, DailyTask, ChatSession, ChatMessage, BackgroundJob
+from app.career_advisor.memory import build_history_block, load_turn_history, schedule_summary_update
+from app.career_advisor.plans import save_career_plan, set_task_completion, apply_task_updates, MAX_TASK_BATCH
+from app.career_advisor.tailoring import (
+    tailor_resume_with_ai, analyze_match, iter_tailored_sections, merge_tailoring, render_edits
+)
+from app.profile.resume_store import load_resume_sections
+from app.profile.resume_sections import split_sections
+from app.profile.context import prompt_profile
+from app.pdf_text import extract_text
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 import re
 import json
-from PyPDF2 import PdfReader
-
-# Configure Google Gemini API
-GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-1.5-flash')
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    try:
-        model = genai.GenerativeModel(GEMINI_MODEL)
-    except Exception as e:
-        print(f"Error initializing Gemini model '{GEMINI_MODEL}': {e}")
-        model = None
-else:
-    print("GEMINI_API_KEY not found. AI features will be limited.")
-    model = None
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 def _enforce_single_question(text: str) -> str:
     try:
@@ -46,18 +43,11 @@ def _enforce_single_question(text: str) -> str:
         return text
 
 
-def get_ai_response(user_input, user_profile, chat_session):
-    if not model:
-        return "AI features are not configured. Please set GEMINI_API_KEY."
-
-    # Build conversation history for memory (all previous messages in this session)
-    history_lines = []
+def _build_chat_prompt(user_input, user_profile, chat_session, history=None):
+    # Bounded conversation memory: running summary plus the most recent turns
+    conversation_block = ''
     try:
-        if chat_session and getattr(chat_session, 'id', None):
-            prior = ChatMessage.query.filter_by(session_id=chat_session.id).order_by(ChatMessage.timestamp.asc()).all()
-            for m in prior:
-                role = 'User' if m.sender == 'user' else 'AI'
-                history_lines.append(f"{role}: {m.content}")
+        conversation_block = build_history_block(chat_session, history)
     except Exception as e:
         # If history fetch fails, continue without
         print('Warning: failed to load chat history:', e)
@@ -87,9 +77,9 @@ def get_ai_response(user_input, user_profile, chat_session):
         if user_profile.get('interests'):
             profile_bits.append(f"Interests: {user_profile.get('interests')}")
 
-    conversation_block = "\n".join(history_lines) if history_lines else "(No prior messages)"
+    conversation_block = conversation_block or "(No prior messages)"
 
-    prompt = (
+    return (
         f"{style_rules}\n\n" +
         (f"User Profile: {'; '.join(profile_bits)}\n\n" if profile_bits else "") +
         f"Conversation so far:\n{conversation_block}\n\n" +
@@ -97,18 +87,23 @@ def get_ai_response(user_input, user_profile, chat_session):
         "Your reply (<= 5 lines unless a domain explanation is needed):"
     )
 
+
+CHAT_GENERATION_CONFIG = {
+    "max_output_tokens": 220,
+    "temperature": 0.6,
+    "top_p": 0.9,
+    "top_k": 40,
+}
+
+
+def get_ai_response(user_input, user_profile, chat_session, history=None):
+    if not ai_client.available:
+        return "AI features are not configured. Please set GEMINI_API_KEY."
+
+    prompt = _build_chat_prompt(user_input, user_profile, chat_session, history)
+
     try:
-        generation_config = {
-            "max_output_tokens": 220,
-            "temperature": 0.6,
-            "top_p": 0.9,
-            "top_k": 40,
-        }
-        try:
-            response = model.generate_content(prompt, generation_config=generation_config)
-        except TypeError:
-            response = model.generate_content(prompt)
-        text = (getattr(response, 'text', None) or '').strip()
+        text = ai_client.generate_text(prompt, CHAT_GENERATION_CONFIG)
         text = _enforce_single_question(text)
         return text
     except Exception as e:
@@ -116,6 +111,41 @@ def get_ai_response(user_input, user_profile, chat_session):
         return "I apologize, but I'm having trouble connecting to the AI at the moment. Please try again later."
 
 
+def stream_ai_response(user_input, user_profile, chat_session, history=None):
+    """Yield the AI reply in chunks as Gemini produces them.
+
+    Applies the same single-question rule as get_ai_response, carried across
+    chunk boundaries. On failure the apology text is yielded instead, so the
+    caller always receives a complete reply to persist.
+    """
+    if not ai_client.available:
+        yield "AI features are not configured. Please set GEMINI_API_KEY."
+        return
+
+    prompt = _build_chat_prompt(user_input, user_profile, chat_session, history)
+
+    emitted = False
+    question_used = False
+    try:
+        for piece in ai_client.stream_text(prompt, CHAT_GENERATION_CONFIG):
+            if not emitted:
+                piece = piece.lstrip()
+                if not piece:
+                    continue
+            if question_used:
+                piece = piece.replace('?', '.')
+            elif '?' in piece:
+                head, tail = piece.split('?', 1)
+                piece = head + '?' + tail.replace('?', '.')
+                question_used = True
+            emitted = True
+            yield piece
+    except Exception as e:
+        print(f"Error streaming content from Gemini: {e}")
+        if not emitted:
+            yield "I apologize, but I'm having trouble connecting to the AI at the moment. Please try again later."
+
+
 def _user_consented_to_plan(user_input: str) -> bool:
     if not user_input:
         return False
@@ -131,8 +161,31 @@ def _user_consented_to_plan(user_input: str) -> bool:
     return any(a in s for a in affirmatives)
 
 
+_PLAN_WORDS = r"(?:plan|schedule|roadmap|tracker)"
+_PLAN_PROPOSAL_RE = re.compile(
+    r"\b(?:shall|should|can|may) i\b[^?\n]{0,80}\b" + _PLAN_WORDS +
+    r"|\b(?:would|do) you (?:like|want)\b[^?\n]{0,80}\b" + _PLAN_WORDS +
+    r"|\bwant me to\b[^?\n]{0,80}\b" + _PLAN_WORDS +
+    r"|\bready to (?:start|begin|schedule|create)\b[^?\n]{0,60}\b" + _PLAN_WORDS,
+    re.IGNORECASE,
+)
+# An offer stated outright ("I can create this plan for you. Go ahead?")
+_PLAN_OFFER_RE = re.compile(
+    r"\b(?:schedule|create|set up|generate|build|start) (?:this|the|your|a)\b[^.?\n]{0,40}\b(?:plan|roadmap)\b",
+    re.IGNORECASE,
+)
+
+
+def _proposes_plan(ai_response: str) -> bool:
+    """Whether the AI reply offers to create a plan, i.e. the user's next message may be a "yes"."""
+    if not ai_response:
+        return False
+    return bool(_PLAN_PROPOSAL_RE.search(ai_response)
+                or ('?' in ai_response and _PLAN_OFFER_RE.search(ai_response)))
+
+
 def _extract_goal_days_from_history(history_text: str, user_profile: dict | None) -> tuple[str | None, int | None]:
-    if not model:
+    if not ai_client.available:
         return None, None
     prompt = (
         "From the following conversation, infer the user's primary career goal and an optional desired duration in days if mentioned. "
@@ -141,16 +194,11 @@ def _extract_goal_days_from_history(history_text: str, user_profile: dict | None
         + (f"User Profile: {json.dumps(user_profile or {}, ensure_ascii=False)}\n" if user_profile else "")
     )
     try:
-        try:
-            resp = model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-        except TypeError:
-            resp = model.generate_content(prompt)
-        raw = (getattr(resp, 'text', None) or '').strip()
-        if raw.startswith('```'):
-            raw = raw.strip('`').strip()
-            if raw.lower().startswith('json'):
-                raw = raw[4:].strip()
-        data = json.loads(raw)
+        raw = ai_client.generate_text(
+            prompt, {"response_mime_type": "application/json"},
+            cache_if=lambda t: parse_json_text(t, allow_partial=False, expect=dict) is not None
+        )
+        data = parse_json_text(raw, expect=dict)
         goal = (data.get('goal') or '').strip() or None
         days = data.get('days')
         if isinstance(days, str):
@@ -170,17 +218,103 @@ def _extract_goal_days_from_history(history_text: str, user_profile: dict | None
     except Exception:
         return None, None
 
-def generate_career_plan_with_ai(user_profile, career_goal, days: int | None = None):
-    if not model:
-        return None
-    user_profile = user_profile or {}
+PLAN_GENERATION_CONFIG = {"max_output_tokens": 1400, "response_mime_type": "application/json"}
+
+
+def _extract_json_array(text: str):
+    """Return the list of plan items in a model reply (recovering truncated output), or None."""
+    data = parse_json_text(text)
+    if isinstance(data, list):
+        return data or None
+    # If it is a dict with a plan field
+    if isinstance(data, dict):
+        for key in ('plan', 'days', 'schedule'):
+            if key in data and isinstance(data[key], list):
+                return data[key]
+        # Some models return mapping day->entry
+        if 'days' in data and isinstance(data['days'], dict):
+            seq = []
+            for k in sorted(data['days'].keys(), key=lambda x: int(re.sub(r'[^0-9]', '', x) or 0)):
+                seq.append(data['days'][k])
+            return seq
+    return None
+
+
+def _normalize_list(items):
+    # Normalize items (accept common key variants)
+    out = []
+    for item in items or []:
+        try:
+            if not isinstance(item, dict):
+                continue
+            lower_map = {str(k).strip().lower(): v for k, v in item.items()}
+            # day
+            day_val = lower_map.get('day') or lower_map.get('day_number') or lower_map.get('daynum') or lower_map.get('index') or lower_map.get('step')
+            if isinstance(day_val, str):
+                m = re.search(r"\d+", day_val)
+                day = int(m.group()) if m else None
+            elif isinstance(day_val, (int, float)):
+                day = int(day_val)
+            else:
+                day = None
+            # task / description
+            task_val = (
+                lower_map.get('task') or lower_map.get('tasks') or lower_map.get('activity') or lower_map.get('activities') or
+                lower_map.get('objective') or lower_map.get('focus') or lower_map.get('description') or lower_map.get('summary')
+            )
+            if isinstance(task_val, list):
+                task = "; ".join([str(x).strip() for x in task_val if x])
+            else:
+                task = (str(task_val).strip() if task_val else '')
+            # resources
+            res_val = (
+                lower_map.get('resources') or lower_map.get('links') or lower_map.get('materials') or
+                lower_map.get('references') or lower_map.get('sources') or lower_map.get('urls') or lower_map.get('resource_links')
+            )
+            resources = res_val if isinstance(res_val, list) else ([str(res_val)] if res_val else [])
+            if not isinstance(resources, list):
+                resources = [str(resources)] if resources else []
+            resources = [str(r).strip() for r in resources if r]
+            if day is None:
+                day = len(out) + 1
+            if task:
+                out.append({'day': day, 'task': task, 'resources': resources})
+        except Exception:
+            continue
+    return out
+
+
+def _merge_plan_items(dedup: dict, items):
+    """Add items to a day->item map, keeping the first item seen for each day."""
+    for it in items:
+        if it['day'] not in dedup:
+            dedup[it['day']] = it
+    return dedup
+
+
+def _renumber(dedup: dict, days: int | None = None):
+    normalized = [dedup[d] for d in sorted(dedup.keys())]
+    for idx, it in enumerate(normalized, start=1):
+        it['day'] = idx
+    if days and len(normalized) > days:
+        normalized = normalized[:days]
+    return normalized
 
+
+def _call_plan_model(prompt_text: str):
+    return ai_client.generate_text(
+        prompt_text, PLAN_GENERATION_CONFIG,
+        cache_if=lambda t: isinstance(parse_json_text(t, allow_partial=False), (list, dict))
+    )
+
+
+def _build_plan_prompt(user_profile, career_goal, days: int | None):
     duration_clause = (
         f"Create a personalized learning plan with exactly {days} days. " if days else
         "Create a personalized learning plan with an appropriate number of days based on the user's current experience and the goal. "
     )
 
-    base_prompt = f"""
+    return f"""
 As an AI career advisor, {duration_clause}Goal: '{career_goal}'.
 Include day-wise tasks and relevant resources (links to credible articles, courses, or books).
 Consider the user's profile:
@@ -195,237 +329,165 @@ Output format requirements (STRICT):
      - Frame tasks as skill modules and outcomes (e.g., for ML: Supervised/Unsupervised/Semi-supervised learning, MLOps & Deployment, Current Trends), not micro-algorithm lists. 
      - Recommend specific top-quality resources (courses and books) by platform/author; do not ask the user to choose formats or number of days.
 """
-    if days:
-        base_prompt += f"\nThe top-level array MUST contain exactly {days} items (one per day)."
 
-    def _call_model(prompt_text: str):
-        gen_cfg = {"max_output_tokens": 1400, "response_mime_type": "application/json"}
-        try:
-            resp = model.generate_content(prompt_text, generation_config=gen_cfg)
-        except TypeError:
-            resp = model.generate_content(prompt_text)
-        raw_text = (getattr(resp, 'text', None) or '').strip()
-        if not raw_text and getattr(resp, 'candidates', None):
-            try:
-                parts = []
-                for cand in resp.candidates:
-                    for part in getattr(cand.content, 'parts', []) or []:
-                        if hasattr(part, 'text') and part.text:
-                            parts.append(part.text)
-                raw_text = "\n".join(parts).strip()
-            except Exception:
-                pass
-        return raw_text
 
-    def _extract_json_array(text: str):
-        if not text:
-            return None
-        t = text.strip()
-        # Fenced JSON block
-        if t.startswith('```'):
-            try:
-                inner = t.strip('`').strip()
-                if inner.lower().startswith('json'):
-                    inner = inner[4:].strip()
-                return json.loads(inner)
-            except Exception:
-                pass
-        # Try to extract a balanced top-level JSON array
-        def find_balanced_array(s: str):
-            depth = 0
-            in_str = False
-            esc = False
-            start_idx = -1
-            for i, ch in enumerate(s):
-                if in_str:
-                    if esc:
-                        esc = False
-                    elif ch == '\\':
-                        esc = True
-                    elif ch == '"':
-                        in_str = False
-                    continue
-                else:
-                    if ch == '"':
-                        in_str = True
-                        continue
-                    if ch == '[':
-                        if depth == 0:
-                            start_idx = i
-                        depth += 1
-                    elif ch == ']':
-                        depth -= 1
-                        if depth == 0 and start_idx != -1:
-                            return s[start_idx:i+1]
-            return None
-
-        candidate = find_balanced_array(t)
-        if candidate:
-            try:
-                return json.loads(candidate)
-            except Exception:
-                # Attempt to remove trailing commas
-                try:
-                    candidate2 = re.sub(r',\s*([\]}])', r'\1', candidate)
-                    return json.loads(candidate2)
-                except Exception:
-                    pass
-        # Fallback: parse partial array of complete objects if output is truncated
-        def _parse_partial_array(s: str):
-            start = s.find('[')
-            if start == -1:
-                return None
-            i = start
-            n = len(s)
-            in_str = False
-            esc = False
-            depth_brace = 0
-            obj_start = -1
-            items = []
-            while i < n:
-                ch = s[i]
-                if in_str:
-                    if esc:
-                        esc = False
-                    elif ch == '\\':
-                        esc = True
-                    elif ch == '"':
-                        in_str = False
-                else:
-                    if ch == '"':
-                        in_str = True
-                    elif ch == '{':
-                        if depth_brace == 0:
-                            obj_start = i
-                        depth_brace += 1
-                    elif ch == '}':
-                        if depth_brace > 0:
-                            depth_brace -= 1
-                            if depth_brace == 0 and obj_start != -1:
-                                frag = s[obj_start:i+1]
-                                try:
-                                    obj = json.loads(frag)
-                                    items.append(obj)
-                                except Exception:
-                                    pass
-                                obj_start = -1
-                i += 1
-            return items if items else None
-
-        partial_items = _parse_partial_array(t)
-        if partial_items:
-            return partial_items
-        # If it is a dict with a plan field
+def _generate_plan_outline(user_profile, career_goal, days: int, ranges):
+    """One focus line per chunk ({range: focus}), or None if the model gives no usable outline.
+
+    Chunks are generated in parallel, so each one is told what the others
+    cover; this keeps topics progressing from week to week instead of repeating.
+    """
+    blocks = "; ".join(f"block {i} = days {start}-{end}" for i, (start, end) in enumerate(ranges, start=1))
+    prompt = (
+        f"As an AI career advisor, outline a {days}-day learning plan for the goal '{career_goal}' "
+        f"for a {user_profile.get('user_type', 'learner')} interested in {user_profile.get('interests') or 'N/A'}. "
+        f"Split it into {len(ranges)} consecutive blocks: {blocks}. "
+        f"Return ONLY a JSON array of {len(ranges)} objects with keys 'block' (1-based integer) and 'focus' "
+        "(one sentence naming the skill modules and outcomes of that block). Blocks must progress logically "
+        "from fundamentals to advanced topics and must not repeat topics."
+    )
+    try:
+        items = _extract_json_array(_call_plan_model(prompt)) or []
+    except Exception as e:
+        print('Error generating plan outline:', e)
+        return None
+    focuses = []
+    for item in items:
+        focus = item.get('focus') if isinstance(item, dict) else item
+        if isinstance(focus, str) and focus.strip():
+            focuses.append(focus.strip())
+    if len(focuses) < len(ranges):
+        return None
+    return dict(zip(ranges, focuses))
+
+
+def _request_plan_chunk(base_prompt: str, days: int, start_day: int, end_day: int, outline=None):
+    """Days start_day..end_day of a `days`-day plan (one model call, plus one more for gaps)."""
+    count = end_day - start_day + 1
+    week = (start_day - 1) // 7 + 1
+    if outline:
+        chunk_prompt = (
+            base_prompt +
+            "\nOutline of the whole plan:\n" +
+            "\n".join(f"- Days {start}-{end}: {focus}" for (start, end), focus in outline.items()) +
+            f"\nThis request covers ONLY days {start_day} through {end_day}, whose focus is: "
+            f"{outline[(start_day, end_day)]} Build on the earlier blocks and leave later topics to their "
+            f"blocks; do not repeat them. Return a JSON array of exactly {count} items numbered {start_day} to {end_day}."
+        )
+    else:
+        chunk_prompt = (
+            base_prompt +
+            f"\nThis request covers ONLY days {start_day} through {end_day} (week {week}) of the {days}-day plan. "
+            f"Assume earlier days covered the preceding modules in a logical progression; do not repeat them. "
+            f"Return a JSON array of exactly {count} items numbered {start_day} to {end_day}."
+        )
+
+    def _in_range(items):
+        items = _normalize_list(items)
+        # Models sometimes restart numbering at 1 for a chunk; shift it into place
+        if items and not all(start_day <= it['day'] <= end_day for it in items):
+            for offset, it in enumerate(items):
+                it['day'] = start_day + offset
+        return [it for it in items if start_day <= it['day'] <= end_day]
+
+    dedup = _merge_plan_items({}, _in_range(_extract_json_array(_call_plan_model(chunk_prompt))))
+    missing = [d for d in range(start_day, end_day + 1) if d not in dedup]
+    if missing:
+        focus = f"\nThese days focus on: {outline[(start_day, end_day)]}" if outline else ''
+        retry_prompt = (
+            base_prompt + focus +
+            f"\nProvide ONLY the JSON array items for days {missing[0]} through {end_day} of the {days}-day plan. "
+            f"Start numbering at day {missing[0]}. No prose, no wrappers—just the array items."
+        )
+        first, last = missing[0], end_day
+        tail = _normalize_list(_extract_json_array(_call_plan_model(retry_prompt)))
+        if tail and not all(first <= it['day'] <= last for it in tail):
+            for offset, it in enumerate(tail):
+                it['day'] = first + offset
+        _merge_plan_items(dedup, [it for it in tail if first <= it['day'] <= last])
+    return [dedup[d] for d in sorted(dedup.keys())]
+
+
+def _generate_plan_chunk(base_prompt: str, days: int, start_day: int, end_day: int, outline=None, attempts=2):
+    """A chunk of the plan; a model error or unusable reply regenerates only this chunk.
+
+    Returns the first complete result, else the most complete one after
+    `attempts` tries; raises if no attempt produced any items.
+    """
+    best = []
+    for attempt in range(1, attempts + 1):
         try:
-            obj = json.loads(t)
-            if isinstance(obj, dict):
-                for key in ('plan', 'days', 'schedule'):
-                    if key in obj and isinstance(obj[key], list):
-                        return obj[key]
-                # Some models return mapping day->entry
-                if 'days' in obj and isinstance(obj['days'], dict):
-                    seq = []
-                    for k in sorted(obj['days'].keys(), key=lambda x: int(re.sub(r'[^0-9]', '', x) or 0)):
-                        seq.append(obj['days'][k])
-                    return seq
-        except Exception:
-            pass
+            items = _request_plan_chunk(base_prompt, days, start_day, end_day, outline)
+        except Exception as e:
+            print(f'Error generating plan days {start_day}-{end_day} (attempt {attempt}):', e)
+            continue
+        if len(items) == end_day - start_day + 1:
+            return items
+        if len(items) > len(best):
+            best = items
+    if not best:
+        raise ValueError(f'No valid plan items for days {start_day}-{end_day}')
+    return best
+
+
+def _generate_plan_chunked(base_prompt: str, days: int, user_profile=None, career_goal=''):
+    """Generate a long plan as concurrent week-sized requests and merge them in day order.
+
+    An outline of all chunks is generated first and passed to each of them.
+    """
+    config = current_app.config
+    chunk_days = max(1, config['PLAN_CHUNK_DAYS'])
+    ranges = [(start, min(start + chunk_days - 1, days)) for start in range(1, days + 1, chunk_days)]
+    outline = _generate_plan_outline(user_profile or {}, career_goal, days, ranges)
+    attempts = max(1, config['PLAN_CHUNK_ATTEMPTS'])
+    max_workers = max(1, min(len(ranges), config['PLAN_MAX_PARALLEL_CHUNKS']))
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='plan-chunk') as pool:
+        results = list(pool.map(
+            lambda r: _generate_plan_chunk(base_prompt, days, r[0], r[1], outline, attempts), ranges
+        ))
+    dedup = {}
+    for items in results:
+        _merge_plan_items(dedup, items)
+    return _renumber(dedup, days)
+
+
+def generate_career_plan_with_ai(user_profile, career_goal, days: int | None = None):
+    if not ai_client.available:
         return None
+    user_profile = user_profile or {}
 
+    base_prompt = _build_plan_prompt(user_profile, career_goal, days)
+
+    raw = ''
     try:
-        prompt = base_prompt
-        raw = _call_model(prompt)
+        # Long plans: request week-sized chunks concurrently instead of one large, truncation-prone call
+        if days and days > current_app.config['PLAN_CHUNK_DAYS']:
+            normalized = _generate_plan_chunked(base_prompt, days, user_profile, career_goal)
+            if not normalized:
+                raise ValueError('No valid plan items were returned')
+            return normalized
 
-        data = None
-        # Direct parse (array)
-        try:
-            parsed = json.loads(raw)
-            if isinstance(parsed, list):
-                data = parsed
-            elif isinstance(parsed, dict):
-                for key in ('plan', 'days', 'schedule'):
-                    if key in parsed and isinstance(parsed[key], list):
-                        data = parsed[key]
-                        break
-        except Exception:
-            pass
-        # Fallback extraction
-        if data is None:
-            data = _extract_json_array(raw)
+        if days:
+            base_prompt += f"\nThe top-level array MUST contain exactly {days} items (one per day)."
+
+        raw = _call_plan_model(base_prompt)
+        data = _extract_json_array(raw)
 
         if (not isinstance(data, list)) or (not data):
             # Retry once with stricter wording if we have a target days count
             if days:
                 retry_prompt = base_prompt + " Ensure the JSON array has exactly " + str(days) + " items. No comments, no extra keys."
-                raw = _call_model(retry_prompt)
-                data = None
-                try:
-                    parsed = json.loads(raw)
-                    if isinstance(parsed, list):
-                        data = parsed
-                except Exception:
-                    pass
-                if data is None:
-                    data = _extract_json_array(raw)
+                raw = _call_plan_model(retry_prompt)
+                data = _extract_json_array(raw)
             if not isinstance(data, list) or not data:
                 raise ValueError('Model did not return a valid JSON array for the plan')
 
-        # Normalize items (accept common key variants)
-        def _normalize_list(items):
-            out = []
-            for item in items or []:
-                try:
-                    if not isinstance(item, dict):
-                        continue
-                    lower_map = {str(k).strip().lower(): v for k, v in item.items()}
-                    # day
-                    day_val = lower_map.get('day') or lower_map.get('day_number') or lower_map.get('daynum') or lower_map.get('index') or lower_map.get('step')
-                    if isinstance(day_val, str):
-                        m = re.search(r"\d+", day_val)
-                        day = int(m.group()) if m else None
-                    elif isinstance(day_val, (int, float)):
-                        day = int(day_val)
-                    else:
-                        day = None
-                    # task / description
-                    task_val = (
-                        lower_map.get('task') or lower_map.get('tasks') or lower_map.get('activity') or lower_map.get('activities') or
-                        lower_map.get('objective') or lower_map.get('focus') or lower_map.get('description') or lower_map.get('summary')
-                    )
-                    if isinstance(task_val, list):
-                        task = "; ".join([str(x).strip() for x in task_val if x])
-                    else:
-                        task = (str(task_val).strip() if task_val else '')
-                    # resources
-                    res_val = (
-                        lower_map.get('resources') or lower_map.get('links') or lower_map.get('materials') or
-                        lower_map.get('references') or lower_map.get('sources') or lower_map.get('urls') or lower_map.get('resource_links')
-                    )
-                    resources = res_val if isinstance(res_val, list) else ([str(res_val)] if res_val else [])
-                    if not isinstance(resources, list):
-                        resources = [str(resources)] if resources else []
-                    resources = [str(r).strip() for r in resources if r]
-                    if day is None:
-                        day = len(out) + 1
-                    if task:
-                        out.append({'day': day, 'task': task, 'resources': resources})
-                except Exception:
-                    continue
-            return out
-
         normalized = _normalize_list(data)
         # If exact days requested, enforce count by trimming or re-numbering
         if days:
             # Deduplicate by day number and ensure sequential numbering starting at 1
-            dedup = {}
-            for it in normalized:
-                if it['day'] not in dedup:
-                    dedup[it['day']] = it
-            normalized = [dedup[d] for d in sorted(dedup.keys())]
-            for idx, it in enumerate(normalized, start=1):
-                it['day'] = idx
-            if len(normalized) > days:
-                normalized = normalized[:days]
+            dedup = _merge_plan_items({}, normalized)
+            normalized = _renumber(dedup, days)
             # If we still have fewer items than requested, try to fetch the missing tail (once)
             if len(normalized) < days:
                 start_day = len(normalized) + 1
@@ -434,26 +496,12 @@ Output format requirements (STRICT):
                     f" Provide ONLY the JSON array items for days {start_day} through {days}. "
                     f"Start numbering at day {start_day}. No prose, no wrappers—just the array items."
                 )
-                raw_tail = _call_model(cont_prompt)
-                tail = None
-                try:
-                    parsed_tail = json.loads(raw_tail)
-                    if isinstance(parsed_tail, list):
-                        tail = parsed_tail
-                except Exception:
-                    pass
-                if tail is None:
-                    tail = _extract_json_array(raw_tail)
+                raw_tail = _call_plan_model(cont_prompt)
+                tail = _extract_json_array(raw_tail)
                 if isinstance(tail, list) and tail:
-                    tail_norm = _normalize_list(tail)
-                    for it in tail_norm:
-                        if it['day'] not in dedup:
-                            dedup[it['day']] = it
-                    normalized = [dedup[d] for d in sorted(dedup.keys())]
-                    for idx, it in enumerate(normalized, start=1):
-                        it['day'] = idx
-                    if len(normalized) > days:
-                        normalized = normalized[:days]
+                    dedup = {it['day']: it for it in normalized}
+                    _merge_plan_items(dedup, _normalize_list(tail))
+                    normalized = _renumber(dedup, days)
 
         # Final sanity check; do not fail if we have at least one valid item
         if not normalized:
@@ -468,111 +516,55 @@ Output format requirements (STRICT):
         print("Error generating career plan from Gemini:", e, "\nRaw preview:", preview)
         return None
 
-def tailor_resume_with_ai(user_resume_content, job_description, user_profile):
-    if not model:
-        return None
-
-    prompt_parts = [
-        "You are an expert resume analyst and career coach. Return ONLY a JSON object (no markdown) with the following shape: ",
-        "{ \"summary\": string, \"edits\": [ { \"section\": string, \"original\": string, \"suggested\": string, \"reason\": string } ] }.",
-        "- `section`: the resume section (e.g., Summary, Experience, Education, Skills).",
-        "- `original`: the exact sentence or bullet from the resume to improve.",
-        "- `suggested`: a rewritten version aligned to the job description and best practices.",
-        "- `reason`: brief rationale (keywords added, quantified impact, clarity, ATS, etc.)."
-    ]
-
-    if user_profile:
-        prompt_parts.append(f"The user's name is {user_profile.get('name', 'there')}. ")
-        if user_profile.get('user_type'):
-            prompt_parts.append(f"They are a {user_profile.get('user_type')}. ")
-        if user_profile.get('interests'):
-            prompt_parts.append(f"Their interests include: {user_profile.get('interests')}. ")
-
-    prompt_parts.append(
-        f"\n\nJob Description:\n{job_description}\n\nUser Resume Text:\n{user_resume_content}\n\n"
-        "Ensure edits are sentence-level and actionable. Output strictly valid JSON."
-    )
-
-    try:
-        # Prefer JSON response
-        generation_config = {"response_mime_type": "application/json"}
-        try:
-            resp = model.generate_content(" ".join(prompt_parts), generation_config=generation_config)
-        except TypeError:
-            resp = model.generate_content(" ".join(prompt_parts))
-
-        raw = (getattr(resp, 'text', None) or '').strip()
-        if raw.startswith('```'):
-            raw = raw.strip('`').strip()
-            if raw.lower().startswith('json'):
-                raw = raw[4:].strip()
-        data = json.loads(raw)
-        # normalize to expected shape
-        edits = data.get('edits') or []
-        normalized_edits = []
-        for e in edits:
-            section = (e.get('section') or '').strip()
-            original = (e.get('original') or '').strip()
-            suggested = (e.get('suggested') or '').strip()
-            reason = (e.get('reason') or '').strip()
-            if section and suggested:
-                normalized_edits.append({
-                    'section': section,
-                    'original': original,
-                    'suggested': suggested,
-                    'reason': reason
-                })
-        # backward-compat: if older 'points' shape, convert minimally
-        if not normalized_edits and data.get('points'):
-            for p in data['points']:
-                heading = (p.get('heading') or '').strip()
-                details = (p.get('details') or '').strip()
-                if heading and details:
-                    normalized_edits.append({
-                        'section': heading,
-                        'original': '',
-                        'suggested': details,
-                        'reason': ''
-                    })
-        return {
-            'summary': (data.get('summary') or '').strip(),
-            'edits': normalized_edits
-        }
-    except Exception as e:
-        print('Error tailoring resume with Gemini:', e)
-        return None
 
-def _load_extracted_resume_text(user_id: int) -> str:
-    try:
-        user_data_dir = os.path.join(current_app.instance_path, 'user_data')
-        json_path = os.path.join(user_data_dir, f"user_{user_id}_resume.json")
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as jf:
-                data = json.load(jf)
-                txt = (data or {}).get('extracted_text') or ''
-                if txt:
-                    return txt
-    except Exception:
-        pass
-    return ''
+def _load_resume_sections(user_id: int) -> dict:
+    sections = load_resume_sections(user_id)
+    if not sections:
+        # Attempt to extract directly from the stored PDF
+        profile = current_user.profile if current_user.id == user_id else None
+        if profile and profile.resume_path and os.path.exists(profile.resume_path):
+            sections = split_sections(extract_text(profile.resume_path))
+    return sections
+
+def _message_page(session_id, before=None, after=None, limit=None):
+    """Keyset-paginate a session's messages by id.
+
+    Returns (messages oldest-first, has_more). Without a cursor this is the
+    newest page; `before` walks back to older messages and `after` forward to
+    newer ones. `has_more` reports whether another page exists in that direction.
+    """
+    page_size = current_app.config['CHAT_PAGE_SIZE']
+    limit = max(1, min(limit or page_size, current_app.config['CHAT_PAGE_SIZE_MAX']))
+    query = ChatMessage.query.filter(ChatMessage.session_id == session_id)
+    if after is not None:
+        rows = query.filter(ChatMessage.id > after).order_by(ChatMessage.id.asc()).limit(limit + 1).all()
+        return rows[:limit], len(rows) > limit
+    if before is not None:
+        query = query.filter(ChatMessage.id < before)
+    rows = query.order_by(ChatMessage.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+    return rows, has_more
+
+
+def _session_previews(user_id):
+    """Map session id -> content of its latest message, in one query."""
+    latest = (db.session.query(func.max(ChatMessage.id))
+              .join(ChatSession, ChatSession.id == ChatMessage.session_id)
+              .filter(ChatSession.user_id == user_id)
+              .group_by(ChatMessage.session_id))
+    rows = (db.session.query(ChatMessage.session_id, ChatMessage.content)
+            .filter(ChatMessage.id.in_(latest))
+            .all())
+    return {sid: content for sid, content in rows}
 
-def _extract_text_from_pdf(path: str) -> str:
-    try:
-        reader = PdfReader(path)
-        parts = []
-        for p in reader.pages:
-            try:
-                parts.append(p.extract_text() or '')
-            except Exception:
-                parts.append('')
-        return "\n".join(parts)
-    except Exception:
-        return ''
 
 @bp.route('/chat')
 @login_required
 def chat_with_ai():
     chat_sessions = ChatSession.query.filter_by(user_id=current_user.id).all()
+    previews = _session_previews(current_user.id)
     session_id = request.args.get('session_id')
     if session_id:
          try:
@@ -581,9 +573,271 @@ def chat_with_ai():
              flash('Invalid session ID', 'danger')
              session_id = None
     messages = []
+    has_more = False
+    if session_id:
+        if any(s.id == session_id for s in chat_sessions):
+            # Only the newest window is rendered; older pages load on scroll
+            messages, has_more = _message_page(session_id)
+        else:
+            flash('Invalid session ID', 'danger')
+            session_id = None
+    return render_template('career_advisor/chat.html', title='AI Career Advisor', chat_sessions=chat_sessions, previews=previews,
+                           session_id=session_id, messages=messages, has_more=has_more)
+
+def _get_or_create_chat_session(session_id):
+    """Return (chat_session, error_response) for the current user."""
     if session_id:
-        messages = ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp).all()
-    return render_template('career_advisor/chat.html', title='AI Career Advisor', chat_sessions=chat_sessions,session_id = session_id, messages = messages)
+        try:
+            chat_session = ChatSession.query.get(session_id)
+            if not chat_session or chat_session.user_id != current_user.id:
+                return None, (jsonify({'error': 'Invalid session ID'}), 400)
+        except Exception as e:
+            return None, (jsonify({'error': f'Error finding session: {e}'}), 500)
+        return chat_session, None
+
+    chat_session = ChatSession(user_id=current_user.id)
+    db.session.add(chat_session)
+    _commit_keeping_state()
+    return chat_session, None
+
+
+def _draft_plan_for_session(session_id, message_id, user_profile_data):
+    """Background job: extract the goal/duration and draft the plan the AI just proposed.
+
+    The draft is only stored if it still answers the session's latest
+    proposal; a newer turn may have superseded or cleared it meanwhile. If the
+    user already accepted it, the plan is saved here instead.
+    """
+    chat_session = ChatSession.query.get(session_id)
+    if not chat_session or chat_session.plan_draft_message_id != message_id:
+        return
+    draft, status = None, 'failed'
+    try:
+        history_text = build_history_block(chat_session)
+        db.session.commit()  # no connection held while the model drafts
+        goal, days = _extract_goal_days_from_history(history_text, user_profile_data)
+        items = generate_career_plan_with_ai(user_profile_data, goal, days) if goal else None
+        if items:
+            draft, status = {'goal': goal, 'days': days, 'items': items}, 'ready'
+    finally:
+        stored = (ChatSession.query
+                  .filter_by(id=session_id, plan_draft_message_id=message_id, plan_draft_status='pending')
+                  .update({'plan_draft': draft, 'plan_draft_status': status}, synchronize_session=False))
+        if not stored:
+            _save_accepted_draft(session_id, message_id, draft)
+        db.session.commit()
+
+
+def _save_accepted_draft(session_id, message_id, draft):
+    """Save a draft the user consented to while it was still running, and say so in the chat."""
+    chat_session = (ChatSession.query
+                    .filter_by(id=session_id, plan_draft_message_id=message_id, plan_draft_status='accepted')
+                    .first())
+    if not chat_session:
+        return
+    _clear_plan_draft(chat_session)
+    note = "Plan created in your Tracker."
+    if draft:
+        try:
+            save_career_plan(chat_session.user_id, draft['goal'], draft['items'], chat_session, commit=False)
+        except Exception as e:
+            db.session.rollback()
+            print('Error saving career plan:', e)
+            chat_session = ChatSession.query.get(session_id)
+            _clear_plan_draft(chat_session)
+            draft = None
+    if not draft:
+        note = "Sorry, I couldn't create that plan. Please ask me again."
+    db.session.add(ChatMessage(session_id=session_id, sender='ai', content=note,
+                               content_html=markdown_renderer.render(note)))
+
+
+def _clear_plan_draft(chat_session):
+    chat_session.plan_draft = None
+    chat_session.plan_draft_status = None
+    chat_session.plan_draft_message_id = None
+
+
+def _accept_plan_draft(chat_session):
+    """Use the session's plan draft for a consent turn, without waiting for it.
+
+    Returns (draft, preparing): the draft when it is ready, or preparing=True
+    when it is still running and has been marked accepted, so the background
+    job saves the plan once it is done. A draft accepted by an earlier "yes"
+    is left to its job rather than generated again.
+    """
+    if chat_session.plan_draft_status == 'accepted' and _accepted_draft_running(chat_session):
+        return None, True
+    if chat_session.plan_draft_status == 'pending':
+        claimed = (ChatSession.query
+                   .filter_by(id=chat_session.id, plan_draft_message_id=chat_session.plan_draft_message_id,
+                              plan_draft_status='pending')
+                   .update({'plan_draft_status': 'accepted'}, synchronize_session=False))
+        if claimed:
+            return None, True
+        db.session.refresh(chat_session)  # the draft finished in the meantime
+    if chat_session.plan_draft_status == 'ready' and chat_session.plan_draft:
+        return chat_session.plan_draft, False
+    return None, False
+
+
+def _plan_draft_job(chat_session):
+    """The job drafting the session's current plan draft, marked failed if it outlived JOB_TIMEOUT."""
+    job = (BackgroundJob.query
+           .filter_by(kind='plan_draft', ref=f'chat_message:{chat_session.plan_draft_message_id}')
+           .first())
+    with _keeping_state():
+        return job_queue.expire_if_stale(job)
+
+
+def _accepted_draft_running(chat_session):
+    """Whether the job drafting an accepted plan is still going to save it.
+
+    A job that succeeded has saved it already (after this turn loaded the
+    session). One that failed, died (restart, crash) or was never queued will
+    not, so the caller clears or replaces the 'accepted' status with this
+    turn's writes; left alone it would block new drafts for the session.
+    """
+    job = _plan_draft_job(chat_session)
+    return job is not None and (job.is_pending or job.status == 'succeeded')
+
+
+def _plan_from_history(history_text, user_profile_data):
+    """(goal, plan items) drafted on the spot from the conversation so far."""
+    goal, days = _extract_goal_days_from_history(history_text, user_profile_data)
+    if not goal:
+        return None, None
+    return goal, generate_career_plan_with_ai(user_profile_data, goal, days)
+
+
+@contextmanager
+def _keeping_state():
+    """Commits inside the block do not expire loaded objects."""
+    session = db.session()
+    session.expire_on_commit = False
+    try:
+        yield
+    finally:
+        session.expire_on_commit = True
+
+
+def _commit_keeping_state():
+    """Commit without expiring loaded objects; their values are what was just written."""
+    with _keeping_state():
+        db.session.commit()
+
+
+def _release_connection():
+    """End the request's read transaction before a model call.
+
+    The pooled connection goes back to the pool instead of sitting idle while
+    the thread waits on Gemini; loaded objects stay usable.
+    """
+    _commit_keeping_state()
+
+
+def _finalize_chat_turn(chat_session, user_input, ai_response, user_profile_data, history=None, has_more=True):
+    """Persist a completed chat turn and create a plan if the user consented.
+
+    `history`/`has_more` are what `load_turn_history` returned before the
+    reply was generated; they are reused for goal extraction and the summary
+    schedule instead of querying the messages again. The turn, any plan and
+    the draft bookkeeping are committed together. When the AI reply proposes
+    a plan, a draft is prepared in the background so that consenting on the
+    next turn only needs to save it; if the draft is still running, the turn
+    marks it accepted and the job saves the plan when it finishes. Returns the (possibly extended) AI
+    response and whether a plan was generated.
+    """
+    if history is None:
+        history, has_more = load_turn_history(chat_session)
+
+    # Work out the plan before writing anything, so no transaction is held open during model calls
+    consented = _user_consented_to_plan(user_input)
+    goal = plan_data = None
+    preparing = False
+    if consented:
+        draft, preparing = _accept_plan_draft(chat_session) if chat_session.plan_draft_status else (None, False)
+        if draft:
+            goal, plan_data = draft['goal'], draft['items']
+        elif not preparing:
+            history_text = "\n".join(filter(None, [
+                build_history_block(chat_session, history), f"User: {user_input}", f"AI: {ai_response}"]))
+            _release_connection()
+            goal, plan_data = _plan_from_history(history_text, user_profile_data)
+    # A plan the user already accepted is still being drafted; a new proposal must not replace it
+    proposes = (not consented and _proposes_plan(ai_response) and ai_client.available
+                and current_app.config['PLAN_PREFETCH_ENABLED']
+                and not (chat_session.plan_draft_status == 'accepted' and _accepted_draft_running(chat_session)))
+
+    # Store messages in the database
+    user_message = ChatMessage(session_id=chat_session.id, sender='user', content=user_input)
+    ai_message = ChatMessage(session_id=chat_session.id, sender='ai', content=ai_response,
+                             content_html=markdown_renderer.render(ai_response))
+    turn = [user_message, ai_message]
+    db.session.add_all(turn)
+
+    plan_generated = False
+    session_id, user_id = chat_session.id, chat_session.user_id
+    if preparing:
+        # The draft job saves the plan and posts its own note once it finishes
+        note = "Your plan is being prepared and will appear in your Tracker shortly."
+        turn.append(ChatMessage(session_id=session_id, sender='ai', content=note,
+                                content_html=markdown_renderer.render(note)))
+        db.session.add(turn[-1])
+        ai_response = f"{ai_response}\n\n{note}".strip()
+    elif consented:
+        _clear_plan_draft(chat_session)
+        if goal and plan_data:
+            # Short note saved in the same transaction as the messages and the plan
+            note = "Plan created in your Tracker."
+            turn.append(ChatMessage(session_id=session_id, sender='ai', content=note,
+                                    content_html=markdown_renderer.render(note)))
+            db.session.add(turn[-1])
+            try:
+                save_career_plan(user_id, goal, plan_data, chat_session, commit=False)
+                _commit_keeping_state()
+                plan_generated = True
+                ai_response = f"{ai_response}\n\n{note}".strip()
+            except Exception as e:
+                db.session.rollback()
+                print('Error saving career plan:', e)
+                # The rollback dropped the messages too; save the turn on its own
+                turn = turn[:2]
+                db.session.add_all(turn)
+    elif proposes:
+        db.session.flush()
+        chat_session.plan_draft = None
+        chat_session.plan_draft_status = 'pending'
+        chat_session.plan_draft_message_id = ai_message.id
+    elif chat_session.plan_draft_status and chat_session.plan_draft_status != 'accepted':
+        # The conversation moved on; a later "yes" should not pick up an outdated draft
+        _clear_plan_draft(chat_session)
+
+    if not plan_generated:
+        db.session.flush()
+        _commit_keeping_state()
+    message_ids = [m.id for m in history] + [m.id for m in turn]
+
+    if proposes:
+        try:
+            job_queue.submit('plan_draft', _draft_plan_for_session, session_id, ai_message.id,
+                             user_profile_data, user_id=user_id, ref=f'chat_message:{ai_message.id}')
+        except Exception as e:
+            db.session.rollback()
+            print('Warning: failed to schedule plan draft:', e)
+
+    try:
+        schedule_summary_update(chat_session, message_ids, has_more)
+    except Exception as e:
+        print('Warning: failed to schedule chat summary update:', e)
+
+    return ai_response, plan_generated
+
+
+def _sse_event(data, event=None):
+    payload = json.dumps(data, ensure_ascii=False)
+    return (f"event: {event}\n" if event else "") + f"data: {payload}\n\n"
+
 
 @bp.route('/api/chat', methods=['POST'])
 @login_required
@@ -594,88 +848,72 @@ def api_chat():
     if not user_input:
         return jsonify({'error': 'No message provided'}), 400
 
-    user_profile_data = None
-    if current_user.is_authenticated and current_user.profile:
-        user_profile_data = {
-            'name': current_user.profile.name,
-            'interests': current_user.profile.interests,
-            'user_type': current_user.profile.user_type
-        }
+    user_profile_data = prompt_profile()
 
     # Get or create chat session
-    if session_id:
-        try:
-            chat_session = ChatSession.query.get(session_id)
-            if not chat_session or chat_session.user_id != current_user.id:
-                return jsonify({'error': 'Invalid session ID'}), 400
-        except Exception as e:
-            return jsonify({'error': f'Error finding session: {e}'}), 500
+    chat_session, error = _get_or_create_chat_session(session_id)
+    if error:
+        return error
 
-    else:
-        chat_session = ChatSession(user_id=current_user.id)
-        db.session.add(chat_session)
-        db.session.commit()
-        session_id = chat_session.id # this code is added
+    # History is loaded once and shared by the prompt, plan extraction and the summary schedule
+    session_id = chat_session.id
+    history, has_more = load_turn_history(chat_session)
+    _release_connection()
+    ai_response = get_ai_response(user_input, user_profile_data, chat_session, history)
+    ai_response, plan_generated = _finalize_chat_turn(chat_session, user_input, ai_response, user_profile_data,
+                                                      history, has_more)
 
-    ai_response = get_ai_response(user_input, user_profile_data, chat_session)
+    return jsonify({'response': ai_response, 'html': markdown_renderer.render(ai_response),
+                    'session_id': session_id, 'plan_generated': plan_generated})
 
-    # Store messages in the database
-    user_message = ChatMessage(session_id=chat_session.id, sender='user', content=user_input)
-    ai_message = ChatMessage(session_id=chat_session.id, sender='ai', content=ai_response)
-    db.session.add(user_message)
-    db.session.add(ai_message)
-    db.session.commit()
 
-    # If user consented to generate a plan, extract goal/days and create it automatically
-    plan_generated = False
-    if _user_consented_to_plan(user_input):
-        # Build conversation text
-        msgs = ChatMessage.query.filter_by(session_id=chat_session.id).order_by(ChatMessage.timestamp.asc()).all()
-        convo = "\n".join([f"{m.sender.upper()}: {m.content}" for m in msgs])
-        goal, days = _extract_goal_days_from_history(convo, user_profile_data)
-        if goal:
-            plan_data = generate_career_plan_with_ai(user_profile_data, goal, days)
-            if plan_data:
-                try:
-                    # Deactivate existing active plan
-                    existing_active_plan = CareerPlan.query.filter_by(user_id=current_user.id, is_active=True).first()
-                    if existing_active_plan:
-                        existing_active_plan.is_active = False
-                        db.session.commit()
-
-                    new_plan = CareerPlan(
-                        user_id=current_user.id,
-                        career_goal=goal,
-                        created_date=datetime.utcnow(),
-                        last_updated=datetime.utcnow(),
-                        is_active=True
-                    )
-                    db.session.add(new_plan)
-                    db.session.commit()
-
-                    for day_task in plan_data:
-                        task = DailyTask(
-                            career_plan_id=new_plan.id,
-                            day_number=day_task['day'],
-                            task_description=day_task['task'],
-                            resources=json.dumps(day_task.get('resources') or [])
-                        )
-                        db.session.add(task)
-                    db.session.commit()
-
-                    chat_session.has_career_plan = True
-                    db.session.commit()
-                    plan_generated = True
-                    # Optionally append a short note
-                    note = "\n\nPlan created in your Tracker."
-                    ai_footer = ChatMessage(session_id=chat_session.id, sender='ai', content=note.strip())
-                    db.session.add(ai_footer)
-                    db.session.commit()
-                    ai_response = (ai_response + note).strip()
-                except Exception as e:
-                    db.session.rollback()
-
-    return jsonify({'response': ai_response, 'session_id': chat_session.id, 'plan_generated': plan_generated})
+@bp.route('/api/chat/stream', methods=['POST'])
+@login_required
+def api_chat_stream():
+    """Server-Sent Events variant of api_chat.
+
+    Emits a `session` event first, then one `data` event per text delta as
+    Gemini streams it, and a final `done` event carrying the same payload
+    api_chat returns. Messages are persisted once the stream completes.
+    """
+    data = request.get_json(silent=True) or {}
+    user_input = data.get('message')
+    session_id = data.get('session_id')
+
+    if not user_input:
+        return jsonify({'error': 'No message provided'}), 400
+
+    user_profile_data = prompt_profile()
+
+    chat_session, error = _get_or_create_chat_session(session_id)
+    if error:
+        return error
+
+    def generate():
+        session_id = chat_session.id
+        yield _sse_event({'session_id': session_id}, event='session')
+        parts = []
+        history, has_more = load_turn_history(chat_session)
+        _release_connection()
+        for piece in stream_ai_response(user_input, user_profile_data, chat_session, history):
+            parts.append(piece)
+            yield _sse_event({'delta': piece})
+        ai_response = ''.join(parts).strip()
+        try:
+            ai_response, plan_generated = _finalize_chat_turn(chat_session, user_input, ai_response, user_profile_data,
+                                                              history, has_more)
+        except Exception as e:
+            db.session.rollback()
+            yield _sse_event({'error': f'Error saving messages: {e}'}, event='error')
+            return
+        yield _sse_event({'response': ai_response, 'html': markdown_renderer.render(ai_response),
+                          'session_id': session_id, 'plan_generated': plan_generated}, event='done')
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @bp.route('/api/load_messages/<int:session_id>')
 @login_required
@@ -685,9 +923,17 @@ def load_messages(session_id):
         if not chat_session or chat_session.user_id != current_user.id:
             return jsonify({'error': 'Invalid session ID'}), 400
 
-        messages = ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp).all()
-        message_list = [{'sender': m.sender, 'content': m.content} for m in messages]
-        return jsonify({'messages': message_list})
+        before = request.args.get('before', type=int)
+        after = request.args.get('after', type=int)
+        limit = request.args.get('limit', type=int)
+        messages, has_more = _message_page(session_id, before=before, after=after, limit=limit)
+        message_list = [{'id': m.id, 'sender': m.sender, 'content': m.content, 'html': m.content_html} for m in messages]
+        return jsonify({
+            'messages': message_list,
+            'has_more': has_more,
+            'first_id': messages[0].id if messages else None,
+            'last_id': messages[-1].id if messages else None,
+        })
     except Exception as e:
         return jsonify({'error': f'Error loading messages: {e}'}), 500
 
@@ -741,16 +987,17 @@ def autoname_chat_session(session_id):
         msgs = ChatMessage.query.filter_by(session_id=session_id).order_by(ChatMessage.timestamp.desc()).limit(8).all()
         context = "\n".join(reversed([m.content for m in msgs]))
 
-        if not model:
+        if not ai_client.available:
             return jsonify({'success': False, 'error': 'AI not configured'}), 500
 
         prompt = (
             "Create a concise 3-6 word title for this chat that captures the main topic. "
             "No quotes, no punctuation at the end. Title case.\n\nConversation:\n" + context
         )
+        _release_connection()
         try:
-            resp = model.generate_content(prompt)
-            title = (resp.text or '').strip().splitlines()[0][:100]
+            lines = ai_client.generate_text(prompt).splitlines()
+            title = lines[0].strip()[:100] if lines else ''
         except Exception as e:
             return jsonify({'success': False, 'error': f'AI error: {e}'}), 500
 
@@ -765,19 +1012,47 @@ def autoname_chat_session(session_id):
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _load_tracker_plan(user_id):
+    """The user's active plan with its tasks (day order) in one query.
+
+    Falls back to their newest inactive plan so callers can tell "no active
+    plan" apart from "never had a plan" without a second query.
+    """
+    return (CareerPlan.query
+            .options(joinedload(CareerPlan.daily_tasks))
+            .filter(CareerPlan.user_id == user_id)
+            .order_by(CareerPlan.is_active.desc(), CareerPlan.id.desc())
+            .first())
+
+
 @bp.route('/tracker')
 @login_required
 def career_tracker():
-    # check has_career_plan flag from ChatSession, then allow 
-    #chat_session = ChatSession.query.filter_by(user_id=current_user.id, has_career_plan = True).first()
-    career_plan = CareerPlan.query.filter_by(user_id = current_user.id).first()
-    if not career_plan:
+    plan = _load_tracker_plan(current_user.id)
+    if not plan:
         flash('Please generate career path from chat window to get a personalized career plan.', 'danger')
         return redirect(url_for('career_advisor.chat_with_ai'))
 
-    current_plan = CareerPlan.query.filter_by(user_id=current_user.id, is_active=True).first()
+    current_plan = plan if plan.is_active else None
     return render_template('career_advisor/tracker.html', title='Career Tracker', current_plan=current_plan)
 
+
+@bp.route('/api/tracker')
+@login_required
+def api_tracker():
+    plan = _load_tracker_plan(current_user.id)
+    if not plan or not plan.is_active:
+        return jsonify({'plan': None, 'tasks': []})
+    return jsonify({
+        'plan': {
+            'id': plan.id,
+            'career_goal': plan.career_goal,
+            'created_date': plan.created_date.isoformat(),
+            'stats': plan.stats(),
+        },
+        'tasks': [t.to_dict() for t in plan.daily_tasks],
+    })
+
 @bp.route('/generate_plan', methods=['POST'])
 @login_required
 def generate_plan():
@@ -799,19 +1074,7 @@ def generate_plan():
             flash('Invalid session ID.', 'danger')
             return redirect(url_for('career_advisor.chat_with_ai'))
 
-    # Deactivate any existing active plan for the user
-    existing_active_plan = CareerPlan.query.filter_by(user_id=current_user.id, is_active=True).first()
-    if existing_active_plan:
-        existing_active_plan.is_active = False
-        db.session.commit()
-
-    user_profile_data = None
-    if current_user.is_authenticated and current_user.profile:
-        user_profile_data = {
-            'name': current_user.profile.name,
-            'interests': current_user.profile.interests,
-            'user_type': current_user.profile.user_type
-        }
+    user_profile_data = prompt_profile()
     
     days = None
     if days_raw:
@@ -820,34 +1083,19 @@ def generate_plan():
         except Exception:
             days = None
 
+    _release_connection()
     plan_data = generate_career_plan_with_ai(user_profile_data, career_goal, days)
 
+    saved = False
     if plan_data:
-        new_plan = CareerPlan(
-            user_id=current_user.id,
-            career_goal=career_goal,
-            created_date=datetime.utcnow(),
-            last_updated=datetime.utcnow(),
-            is_active=True
-        )
-        db.session.add(new_plan)
-        db.session.commit()
-
-        for day_task in plan_data:
-            task = DailyTask(
-                career_plan_id=new_plan.id,
-                day_number=day_task['day'],
-                task_description=day_task['task'],
-                resources=json.dumps(day_task.get('resources') or []) # Store resources as JSON string
-            )
-            db.session.add(task)
-        db.session.commit()
-
-        # Set has_career_plan to True in chat session, if applicable
-        if chat_session:
-            chat_session.has_career_plan = True
-            db.session.commit()
+        # Replaces the active plan and flags the chat session in one transaction
+        try:
+            save_career_plan(current_user.id, career_goal, plan_data, chat_session)
+            saved = True
+        except Exception as e:
+            print('Error saving career plan:', e)
 
+    if saved:
         flash('Your personalized career plan has been generated!', 'success')
     else:
         flash('Failed to generate career plan. Please try again.', 'danger')
@@ -875,19 +1123,7 @@ def api_generate_career_plan():
             if not chat_session or chat_session.user_id != current_user.id:
                 return jsonify({'success': False, 'error': 'Invalid session ID'}), 400
 
-        # Deactivate existing active plan
-        existing_active_plan = CareerPlan.query.filter_by(user_id=current_user.id, is_active=True).first()
-        if existing_active_plan:
-            existing_active_plan.is_active = False
-            db.session.commit()
-
-        user_profile_data = None
-        if current_user.is_authenticated and current_user.profile:
-            user_profile_data = {
-                'name': current_user.profile.name,
-                'interests': current_user.profile.interests,
-                'user_type': current_user.profile.user_type
-            }
+        user_profile_data = prompt_profile()
 
         # sanitize days
         safe_days = None
@@ -897,34 +1133,12 @@ def api_generate_career_plan():
         except Exception:
             safe_days = None
 
+        _release_connection()
         plan_data = generate_career_plan_with_ai(user_profile_data, career_goal, safe_days)
         if not plan_data:
             return jsonify({'success': False, 'error': 'Failed to generate career plan. Please try again.'}), 500
 
-        new_plan = CareerPlan(
-            user_id=current_user.id,
-            career_goal=career_goal,
-            created_date=datetime.utcnow(),
-            last_updated=datetime.utcnow(),
-            is_active=True
-        )
-        db.session.add(new_plan)
-        db.session.commit()
-
-        for day_task in plan_data:
-            task = DailyTask(
-                career_plan_id=new_plan.id,
-                day_number=day_task['day'],
-                task_description=day_task['task'],
-                resources=json.dumps(day_task.get('resources') or [])
-            )
-            db.session.add(task)
-        db.session.commit()
-
-        if chat_session:
-            chat_session.has_career_plan = True
-            db.session.commit()
-
+        new_plan = save_career_plan(current_user.id, career_goal, plan_data, chat_session)
         return jsonify({'success': True, 'plan_id': new_plan.id})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -955,12 +1169,50 @@ def complete_task(task_id):
         flash('You are not authorized to complete this task.', 'danger')
         return redirect(url_for('career_advisor.career_tracker'))
 
-    task.is_completed = True
-    task.completed_date = datetime.utcnow()
+    set_task_completion(task.career_plan, task, True)
     db.session.commit()
     flash('Task marked as complete!', 'success')
     return redirect(url_for('career_advisor.career_tracker'))
 
+@bp.route('/api/tasks/completion', methods=['POST'])
+@login_required
+def api_update_tasks():
+    """Mark several tasks complete or open at once.
+
+    Body: {"updates": [{"id": <task id>, "completed": true|false}, ...]}; a
+    later entry for the same id wins. Returns the updated tasks and the
+    aggregates of every plan they belong to.
+    """
+    payload = request.get_json(silent=True) or {}
+    updates = {}
+    for item in payload.get('updates') or []:
+        try:
+            updates[int(item['id'])] = bool(item.get('completed', True))
+        except (TypeError, KeyError, ValueError):
+            return jsonify({'success': False, 'error': 'Each update needs an integer id'}), 400
+    if not updates:
+        return jsonify({'success': False, 'error': 'No updates provided'}), 400
+    if len(updates) > MAX_TASK_BATCH:
+        return jsonify({'success': False, 'error': f'At most {MAX_TASK_BATCH} tasks per request'}), 400
+
+    try:
+        plans, tasks = apply_task_updates(current_user.id, updates)
+        # Serialize before committing so the response needs no reloads
+        result = {
+            'success': True,
+            'plans': {str(p.id): p.stats() for p in plans},
+            'tasks': [t.to_dict() for t in tasks],
+        }
+        db.session.commit()
+    except LookupError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'error': 'Task not found', 'missing': e.args[0]}), 404
+    except Exception as e:
+        db.session.rollback()
+        print('Error updating tasks:', e)
+        return jsonify({'success': False, 'error': 'Could not update tasks'}), 500
+    return jsonify(result)
+
 @bp.route('/tailor_resume', methods=['GET', 'POST'])
 @login_required
 def tailor_resume():
@@ -973,13 +1225,10 @@ def tailor_resume():
         return redirect(url_for('profile.edit_profile'))
 
     # Also ensure we have some content (either extracted JSON or fallback by extracting now)
-    extracted_text = _load_extracted_resume_text(current_user.id)
-    if not extracted_text:
-        # Attempt to extract directly from the stored PDF
-        extracted_text = _extract_text_from_pdf(current_user.profile.resume_path)
-        if not extracted_text:
-            flash('Your resume could not be processed. Please re-upload your PDF.', 'danger')
-            return redirect(url_for('profile.edit_profile'))
+    sections = _load_resume_sections(current_user.id)
+    if not sections:
+        flash('Your resume could not be processed. Please re-upload your PDF.', 'danger')
+        return redirect(url_for('profile.edit_profile'))
 
     tailoring_suggestions = None
     if request.method == 'POST':
@@ -988,15 +1237,65 @@ def tailor_resume():
             flash('Please provide a job description.', 'danger')
             return redirect(url_for('career_advisor.tailor_resume'))
 
-        user_profile_data = None
-        if current_user.profile:
-            user_profile_data = {
-                'name': current_user.profile.name,
-                'interests': current_user.profile.interests,
-                'user_type': current_user.profile.user_type
-            }
-
-        tailoring_suggestions = tailor_resume_with_ai(extracted_text, job_description, user_profile_data)
-        if not tailoring_suggestions:
-            flash('Failed to get resume tailoring suggestions. Please try again.', 'danger')
+        user_profile_data = prompt_profile()
+
+        # One concurrent call per resume section
+        _release_connection()
+        tailoring_suggestions = tailor_resume_with_ai(
+            sections, job_description, user_profile_data,
+            current_app.config['TAILOR_MAX_PARALLEL_SECTIONS'], current_app.config['TAILOR_TOP_K_BULLETS']
+        )
+        if 'edits' not in tailoring_suggestions:
+            if ai_client.available:
+                flash('Failed to get resume tailoring suggestions. Please try again.', 'danger')
+            else:
+                flash('AI suggestions are unavailable right now; the keyword report below still applies.', 'warning')
     return render_template('career_advisor/tailor_resume.html', title='Resume Tailoring', suggestions=tailoring_suggestions)
+
+
+@bp.route('/api/tailor_resume/stream', methods=['POST'])
+@login_required
+def api_tailor_resume_stream():
+    """Server-Sent Events variant of tailor_resume.
+
+    Emits an `ats` event right away with the local keyword coverage report,
+    then one `section` event per resume section as its suggestions complete
+    (edits carry pre-rendered `*_html` fields), and a `done` event with the
+    merged summary and edits in resume order.
+    """
+    data = request.get_json(silent=True) or {}
+    job_description = (data.get('job_description') or '').strip()
+    if not job_description:
+        return jsonify({'error': 'Please provide a job description.'}), 400
+    if not current_user.profile:
+        return jsonify({'error': 'Please create your profile first.'}), 400
+    sections = _load_resume_sections(current_user.id)
+    if not sections:
+        return jsonify({'error': 'Your resume could not be processed. Please re-upload your PDF.'}), 400
+    user_profile_data = prompt_profile()
+    max_workers = current_app.config['TAILOR_MAX_PARALLEL_SECTIONS']
+    analysis = analyze_match(sections, job_description, current_app.config['TAILOR_TOP_K_BULLETS'])
+    _release_connection()
+
+    def generate():
+        yield _sse_event(analysis['coverage'], event='ats')
+        if not ai_client.available:
+            yield _sse_event({'error': 'AI suggestions are unavailable right now; the keyword report above still applies.'},
+                             event='error')
+            return
+        results = []
+        for result in iter_tailored_sections(sections, job_description, user_profile_data, max_workers, analysis):
+            results.append(result)
+            yield _sse_event({'section': result['section'], 'summary': result['summary'],
+                              'edits': render_edits(result['edits'])}, event='section')
+        if not results:
+            yield _sse_event({'error': 'Failed to get resume tailoring suggestions. Please try again.'}, event='error')
+            return
+        merged = merge_tailoring(results, sections)
+        yield _sse_event({'summary': merged['summary'], 'edits': render_edits(merged['edits'])}, event='done')
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
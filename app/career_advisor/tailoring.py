@@ -0,0 +1,222 @@
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from app import ai_client, markdown_renderer
+from app.ai.jsonstream import parse_json_text
+from app.career_advisor.matching import keyword_coverage, rank_keywords, select_bullets, BULLET_SECTIONS
+from app.profile.resume_sections import SECTION_TITLES, TAILOR_SECTIONS
+
+# Short sections that are always sent whole; other sections only contribute
+# the bullets the local matcher picked
+FULL_SECTIONS = ('summary', 'skills')
+
+TAILOR_GENERATION_CONFIG = {"response_mime_type": "application/json"}
+
+_REQUIREMENT_RE = re.compile(
+    r"(experience|proficien|knowledge|familiar|required|must|years|degree|ability to|hands-on|expertise)",
+    re.IGNORECASE,
+)
+
+
+def condense_job_description(job_description, max_keywords=40, max_requirements=12):
+    """Reduce a job description to its keywords and requirement lines.
+
+    Section prompts are sent once per resume section, so they carry this
+    condensed form rather than the full posting.
+    """
+    text = job_description or ''
+    keywords = [label for _, label in rank_keywords(text, max_keywords)]
+
+    requirements = []
+    for line in text.split('\n'):
+        line = re.sub(r'^\s*(?:[•●▪*\-–]+|\d+[.)])\s*', '', line).strip()
+        if len(line) > 20 and _REQUIREMENT_RE.search(line):
+            requirements.append(line[:200])
+            if len(requirements) >= max_requirements:
+                break
+
+    parts = [f"Keywords: {', '.join(keywords)}"]
+    if requirements:
+        parts.append("Key requirements:\n" + "\n".join(f"- {r}" for r in requirements))
+    return "\n".join(parts)
+
+
+def _build_section_prompt(title, section_text, condensed_jd, user_profile, missing_keywords=None):
+    prompt_parts = [
+        f"You are an expert resume analyst and career coach. Improve only the {title} section of a resume "
+        "for the job below (for long sections you are given just the lines most relevant to the job). "
+        "Return ONLY a JSON object (no markdown) with the following shape: ",
+        "{ \"summary\": string, \"edits\": [ { \"original\": string, \"suggested\": string, \"reason\": string } ] }.",
+        "- `summary`: one sentence on how well this section matches the job.",
+        "- `original`: the exact sentence or bullet from the section to improve.",
+        "- `suggested`: a rewritten version aligned to the job description and best practices.",
+        "- `reason`: brief rationale (keywords added, quantified impact, clarity, ATS, etc.).",
+        "Return at most 5 edits; an empty list is fine if the section is already strong."
+    ]
+    if user_profile:
+        prompt_parts.append(f"The user's name is {user_profile.get('name', 'there')}. ")
+        if user_profile.get('user_type'):
+            prompt_parts.append(f"They are a {user_profile.get('user_type')}. ")
+        if user_profile.get('interests'):
+            prompt_parts.append(f"Their interests include: {user_profile.get('interests')}. ")
+    if missing_keywords:
+        prompt_parts.append(
+            "Job keywords the resume does not mention yet (work in only those the user's experience supports): "
+            + ", ".join(missing_keywords) + "."
+        )
+    prompt_parts.append(
+        f"\n\nJob (condensed):\n{condensed_jd}\n\n{title} section:\n{section_text}\n\n"
+        "Ensure edits are sentence-level and actionable. Output strictly valid JSON."
+    )
+    return " ".join(prompt_parts)
+
+
+def _normalize_tailoring(data):
+    # normalize to expected shape
+    edits = data.get('edits') or []
+    normalized_edits = []
+    for e in edits:
+        if not isinstance(e, dict):
+            continue
+        section = (e.get('section') or '').strip()
+        original = (e.get('original') or '').strip()
+        suggested = (e.get('suggested') or '').strip()
+        reason = (e.get('reason') or '').strip()
+        if section and suggested:
+            normalized_edits.append({
+                'section': section,
+                'original': original,
+                'suggested': suggested,
+                'reason': reason
+            })
+    # backward-compat: if older 'points' shape, convert minimally
+    if not normalized_edits and data.get('points'):
+        for p in data['points']:
+            heading = (p.get('heading') or '').strip()
+            details = (p.get('details') or '').strip()
+            if heading and details:
+                normalized_edits.append({
+                    'section': heading,
+                    'original': '',
+                    'suggested': details,
+                    'reason': ''
+                })
+    return {
+        'summary': (data.get('summary') or '').strip(),
+        'edits': normalized_edits
+    }
+
+
+def _salvage_edits(raw):
+    """Edits that completed before the reply was cut off inside the `edits` array."""
+    start = raw.find('"edits"')
+    start = raw.find('[', start) if start != -1 else -1
+    if start == -1:
+        return []
+    items = parse_json_text(raw[start:], expect=list)
+    return items if isinstance(items, list) else []
+
+
+def tailor_section(name, section_text, condensed_jd, user_profile, missing_keywords=None):
+    """Suggestions for one section: {'name', 'section', 'summary', 'edits'}, or None on failure."""
+    title = SECTION_TITLES.get(name, name.title())
+    try:
+        raw = ai_client.generate_text(
+            _build_section_prompt(title, section_text, condensed_jd, user_profile, missing_keywords),
+            TAILOR_GENERATION_CONFIG,
+            cache_if=lambda t: isinstance(parse_json_text(t, allow_partial=False, expect=dict), dict)
+        )
+        data = parse_json_text(raw, expect=dict)
+        if not isinstance(data, dict):
+            raise ValueError('Model did not return a JSON object')
+        if 'edits' not in data:
+            data['edits'] = _salvage_edits(raw)
+        for edit in data.get('edits') or []:
+            if isinstance(edit, dict):
+                edit['section'] = title
+        result = _normalize_tailoring(data)
+    except Exception as e:
+        print(f'Error tailoring resume section {title}:', e)
+        return None
+    result.update(name=name, section=title)
+    return result
+
+
+def analyze_match(sections, job_description, top_k=8):
+    """Instant, model-free match report: keyword coverage plus the bullets worth rewriting."""
+    return {
+        'coverage': keyword_coverage(sections, job_description),
+        'bullets': select_bullets(sections, job_description, top_k),
+    }
+
+
+def _section_work(sections, analysis):
+    """(section name, text to send) for every section that gets a model call.
+
+    When the matcher picked no bullets (no recognized headings, or nothing
+    overlapping the job), every section is sent whole instead, 'other' included.
+    """
+    picked = {}
+    for bullet in analysis['bullets']:
+        picked.setdefault(bullet['section'], []).append(f"- {bullet['text']}")
+    if not picked:
+        return [(name, sections[name]) for name in TAILOR_SECTIONS
+                if len((sections.get(name) or '').strip()) >= 20]
+    work = []
+    for name in sections:
+        if name in FULL_SECTIONS and len(sections[name]) >= 20:
+            work.append((name, sections[name]))
+        elif name in BULLET_SECTIONS and name in picked:
+            work.append((name, '\n'.join(picked[name])))
+    return work
+
+
+def iter_tailored_sections(sections, job_description, user_profile, max_workers=6, analysis=None):
+    """Tailor each relevant section concurrently, yielding results as they complete.
+
+    Pass the `analyze_match` result as `analysis` when it has already been
+    computed (e.g. to show it before the model calls finish).
+    """
+    analysis = analysis or analyze_match(sections, job_description)
+    work = _section_work(sections, analysis)
+    if not work:
+        return
+    condensed_jd = condense_job_description(job_description)
+    missing = analysis['coverage']['missing']
+    with ThreadPoolExecutor(max_workers=max(1, min(len(work), max_workers)),
+                            thread_name_prefix='tailor-section') as pool:
+        futures = [pool.submit(tailor_section, name, text, condensed_jd, user_profile, missing)
+                   for name, text in work]
+        for future in as_completed(futures):
+            result = future.result()
+            if result is not None:
+                yield result
+
+
+def merge_tailoring(results, sections):
+    """Merge per-section results back into one {'summary', 'edits'} in resume order."""
+    order = {name: i for i, name in enumerate(sections)}
+    results = sorted(results, key=lambda r: order.get(r['name'], len(order)))
+    return {
+        'summary': ' '.join(f"{r['section']}: {r['summary']}" for r in results if r['summary']),
+        'edits': [e for r in results for e in r['edits']],
+    }
+
+
+def render_edits(edits):
+    """Edits with their markdown pre-rendered, for the streaming client."""
+    return [dict(e, **{f'{k}_html': markdown_renderer.render(e[k]) for k in ('original', 'suggested', 'reason')})
+            for e in edits]
+
+
+def tailor_resume_with_ai(sections, job_description, user_profile, max_workers=6, top_k=8):
+    """{'summary', 'edits', 'ats'}; just {'ats'} when the model is unavailable or every call failed."""
+    analysis = analyze_match(sections, job_description, top_k)
+    if not ai_client.available:
+        return {'ats': analysis['coverage']}
+    results = list(iter_tailored_sections(sections, job_description, user_profile, max_workers, analysis))
+    if not results:
+        return {'ats': analysis['coverage']}
+    merged = merge_tailoring(results, sections)
+    merged['ats'] = analysis['coverage']
+    return merged
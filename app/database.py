@@ -0,0 +1,69 @@
+"""Database engine setup per backend.
+
+SQLite (the default) gets the pragmas in SQLITE_PRAGMAS on every new
+connection: WAL lets readers carry on while one worker writes, and
+busy_timeout makes a second writer wait for the lock instead of failing with
+"database is locked". PostgreSQL (DATABASE_URL=postgresql://...) gets a
+bounded pool (DB_POOL_SIZE + DB_MAX_OVERFLOW per worker) with pre-ping.
+With gunicorn's preload_app, `dispose_engines` runs in each worker after
+the fork so no worker reuses a connection opened by the master.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+from app import db
+
+
+def engine_options(config):
+    """SQLAlchemy engine options for the configured database backend."""
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = {}
+    if url.get_backend_name() == 'sqlite':
+        if url.database in (None, '', ':memory:'):
+            return options  # Flask-SQLAlchemy shares one connection for in-memory databases
+        busy_ms = int(config['SQLITE_PRAGMAS'].get('busy_timeout', 5000))
+        options['connect_args'] = {'timeout': busy_ms / 1000}
+        # SQLite connections are cheap and writes are serialized by the
+        # database lock, so let the pool grow with the number of threads
+        options['pool_size'] = config['DB_POOL_SIZE']
+        options['max_overflow'] = -1
+    else:
+        options['pool_size'] = config['DB_POOL_SIZE']
+        options['max_overflow'] = config['DB_MAX_OVERFLOW']
+        options['pool_recycle'] = config['DB_POOL_RECYCLE']
+        options['pool_timeout'] = config['DB_POOL_TIMEOUT']
+        # Connections dropped by the server or a proxy are replaced instead of failing a request
+        options['pool_pre_ping'] = config['DB_POOL_PRE_PING']
+    return options
+
+
+def _sqlite_pragma_listener(pragmas):
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
+    return set_pragmas
+
+
+def init_database(app):
+    """Configure the engine for the app's backend and initialize Flask-SQLAlchemy."""
+    options = engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    db.init_app(app)
+
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite' and app.config['SQLITE_PRAGMAS']:
+            event.listen(engine, 'connect', _sqlite_pragma_listener(dict(app.config['SQLITE_PRAGMAS'])))
+
+
+def dispose_engines(app):
+    """Drop pooled connections inherited from the parent process (call in a forked worker)."""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
@@ -0,0 +1,147 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, Integer, exists, insert, literal, select
+from sqlalchemy.exc import SQLAlchemyError
+
+STALE_JOB_ERROR = 'Interrupted: the worker running this job stopped. Please try again.'
+
+
+class JobQueue:
+    """In-process background job runner with job status persisted in the database.
+
+    Jobs run on a thread pool inside the worker process, so no external broker
+    is needed. Each job gets a BackgroundJob row that pages can poll. The pool
+    is created lazily per process so gunicorn's preload/fork model does not
+    share executor threads across workers. Set JOB_QUEUE_EAGER to run jobs
+    inline instead (useful for local debugging).
+
+    A job whose worker died (restart, crash, deploy) stays queued or running
+    in the database; once it is older than JOB_TIMEOUT seconds it is marked
+    failed at startup or when it is next polled, so pages stop waiting for it.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('JOB_QUEUE_WORKERS', 2)
+        app.config.setdefault('JOB_QUEUE_EAGER', False)
+        app.config.setdefault('JOB_TIMEOUT', 300)
+        app.extensions['job_queue'] = self
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.app.config['JOB_QUEUE_WORKERS'],
+                    thread_name_prefix='job-worker'
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def submit(self, kind, func, *args, user_id=None, ref=None, once=False, **kwargs):
+        """Record a queued job and schedule `func(*args, **kwargs)` to run in the background.
+
+        `func` runs inside an application context and should raise on failure.
+        `ref` names what the job works on. With `once`, nothing is queued while
+        a `kind` job for the same `ref` is still pending (checked in the same
+        INSERT, so concurrent callers cannot both queue one). Returns the job
+        id, or None when nothing was queued.
+        """
+        from app import db
+        from app.models import BackgroundJob
+
+        if once:
+            pending = exists().where(BackgroundJob.kind == kind, BackgroundJob.ref == ref,
+                                     BackgroundJob.status.in_(('queued', 'running')),
+                                     BackgroundJob.created_date >= self._stale_before())
+            row = select(literal(kind), literal(user_id, Integer), literal(ref), literal('queued'),
+                         literal(datetime.utcnow(), DateTime)).where(~pending)
+            job_id = db.session.execute(
+                insert(BackgroundJob)
+                .from_select(['kind', 'user_id', 'ref', 'status', 'created_date'], row)
+                .returning(BackgroundJob.id)
+            ).scalar()
+        else:
+            job = BackgroundJob(kind=kind, user_id=user_id, ref=ref, status='queued')
+            db.session.add(job)
+            db.session.flush()
+            job_id = job.id  # read before the commit expires it
+        db.session.commit()
+        if job_id is None:
+            return None
+
+        if self.app.config['JOB_QUEUE_EAGER']:
+            self._run(job_id, func, args, kwargs)
+        else:
+            self._get_executor().submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _stale_before(self):
+        return datetime.utcnow() - timedelta(seconds=self.app.config['JOB_TIMEOUT'])
+
+    def expire_if_stale(self, job):
+        """Mark `job` failed if it is still pending past JOB_TIMEOUT; returns the job."""
+        from app import db
+
+        if job is not None and job.is_pending and job.created_date < self._stale_before():
+            job.status = 'failed'
+            job.error = STALE_JOB_ERROR
+            job.finished_date = datetime.utcnow()
+            db.session.commit()
+        return job
+
+    def fail_stale_jobs(self):
+        """Mark every job still pending past JOB_TIMEOUT as failed (run at startup)."""
+        from app import db
+        from app.models import BackgroundJob
+
+        try:
+            count = (BackgroundJob.query
+                     .filter(BackgroundJob.status.in_(('queued', 'running')),
+                             BackgroundJob.created_date < self._stale_before())
+                     .update({'status': 'failed', 'error': STALE_JOB_ERROR, 'finished_date': datetime.utcnow()},
+                             synchronize_session=False))
+            db.session.commit()
+        except SQLAlchemyError as e:
+            # e.g. the schema has not been migrated yet
+            db.session.rollback()
+            print('Could not check for interrupted background jobs:', e)
+            return 0
+        if count:
+            print(f'Marked {count} interrupted background job(s) as failed.')
+        return count
+
+    def _run(self, job_id, func, args, kwargs):
+        from app import db
+        from app.models import BackgroundJob
+
+        with self.app.app_context():
+            job = BackgroundJob.query.get(job_id)
+            if not job:
+                return
+            job.status = 'running'
+            job.started_date = datetime.utcnow()
+            db.session.commit()
+            try:
+                func(*args, **kwargs)
+                job = BackgroundJob.query.get(job_id)
+                job.status = 'succeeded'
+            except Exception as e:
+                db.session.rollback()
+                print(f'Background job {job_id} failed:', e)
+                job = BackgroundJob.query.get(job_id)
+                job.status = 'failed'
+                job.error = str(e)[:500]
+            job.finished_date = datetime.utcnow()
+            db.session.commit()
+            db.session.remove()
@@ -1,6 +1,10 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from app import db, login_manager
 from flask_login import UserMixin
+from sqlalchemy.dialects.postgresql import JSONB
+
+# JSON documents: JSONB on PostgreSQL (indexable, stored parsed), JSON/TEXT elsewhere
+JSONType = db.JSON().with_variant(JSONB(), 'postgresql')
 
 
 class User(db.Model, UserMixin):
@@ -40,7 +44,40 @@ class CareerPlan(db.Model):
     created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     last_updated = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, nullable=False, default=True)
-    daily_tasks = db.relationship('DailyTask', backref='career_plan', lazy=True)
+    daily_tasks = db.relationship('DailyTask', backref='career_plan', lazy=True, order_by='DailyTask.day_number')
+    # Progress aggregates, kept current by app.career_advisor.plans on every task change
+    total_tasks = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    completed_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    streak = db.Column(db.Integer, nullable=False, default=0, server_default='0') # consecutive days with a completion, ending last_completed_on
+    last_completed_on = db.Column(db.Date)
+    next_due_day = db.Column(db.Integer) # lowest day_number still open; None when everything is done
+
+    __table_args__ = (
+        db.Index('ix_career_plan_user_active', 'user_id', 'is_active'),
+        # At most one active plan per user
+        db.Index('uq_career_plan_one_active', 'user_id', unique=True,
+                 sqlite_where=db.text('is_active = 1'), postgresql_where=db.text('is_active')),
+    )
+
+    @property
+    def percent_done(self):
+        return round(100 * self.completed_count / self.total_tasks) if self.total_tasks else 0
+
+    @property
+    def current_streak(self):
+        # A streak survives until a full day passes without a completion
+        if not self.last_completed_on or self.last_completed_on < datetime.utcnow().date() - timedelta(days=1):
+            return 0
+        return self.streak
+
+    def stats(self):
+        return {
+            'total_tasks': self.total_tasks,
+            'completed_count': self.completed_count,
+            'percent_done': self.percent_done,
+            'streak': self.current_streak,
+            'next_due_day': self.next_due_day,
+        }
 
     def __repr__(self):
         return f"CareerPlan(User ID: {self.user_id}, Goal: '{self.career_goal}', Active: {self.is_active})"
@@ -51,10 +88,24 @@ class DailyTask(db.Model):
     career_plan_id = db.Column(db.Integer, db.ForeignKey('career_plan.id'), nullable=False)
     day_number = db.Column(db.Integer, nullable=False)
     task_description = db.Column(db.Text, nullable=False)
-    resources = db.Column(db.Text)
+    resources = db.Column(JSONType) # list of resource strings
     is_completed = db.Column(db.Boolean, nullable=False, default=False)
     completed_date = db.Column(db.DateTime)
 
+    __table_args__ = (
+        db.Index('ix_daily_task_plan_day', 'career_plan_id', 'day_number'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'day': self.day_number,
+            'task': self.task_description,
+            'resources': self.resources or [],
+            'is_completed': self.is_completed,
+            'completed_date': self.completed_date.isoformat() if self.completed_date else None,
+        }
+
     def __repr__(self):
         return f"DailyTask(Plan ID: {self.career_plan_id}, Day {self.day_number}, Completed: {self.is_completed})"
 
@@ -65,7 +116,17 @@ class ChatSession(db.Model):
     created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     messages = db.relationship('ChatMessage', backref='chat_session', lazy=True)
     has_career_plan = db.Column(db.Boolean, nullable=False, default=False) # flag to verify tracker is created or not
-
+    history_summary = db.Column(db.Text) # rolling summary of messages older than the verbatim window
+    summarized_through_id = db.Column(db.Integer, nullable=False, default=0, server_default='0') # last ChatMessage.id folded into history_summary
+    # Plan drafted in the background when the AI proposes one ({'goal', 'days', 'items'}),
+    # so the user's "yes" only has to save it
+    plan_draft = db.Column(JSONType)
+    plan_draft_status = db.Column(db.String(20)) # None, 'pending', 'ready', 'failed' or 'accepted' (consented to while pending)
+    plan_draft_message_id = db.Column(db.Integer) # AI message whose proposal the draft answers
+
+    __table_args__ = (
+        db.Index('ix_chat_session_user_created', 'user_id', 'created_date'),
+    )
 
     def __repr__(self):
         return f"ChatSession(User ID: {self.user_id}, Created: {self.created_date})"
@@ -76,6 +137,68 @@ class ChatMessage(db.Model):
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     sender = db.Column(db.String(50), nullable=False)  # 'user' or 'ai'
     content = db.Column(db.Text, nullable=False)
+    content_html = db.Column(db.Text)  # sanitized markdown render of AI replies, set at write time
+
+    __table_args__ = (
+        db.Index('ix_chat_message_session_timestamp', 'session_id', 'timestamp'),
+        db.Index('ix_chat_message_session_id', 'session_id', 'id'),
+    )
 
     def __repr__(self):
         return f"ChatMessage(Session ID: {self.session_id}, Sender: {self.sender}, Time: {self.timestamp})"
+
+class BackgroundJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    kind = db.Column(db.String(50), nullable=False)  # e.g. 'parse_resume'
+    ref = db.Column(db.String(64))  # what the job works on, e.g. 'chat_session:12'; lets callers avoid duplicates
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, succeeded, failed
+    error = db.Column(db.Text)
+    created_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_date = db.Column(db.DateTime)
+    finished_date = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_background_job_user_kind', 'user_id', 'kind', 'id'),
+        db.Index('ix_background_job_kind_ref', 'kind', 'ref'),
+    )
+
+    @property
+    def is_pending(self):
+        return self.status in ('queued', 'running')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'error': self.error,
+            'created_date': self.created_date.isoformat() if self.created_date else None,
+            'finished_date': self.finished_date.isoformat() if self.finished_date else None,
+        }
+
+    def __repr__(self):
+        return f"BackgroundJob(ID: {self.id}, Kind: {self.kind}, Status: {self.status})"
+
+
+class ResumeDocument(db.Model):
+    """One uploaded version of a user's resume; the highest version is current."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    sha256 = db.Column(db.String(64)) # of the PDF; None for resumes imported without their PDF
+    # The text is the bulk of a row, so it is only loaded when asked for
+    extracted_text = db.deferred(db.Column(db.Text, nullable=False, default=''), group='content')
+    sections = db.deferred(db.Column(JSONType), group='content') # {section name: text}; None until the text is extracted
+    parsed = db.Column(JSONType) # AI-extracted fields (name, email, skills, ...)
+    parse_status = db.Column(db.String(20), nullable=False, default='pending') # pending, done, failed
+    uploaded_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    parsed_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('uq_resume_document_user_version', 'user_id', 'version', unique=True),
+        db.Index('ix_resume_document_sha256', 'sha256'),
+    )
+
+    def __repr__(self):
+        return f"ResumeDocument(User: {self.user_id}, Version: {self.version}, Parse: {self.parse_status})"
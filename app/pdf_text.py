@@ -0,0 +1,222 @@
+"""PDF text extraction shared by resume uploads and resume tailoring.
+
+Pages are extracted with PyPDF2 by default (about twice as fast as pdfminer on
+typical resumes); set PDF_BACKEND=pdfminer for its layout-preserving output.
+Extraction runs in a shared process pool, bounded by PDF_MAX_PAGES pages and
+PDF_EXTRACT_TIMEOUT seconds per document. Documents with at least
+PDF_PARALLEL_MIN_PAGES pages are split into page ranges that run in parallel;
+smaller ones are a single task. The deadline is enforced inside the workers
+(an interval timer interrupts the page being read), so a pathological PDF only
+loses its own remaining pages and never disturbs other documents in the pool.
+`iter_pages` yields each page as soon as it and every page before it are
+done. The only caller today is `extract_text`, which joins them: the resume
+parse needs the section split of the whole document, so it does not start
+on partial text. Workers are spawned processes that re-import the launching
+script, which is why `main.py` creates its app lazily.
+"""
+
+import math
+import multiprocessing
+import os
+import re
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app, has_app_context
+
+_DEFAULTS = {
+    'PDF_BACKEND': 'pypdf2',
+    'PDF_EXTRACT_WORKERS': 2,
+    'PDF_EXTRACT_TIMEOUT': 20,
+    'PDF_MAX_PAGES': 30,
+    'PDF_PARALLEL_MIN_PAGES': 4,
+}
+
+# Extra wait past the deadline for a worker to hand back what it extracted
+_RESULT_GRACE = 2.0
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _setting(name):
+    if has_app_context():
+        return current_app.config.get(name, _DEFAULTS[name])
+    return _DEFAULTS[name]
+
+
+def _get_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # spawn, not fork: the web worker is multi-threaded
+            _pool = ProcessPoolExecutor(
+                max_workers=max(1, int(_setting('PDF_EXTRACT_WORKERS'))),
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def _reset_pool(pool):
+    """Forget a pool that broke (a worker crashed) so the next document gets a fresh one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _page_count(path):
+    from PyPDF2 import PdfReader
+    return len(PdfReader(path).pages)
+
+
+class _DeadlineReached(Exception):
+    pass
+
+
+def _on_deadline(signum, frame):
+    raise _DeadlineReached()
+
+
+def _iter_range(path, start, stop, backend):
+    if backend == 'pdfminer':
+        from pdfminer.high_level import extract_pages
+        from pdfminer.layout import LTTextContainer
+        count = 0
+        for layout in extract_pages(path, page_numbers=range(start, stop)):
+            yield ''.join(el.get_text() for el in layout if isinstance(el, LTTextContainer))
+            count += 1
+        for _ in range(count, stop - start):
+            yield ''  # past the end of a document whose page count was unknown
+        return
+
+    from PyPDF2 import PdfReader
+    reader = PdfReader(path)
+    for page in reader.pages[start:stop]:
+        try:
+            yield page.extract_text() or ''
+        except Exception:
+            yield ''
+
+
+def _extract_range(path, start, stop, backend, deadline=None):
+    """Raw text of pages [start, stop), or of the pages read before `deadline` (a time.time() value).
+
+    Runs in pool workers, so it must stay importable. Tasks run on the
+    worker's main thread, where an interval timer can interrupt a page that
+    never finishes; elsewhere the deadline is checked between pages.
+    """
+    texts = []
+    timer = (deadline is not None and hasattr(signal, 'setitimer')
+             and threading.current_thread() is threading.main_thread())
+    if deadline is not None and deadline <= time.time():
+        return texts
+    if timer:
+        previous = signal.signal(signal.SIGALRM, _on_deadline)
+        signal.setitimer(signal.ITIMER_REAL, deadline - time.time())
+    try:
+        for text in _iter_range(path, start, stop, backend):
+            texts.append(text)
+            if deadline is not None and time.time() >= deadline and len(texts) < stop - start:
+                break
+    except _DeadlineReached:
+        pass
+    finally:
+        if timer:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    return texts
+
+
+def _looks_word_per_line(text):
+    lines = text.split('\n')
+    if len(lines) < 20:
+        return False
+    blank = sum(1 for line in lines if not line.strip())
+    words = sum(len(line.split()) for line in lines)
+    return blank / len(lines) > 0.3 and words / max(1, len(lines) - blank) < 2
+
+
+def normalize_text(text):
+    """Tidy extracted text.
+
+    PyPDF2 emits some PDFs one word per line with whitespace-only lines in
+    between; those are rejoined into lines (one separator line is a space,
+    two or more a line break). Runs of spaces and blank lines are collapsed.
+    """
+    if not text:
+        return ''
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    if _looks_word_per_line(text):
+        tokens = re.split(r'((?:\n[ \t]*)+\n)', text)
+        parts = []
+        for i, token in enumerate(tokens):
+            if i % 2:
+                parts.append('\n' if token.count('\n') > 2 else ' ')
+            else:
+                parts.append(token.strip())
+        text = ''.join(parts)
+        # Bullets start a new line even when the separator did not say so
+        text = re.sub(r'\s*([●•▪])\s*', r'\n\1 ', text)
+    text = re.sub(r'[ \t]+', ' ', text)
+    text = '\n'.join(line.strip() for line in text.split('\n'))
+    text = re.sub(r'\n{3,}', '\n\n', text)
+    return text.strip()
+
+
+def iter_pages(path):
+    """Yield normalized page texts in page order, as soon as each is available."""
+    backend = _setting('PDF_BACKEND')
+    max_pages = int(_setting('PDF_MAX_PAGES'))
+    workers = max(1, int(_setting('PDF_EXTRACT_WORKERS')))
+    try:
+        pages = min(_page_count(path), max_pages)
+    except Exception:
+        # PyPDF2 cannot open it; pdfminer is more forgiving with damaged files
+        backend, pages, workers = 'pdfminer', max_pages, 1
+
+    if pages < int(_setting('PDF_PARALLEL_MIN_PAGES')) or workers == 1:
+        step = max(1, pages)  # one task; the pool still enforces the deadline
+    else:
+        # Ranges small enough that early pages come back before the whole document
+        step = max(1, min(4, math.ceil(pages / workers)))
+    ranges = [(start, min(start + step, pages)) for start in range(0, pages, step)]
+    deadline = time.time() + float(_setting('PDF_EXTRACT_TIMEOUT'))
+    pool = _get_pool()
+    futures = [pool.submit(_extract_range, path, start, stop, backend, deadline) for start, stop in ranges]
+    try:
+        for (start, stop), future in zip(ranges, futures):
+            try:
+                # Workers stop at the deadline themselves; the grace covers handing the result back
+                texts = future.result(timeout=max(0.0, deadline - time.time()) + _RESULT_GRACE)
+            except FutureTimeout:
+                texts = None
+            except BrokenProcessPool as e:
+                print('Error extracting PDF text:', e)
+                futures = []  # the broken pool fails them itself; cancelling would race it
+                _reset_pool(pool)
+                return
+            except Exception as e:
+                print('Error extracting PDF text:', e)
+                texts = [''] * (stop - start)
+            for text in texts or []:
+                yield normalize_text(text)
+            if texts is None or len(texts) < stop - start:
+                print(f'PDF extraction timed out for {path}; keeping the pages extracted so far')
+                return
+    finally:
+        # Only this document's tasks; ones already running stop at the deadline on their own
+        for future in futures:
+            if not future.done():
+                future.cancel()
+
+
+def extract_text(path):
+    """Normalized text of the whole document ('' when it cannot be read)."""
+    return '\n'.join(page for page in iter_pages(path) if page)
@@ -0,0 +1,67 @@
+"""Profile data for prompts, loaded once per request and cached per worker.
+
+`load_user` fetches the user together with their profile in one query, so
+`current_user.profile` never costs a second one. `prompt_profile` returns
+the small dict the AI prompts use ({'name', 'interests', 'user_type'}) from
+a per-worker LRU keyed by user id. Entries live for PROFILE_CACHE_TTL
+seconds and are dropped by `invalidate_profile` when the profile is saved;
+other workers pick up the change once their entry expires.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+from flask_login import current_user
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.models import User
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def load_user(user_id):
+    """User with their profile eagerly loaded, or None."""
+    return db.session.get(User, int(user_id), options=[joinedload(User.profile)])
+
+
+def _build(profile):
+    if profile is None:
+        return None
+    return {
+        'name': profile.name,
+        'interests': profile.interests,
+        'user_type': profile.user_type,
+    }
+
+
+def prompt_profile(user=None):
+    """Prompt-ready profile dict for `user` (default: the current user), or None without a profile."""
+    if user is None:
+        if not current_user or not current_user.is_authenticated:
+            return None
+        user = current_user
+    ttl = current_app.config.get('PROFILE_CACHE_TTL', 30)
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(user.id)
+        if entry is not None and entry[0] > now:
+            _cache.move_to_end(user.id)
+            return dict(entry[1]) if entry[1] is not None else None
+
+    data = _build(user.profile)
+    with _lock:
+        _cache[user.id] = (now + ttl, data)
+        _cache.move_to_end(user.id)
+        while len(_cache) > current_app.config.get('PROFILE_CACHE_SIZE', 1024):
+            _cache.popitem(last=False)
+    return dict(data) if data is not None else None
+
+
+def invalidate_profile(user_id):
+    """Forget the cached profile of `user_id` in this worker."""
+    with _lock:
+        _cache.pop(user_id, None)
@@ -0,0 +1,118 @@
+"""Split normalized resume text into a compact, sectioned form.
+
+Prompts include only the sections a task needs (see PARSE_SECTIONS and
+TAILOR_SECTIONS) instead of the whole extracted text.
+"""
+
+import re
+
+# Canonical section name -> headings that introduce it (lower case)
+SECTION_HEADINGS = {
+    'summary': ('summary', 'professional summary', 'profile', 'objective', 'career objective', 'about me'),
+    'education': ('education', 'academic background', 'academics', 'education and training'),
+    'skills': ('skills', 'technical skills', 'core skills', 'key skills', 'skills & tools'),
+    'experience': ('experience', 'work experience', 'professional experience', 'employment', 'employment history',
+                   'internships', 'internship'),
+    'projects': ('projects', 'project work', 'personal projects', 'academic projects'),
+    'certifications': ('certifications', 'certificates', 'certificates and awards', 'awards', 'achievements',
+                       'honors and awards', 'publications'),
+    'activities': ('activities', 'leadership', 'extracurricular activities', 'volunteering',
+                   'open source & community engagement', 'community engagement', 'positions of responsibility'),
+}
+
+SECTION_TITLES = {
+    'contact': 'Contact',
+    'summary': 'Summary',
+    'education': 'Education',
+    'skills': 'Skills',
+    'experience': 'Experience',
+    'projects': 'Projects',
+    'certifications': 'Certifications & Awards',
+    'activities': 'Activities',
+    'other': 'Other',
+}
+
+PARSE_SECTIONS = ('contact', 'summary', 'skills', 'education', 'experience')
+TAILOR_SECTIONS = ('summary', 'skills', 'experience', 'projects', 'education', 'certifications', 'activities', 'other')
+
+_HEADING_LOOKUP = {alias: name for name, aliases in SECTION_HEADINGS.items() for alias in aliases}
+# Longest aliases first so "project work" wins over a shorter prefix
+_HEADING_RE = re.compile(
+    r'^(%s)\s*:?(?:\s+(.*))?$' % '|'.join(
+        re.escape(a) for a in sorted(_HEADING_LOOKUP, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+_BULLET_RE = re.compile(r'^[●•▪◦\-*–]\s*')
+
+
+def _match_heading(line):
+    """(section name, remainder of the line) if `line` starts a section, else None."""
+    m = _HEADING_RE.match(line)
+    if not m:
+        return None
+    heading, rest = m.group(1), (m.group(2) or '').strip()
+    if rest:
+        # Extractors sometimes glue the heading onto the first line of the
+        # section; only trust that when the heading is styled as one
+        if not (heading.istitle() or heading.isupper()) or rest[0].islower():
+            return None
+    return _HEADING_LOOKUP[heading.lower()], rest
+
+
+def reflow(text):
+    """Join wrapped lines back into sentences; bullets always start a new line."""
+    lines = []
+    for raw in text.split('\n'):
+        line = raw.strip()
+        if not line:
+            continue
+        if _BULLET_RE.match(line):
+            line = _BULLET_RE.sub('- ', line)
+        elif lines and not lines[-1].endswith(('.', ':', ';', '!', '?')) and line[0].islower():
+            lines[-1] = f'{lines[-1]} {line}'
+            continue
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def split_sections(text):
+    """Map canonical section names to their reflowed text, in document order.
+
+    Anything before the first heading is `contact`; repeated headings are
+    appended to the same section.
+    """
+    sections = {}
+    current = 'contact'
+    buffer = []
+
+    def flush():
+        body = reflow('\n'.join(buffer))
+        if body:
+            sections[current] = f"{sections[current]}\n{body}" if current in sections else body
+
+    for line in (text or '').split('\n'):
+        match = _match_heading(line.strip())
+        if match:
+            flush()
+            current, rest = match
+            buffer = [rest] if rest else []
+        else:
+            buffer.append(line)
+    flush()
+
+    if list(sections) == ['contact'] and len(sections['contact']) > 300:
+        # No headings found: keep the text, but don't call it contact details
+        sections = {'other': sections['contact']}
+    return sections
+
+
+def sections_text(sections, names=None):
+    """Render the chosen sections as compact prompt text ('## Title' blocks).
+
+    Falls back to every section when none of `names` are present, so a resume
+    without recognizable headings still reaches the model.
+    """
+    chosen = [n for n in sections if names is None or n in names]
+    if not chosen:
+        chosen = list(sections)
+    return '\n\n'.join(f"## {SECTION_TITLES.get(n, n.title())}\n{sections[n]}" for n in chosen)
@@ -0,0 +1,284 @@
+"""Storage for uploaded resumes.
+
+Uploaded PDFs are stored once per distinct content under
+`uploads/blobs/<sha256>.pdf`. What is derived from them lives in the
+ResumeDocument table, one row per version a user uploads: the extracted text
+and its sections (deferred columns, loaded only when asked for), the AI parse
+and its status. The upload request only stores the PDF; `extract_resume_text`
+fills in the text from the parse job (`sections` stays None until then).
+Uploading bytes that were seen before, by anyone, copies the text and parse
+from that row, so neither PDF extraction nor the Gemini parse runs again.
+
+Readers load only the columns they use: `load_parsed_resume` (profile page),
+`load_resume_sections` (tailoring) or `current_resume(..., with_content=True)`
+(parsing). `import_resume_files` moves the JSON files earlier releases kept
+in `instance/user_data/` into the table; migration 0003 runs it once.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import undefer_group
+
+from app import db
+from app.models import Profile, ResumeDocument, User
+from app.pdf_text import normalize_text
+from app.profile.resume_sections import split_sections
+
+
+def _blob_dir():
+    path = os.path.join(current_app.config.get('RESUME_UPLOAD_FOLDER'), 'blobs')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def blob_path(digest):
+    return os.path.join(_blob_dir(), f"{digest}.pdf")
+
+
+def atomic_write_bytes(path, data):
+    """Write `data` to `path` via a temp file in the same directory and a rename."""
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-', suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _latest(query, user_id):
+    return (query.filter(ResumeDocument.user_id == user_id)
+            .order_by(ResumeDocument.version.desc())
+            .limit(1))
+
+
+def current_resume(user_id, with_content=False):
+    """The user's current ResumeDocument or None; `with_content` also loads the text and sections."""
+    query = ResumeDocument.query
+    if with_content:
+        query = query.options(undefer_group('content'))
+    return _latest(query, user_id).first()
+
+
+def load_parsed_resume(user_id):
+    """AI-parsed fields of the user's current resume, or None."""
+    return _latest(db.session.query(ResumeDocument.parsed), user_id).scalar()
+
+
+def load_resume_sections(user_id):
+    """{section name: text} of the user's current resume ({} without one)."""
+    return _latest(db.session.query(ResumeDocument.sections), user_id).scalar() or {}
+
+
+def resume_history(user_id):
+    """Versions uploaded by a user, oldest first."""
+    rows = (db.session.query(ResumeDocument.version, ResumeDocument.sha256, ResumeDocument.uploaded_at)
+            .filter(ResumeDocument.user_id == user_id)
+            .order_by(ResumeDocument.version))
+    return [{'version': version, 'sha256': digest, 'uploaded_at': uploaded_at.isoformat(timespec='seconds')}
+            for version, digest, uploaded_at in rows]
+
+
+def _next_version(user_id):
+    latest = (db.session.query(func.max(ResumeDocument.version))
+              .filter(ResumeDocument.user_id == user_id)
+              .scalar())
+    return (latest or 0) + 1
+
+
+def store_resume(user_id, pdf_bytes):
+    """Store an uploaded resume and make it the user's current version.
+
+    No text is extracted here; content seen before reuses its text and parse.
+    Returns (pdf_path, document, changed): `changed` is False when the upload
+    is byte-identical to the current version, in which case nothing is
+    written. A new version is committed before returning, so a parse job
+    started next can read it.
+    """
+    digest = hashlib.sha256(pdf_bytes).hexdigest()
+    pdf_path = blob_path(digest)
+
+    current = current_resume(user_id)
+    if current is not None and current.sha256 == digest and os.path.exists(pdf_path):
+        return pdf_path, current, False
+
+    if not os.path.exists(pdf_path):
+        atomic_write_bytes(pdf_path, pdf_bytes)
+
+    seen = (ResumeDocument.query.options(undefer_group('content'))
+            .filter_by(sha256=digest)
+            .order_by(ResumeDocument.id.desc())
+            .first())
+    fields = {'sha256': digest}
+    if seen is not None and seen.sections is not None:
+        fields.update(extracted_text=seen.extracted_text, sections=seen.sections)
+        if seen.parse_status == 'done':
+            fields.update(parsed=seen.parsed, parse_status='done', parsed_at=seen.parsed_at)
+
+    for _ in range(3):
+        document = ResumeDocument(user_id=user_id, version=_next_version(user_id), **fields)
+        try:
+            with db.session.begin_nested():
+                db.session.add(document)
+        except IntegrityError:
+            # Another request stored a version for this user at the same moment
+            continue
+        db.session.commit()
+        return pdf_path, document, True
+    raise RuntimeError(f'Could not store a new resume version for user {user_id}')
+
+
+def extract_resume_text(document, extract_text):
+    """Fill in `document`'s text and sections from its PDF unless that already happened.
+
+    Runs in the parse job, so the upload request never waits for
+    `extract_text(path)`. Content another upload has extracted meanwhile is
+    copied instead.
+    """
+    if document.sections is not None or not document.sha256:
+        return document
+    seen = (ResumeDocument.query.options(undefer_group('content'))
+            .filter(ResumeDocument.sha256 == document.sha256, ResumeDocument.id != document.id)
+            .order_by(ResumeDocument.id.desc())
+            .first())
+    if seen is not None and seen.sections is not None:
+        text, sections = seen.extracted_text, seen.sections
+    else:
+        text = extract_text(blob_path(document.sha256))
+        sections = split_sections(text)
+    document.extracted_text = text
+    document.sections = sections
+    db.session.commit()
+    return document
+
+
+def record_parsed(document, parsed):
+    """Save an AI parse for `document`.
+
+    Every stored copy of the same PDF gets it too, so later uploads of that
+    content skip the parse.
+    """
+    query = ResumeDocument.query
+    if document.sha256:
+        query = query.filter(ResumeDocument.sha256 == document.sha256)
+    else:
+        query = query.filter(ResumeDocument.id == document.id)
+    query.update({'parsed': parsed, 'parse_status': 'done', 'parsed_at': datetime.utcnow()},
+                 synchronize_session=False)
+    db.session.commit()
+
+
+def mark_parse_failed(user_id):
+    """Record that parsing the user's current resume failed, unless a parse has landed since."""
+    current = current_resume(user_id)
+    if current is not None and current.parse_status != 'done':
+        current.parse_status = 'failed'
+        db.session.commit()
+
+
+# --- One-time import of the JSON files used before resumes moved into the database ---
+
+def _read_json(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _file_digest(path):
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, 'rb') as fh:
+        return hashlib.sha256(fh.read()).hexdigest()
+
+
+def _parse_time(value):
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _document_from_file(user_id, version, digest, data, uploaded_at):
+    text = data.get('extracted_text') or ''
+    parsed = data.get('ai_parsed')
+    document = ResumeDocument(
+        user_id=user_id,
+        version=version,
+        sha256=digest,
+        extracted_text=text,
+        sections=data.get('sections') or split_sections(text),
+        uploaded_at=uploaded_at,
+    )
+    if parsed:
+        document.parsed = parsed
+        document.parse_status = 'done'
+        document.parsed_at = uploaded_at
+    return document
+
+
+def import_resume_files():
+    """Copy resumes kept as JSON files under `instance/user_data/` into ResumeDocument rows.
+
+    Versions come from each user's history file, with their text and parse
+    from the shared artifacts; the current file supplies the newest version.
+    Users who already have rows are skipped and the files are left in place,
+    so running it again is harmless. Returns the number of rows added.
+    """
+    directory = os.path.join(current_app.instance_path, 'user_data')
+    if not os.path.isdir(directory):
+        return 0
+    users = {user_id for (user_id,) in db.session.query(User.id)}
+    stored = {user_id for (user_id,) in db.session.query(ResumeDocument.user_id).distinct()}
+
+    added = 0
+    for name in sorted(os.listdir(directory)):
+        match = re.fullmatch(r'user_(\d+)_resume\.json', name)
+        if not match:
+            continue
+        user_id = int(match.group(1))
+        current = _read_json(os.path.join(directory, name))
+        if user_id not in users or user_id in stored or not isinstance(current, dict):
+            continue
+
+        documents = {}
+        uploaded = {}
+        for entry in _read_json(os.path.join(directory, f"user_{user_id}_resume_history.json")) or []:
+            version, digest = entry.get('version'), entry.get('sha256')
+            uploaded[version] = _parse_time(entry.get('uploaded_at'))
+            artifact = _read_json(os.path.join(directory, 'artifacts', f"{digest}.json")) if digest else None
+            if version and artifact:
+                documents[version] = _document_from_file(user_id, version, digest, artifact, uploaded[version])
+
+        digest = current.get('sha256')
+        if digest is None:
+            # Written before the content-addressed store; its text was never normalized
+            current['extracted_text'] = normalize_text(current.get('extracted_text') or '')
+            profile = Profile.query.filter_by(user_id=user_id).first()
+            digest = _file_digest(profile.resume_path if profile else None)
+        version = current.get('version') or max(documents, default=0) + 1
+        uploaded_at = uploaded.get(version) or datetime.utcfromtimestamp(os.path.getmtime(os.path.join(directory, name)))
+        documents[version] = _document_from_file(user_id, version, digest, current, uploaded_at)
+
+        db.session.add_all(documents.values())
+        added += len(documents)
+    db.session.commit()
+    return added
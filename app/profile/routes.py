@@ -1,59 +1,34 @@
-from flask import render_template, url_for, flash, redirect, request, current_app
+from flask import render_template, url_for, flash, redirect, request, current_app, jsonify
 from app.profile import bp
-from app.models import User, Profile
-from app import db
+from app.models import User, Profile, BackgroundJob
+from app import db, job_queue, ai_client
+from app.ai.jsonstream import parse_json_text
+from app.pdf_text import extract_text
+from app.profile.resume_store import (
+    store_resume, current_resume, extract_resume_text, load_parsed_resume, record_parsed, mark_parse_failed
+)
+from app.profile.resume_sections import sections_text, PARSE_SECTIONS
+from app.profile.context import invalidate_profile
 from flask_login import current_user, login_required
-from werkzeug.utils import secure_filename
 import os
 import json
-from PyPDF2 import PdfReader
-import re
 from flask import send_file, abort
-import google.generativeai as genai
 
 ALLOWED_EXTENSIONS = {'pdf'}
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def extract_pdf_text(path):
-    try:
-        reader = PdfReader(path)
-        texts = []
-        for page in reader.pages:
-            try:
-                texts.append(page.extract_text() or '')
-            except Exception:
-                texts.append('')
-        return '\n'.join(texts)
-    except Exception:
-        return ''
 
 def save_resume_and_json(user_id, file_storage):
-    # Ensure upload dir
-    upload_dir = current_app.config.get('RESUME_UPLOAD_FOLDER')
-    os.makedirs(upload_dir, exist_ok=True)
-    user_data_dir = os.path.join(current_app.instance_path, 'user_data')
-    os.makedirs(user_data_dir, exist_ok=True)
-
-    filename = secure_filename(f"user_{user_id}_resume.pdf")
-    save_path = os.path.join(upload_dir, filename)
-    file_storage.save(save_path)
-
-    # Extract text
-    extracted_text = extract_pdf_text(save_path)
+    """Store an uploaded resume; returns (stored path, whether it still needs the parse job).
 
-    # Save JSON with extracted text and placeholder for parsed AI data
-    json_path = os.path.join(user_data_dir, f"user_{user_id}_resume.json")
-    data = {
-        'extracted_text': extracted_text,
-        'ai_parsed': None
-    }
-    with open(json_path, 'w', encoding='utf-8') as jf:
-        json.dump(data, jf, ensure_ascii=False, indent=2)
-
-    # Return relative path to stored resume (inside instance)
-    return save_path
+    Only the PDF is written here; text extraction and the AI parse run in the
+    background job. Content that was uploaded before keeps its extracted text
+    and parse, so re-uploading the same PDF costs neither.
+    """
+    save_path, document, _changed = store_resume(user_id, file_storage.read())
+    return save_path, document.parse_status != 'done'
 
 
 @bp.route('/resume/<int:user_id>/download')
@@ -68,94 +43,48 @@ def download_resume(user_id):
     resume_path = user.profile.resume_path
     if not os.path.exists(resume_path):
         abort(404)
-    return send_file(resume_path, as_attachment=True)
+    return send_file(resume_path, as_attachment=True, download_name=f"user_{user_id}_resume.pdf")
 
 
 def parse_resume_with_ai(user_id):
-    # Load extracted text JSON and call Gemini to produce structured JSON
-    user_data_dir = os.path.join(current_app.instance_path, 'user_data')
-    json_path = os.path.join(user_data_dir, f"user_{user_id}_resume.json")
-    if not os.path.exists(json_path):
+    # Extract the current resume's text if needed and call Gemini to produce structured JSON
+    document = current_resume(user_id, with_content=True)
+    if document is None:
         return None
-    with open(json_path, 'r', encoding='utf-8') as jf:
-        data = json.load(jf)
+    extract_resume_text(document, extract_text)
 
-    extracted_text = data.get('extracted_text', '')
+    extracted_text = document.extracted_text or ''
     if not extracted_text:
         return None
+    # Only the sections that feed the requested fields
+    resume_text = sections_text(document.sections, PARSE_SECTIONS) if document.sections else extracted_text
 
     # If model not configured, skip
-    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-    GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-1.5-flash')
-    if not GEMINI_API_KEY:
-        return None
-    try:
-        genai.configure(api_key=GEMINI_API_KEY)
-        # Request JSON-only output when supported by the model
-        generation_config = {"response_mime_type": "application/json"}
-        try:
-            model = genai.GenerativeModel(GEMINI_MODEL, generation_config=generation_config)
-        except TypeError:
-            # Older SDKs may not support generation_config in constructor; fall back gracefully
-            model = genai.GenerativeModel(GEMINI_MODEL)
-    except Exception as e:
-        print('AI model init failed for resume parsing:', e)
+    if not ai_client.available:
         return None
+    # Request JSON-only output when supported by the model
+    generation_config = {"response_mime_type": "application/json"}
 
     prompt = (
         "You are a strict JSON generator. Extract structured fields from the following resume text. "
         "Return ONLY a valid JSON object and nothing else (no markdown, no backticks, no commentary). "
         "Keys required: name (string), email (string), phone (string), skills (array of strings), "
         "education (array of strings), experience (array of objects with keys: role, company, years), summary (string).\n\n"
-        "Resume Text:\n" + extracted_text
+        "Resume Text:\n" + resume_text
     )
 
-    def _extract_json_from_text(text: str):
-        if not text:
-            return None
-        t = text.strip()
-        # If fenced code block, capture JSON within
-        m = re.search(r"```(?:json)?\s*(\{[\s\S]*?\})\s*```", t, re.IGNORECASE)
-        if m:
-            candidate = m.group(1).strip()
-            try:
-                return json.loads(candidate)
-            except Exception:
-                pass
-        # If starts with backticks, strip leading/trailing fences conservatively
-        if t.startswith('```') and t.endswith('```'):
-            inner = t.strip('`').strip()
-            # Remove optional leading language tag
-            inner = re.sub(r"^(json|JSON)\s+", "", inner)
-            try:
-                return json.loads(inner)
-            except Exception:
-                pass
-        # Try from first '{' to last '}'
-        start = t.find('{')
-        end = t.rfind('}')
-        if start != -1 and end != -1 and end > start:
-            candidate = t[start:end+1]
-            try:
-                return json.loads(candidate)
-            except Exception:
-                pass
-        # Last resort: return None
-        return None
+    def _extract_json_from_text(text: str, allow_partial=False):
+        # Single incremental pass; tolerates fences and prose around the object
+        data = parse_json_text(text, allow_partial=allow_partial, expect=dict)
+        return data if isinstance(data, dict) and data else None
+
+    def _is_json(text):
+        return _extract_json_from_text(text) is not None
+
+    parsed_text = ''
     try:
-        response = model.generate_content(prompt)
-        # Prefer response.text; if empty, collect text parts from candidates
-        parsed_text = (getattr(response, 'text', None) or '').strip()
-        if not parsed_text and getattr(response, 'candidates', None):
-            texts = []
-            try:
-                for cand in response.candidates:
-                    for part in getattr(cand.content, 'parts', []) or []:
-                        if hasattr(part, 'text') and part.text:
-                            texts.append(part.text)
-            except Exception:
-                pass
-            parsed_text = "\n".join(texts).strip()
+        # Identical resume text is served from the shared LLM cache
+        parsed_text = ai_client.generate_text(prompt, generation_config, cache_if=_is_json)
 
         parsed_json = _extract_json_from_text(parsed_text)
         if parsed_json is None:
@@ -163,16 +92,16 @@ def parse_resume_with_ai(user_id):
             strict_prompt = (
                 "Reformat the previous extraction as STRICT JSON only. Do not include any text other than the JSON object."
             )
-            retry_resp = model.generate_content([prompt, strict_prompt])
-            retry_text = (getattr(retry_resp, 'text', None) or '').strip()
+            retry_text = ai_client.generate_text([prompt, strict_prompt], generation_config, cache_if=_is_json)
             parsed_json = _extract_json_from_text(retry_text)
+        if parsed_json is None:
+            # Keep whatever fields completed before the output was truncated
+            parsed_json = _extract_json_from_text(parsed_text, allow_partial=True)
 
         if parsed_json is None:
             raise ValueError("Model did not return valid JSON")
 
-        data['ai_parsed'] = parsed_json
-        with open(json_path, 'w', encoding='utf-8') as jf:
-            json.dump(data, jf, ensure_ascii=False, indent=2)
+        record_parsed(document, parsed_json)
         return parsed_json
     except Exception as e:
         preview = ''
@@ -184,6 +113,31 @@ def parse_resume_with_ai(user_id):
         return None
 
 
+def _parse_resume_job(user_id):
+    try:
+        parsed = parse_resume_with_ai(user_id)
+    except Exception:
+        # e.g. the PDF extraction timed out
+        db.session.rollback()
+        mark_parse_failed(user_id)
+        raise
+    if parsed is None:
+        mark_parse_failed(user_id)
+        raise RuntimeError('Resume parsing failed. Check AI configuration or try again.')
+
+
+def enqueue_resume_parse(user_id):
+    return job_queue.submit('parse_resume', _parse_resume_job, user_id, user_id=user_id)
+
+
+def latest_resume_parse_job(user_id):
+    job = (BackgroundJob.query
+           .filter_by(user_id=user_id, kind='parse_resume')
+           .order_by(BackgroundJob.id.desc())
+           .first())
+    return job_queue.expire_if_stale(job)
+
+
 @bp.route('/parse_resume', methods=['POST'])
 @login_required
 def parse_resume():
@@ -191,13 +145,19 @@ def parse_resume():
     if not profile or not profile.resume_path:
         flash('No resume to parse.', 'danger')
         return redirect(url_for('profile.view_profile'))
-    parsed = parse_resume_with_ai(current_user.id)
-    if parsed:
-        flash('Resume parsed successfully.', 'success')
-    else:
-        flash('Failed to parse resume. Check AI configuration or try again.', 'danger')
+    enqueue_resume_parse(current_user.id)
+    flash('Resume parsing started. This page will update when it finishes.', 'info')
     return redirect(url_for('profile.view_profile'))
 
+
+@bp.route('/api/jobs/<int:job_id>')
+@login_required
+def job_status(job_id):
+    job = BackgroundJob.query.get_or_404(job_id)
+    if job.user_id != current_user.id:
+        return jsonify({'error': 'Forbidden'}), 403
+    return jsonify(job_queue.expire_if_stale(job).to_dict())
+
 @bp.route('/create', methods=['GET', 'POST'])
 @login_required
 def create_profile():
@@ -227,13 +187,11 @@ def create_profile():
             if not allowed_file(resume_file.filename):
                 flash('Resume must be a PDF file.', 'danger')
                 return redirect(url_for('profile.create_profile'))
-            resume_path = save_resume_and_json(current_user.id, resume_file)
-            # Parse resume synchronously after upload
-            parsed = parse_resume_with_ai(current_user.id)
-            if parsed:
-                flash('Resume uploaded and parsed successfully.', 'success')
-            else:
-                flash('Resume uploaded but parsing failed. You can try "Parse Resume" later.', 'warning')
+            resume_path, needs_parse = save_resume_and_json(current_user.id, resume_file)
+            if needs_parse:
+                # Parse in the background; the profile page polls for completion
+                enqueue_resume_parse(current_user.id)
+                flash('Resume uploaded. Parsing is running in the background.', 'info')
 
         # Combine details into the model 'details' field as structured text
         combined_details = ''
@@ -256,6 +214,7 @@ def create_profile():
         )
         db.session.add(profile)
         db.session.commit()
+        invalidate_profile(current_user.id)
         flash('Your profile has been created!', 'success')
         return redirect(url_for('profile.view_profile'))
     return render_template('profile/create_profile.html', title='Create Profile')
@@ -267,18 +226,10 @@ def view_profile():
     if not profile:
         flash('Please create your profile first.', 'info')
         return redirect(url_for('profile.create_profile'))
-    # Load parsed resume JSON if present
-    parsed = None
-    try:
-        user_data_dir = os.path.join(current_app.instance_path, 'user_data')
-        json_path = os.path.join(user_data_dir, f"user_{profile.user_id}_resume.json")
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as jf:
-                data = json.load(jf)
-                parsed = data.get('ai_parsed')
-    except Exception:
-        parsed = None
-    return render_template('profile/view_profile.html', title='View Profile', profile=profile, parsed=parsed)
+    # Only the parsed fields; the resume text is not loaded
+    parsed = load_parsed_resume(profile.user_id)
+    parse_job = latest_resume_parse_job(profile.user_id)
+    return render_template('profile/view_profile.html', title='View Profile', profile=profile, parsed=parsed, parse_job=parse_job)
 
 @bp.route('/edit', methods=['GET', 'POST'])
 @login_required
@@ -309,14 +260,12 @@ def edit_profile():
             if not allowed_file(resume_file.filename):
                 flash('Resume must be a PDF file.', 'danger')
                 return redirect(url_for('profile.edit_profile'))
-            saved_path = save_resume_and_json(current_user.id, resume_file)
+            saved_path, needs_parse = save_resume_and_json(current_user.id, resume_file)
             profile.resume_path = saved_path
-            # Parse resume synchronously after upload
-            parsed = parse_resume_with_ai(current_user.id)
-            if parsed:
-                flash('Resume uploaded and parsed successfully.', 'success')
-            else:
-                flash('Resume uploaded but parsing failed. You can try "Parse Resume" later.', 'warning')
+            if needs_parse:
+                # Parse in the background; the profile page polls for completion
+                enqueue_resume_parse(current_user.id)
+                flash('Resume uploaded. Parsing is running in the background.', 'info')
 
         # Update combined details
         combined_details = ''
@@ -326,6 +275,7 @@ def edit_profile():
             combined_details += f"{detail_2}\n"
         profile.details = combined_details
         db.session.commit()
+        invalidate_profile(current_user.id)
         flash('Your profile has been updated!', 'success')
         return redirect(url_for('profile.view_profile'))
     return render_template('profile/edit_profile.html', title='Edit Profile', profile=profile)
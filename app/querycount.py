@@ -0,0 +1,54 @@
+"""Per-request SQL statement counting with budgets for hot endpoints.
+
+Every statement executed while a request is being handled is counted. When
+the request ends (for streamed responses: when the stream finishes) the
+count is compared with QUERY_BUDGETS[endpoint]. Going over the budget raises
+QueryBudgetExceeded when TESTING or QUERY_BUDGET_STRICT is set, so a
+regression fails loudly in tests; otherwise it is only logged.
+"""
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryBudgetExceeded(RuntimeError):
+    pass
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g._query_count = g.get('_query_count', 0) + 1
+
+
+class QueryCounter:
+    def __init__(self, app=None):
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.config.setdefault('QUERY_BUDGETS', {})
+        app.config.setdefault('QUERY_BUDGET_STRICT', False)
+        if not event.contains(Engine, 'before_cursor_execute', _count_statement):
+            event.listen(Engine, 'before_cursor_execute', _count_statement)
+        app.teardown_request(self._check_budget)
+        app.extensions['query_counter'] = self
+
+    @staticmethod
+    def count():
+        """Statements executed so far in the current request."""
+        return g.get('_query_count', 0) if has_request_context() else 0
+
+    def _check_budget(self, exc=None):
+        budget = self.app.config['QUERY_BUDGETS'].get(request.endpoint)
+        if budget is None or exc is not None:
+            return
+        count = self.count()
+        if count <= budget:
+            return
+        message = f'{request.endpoint} ran {count} SQL statements (budget {budget})'
+        if self.app.config['QUERY_BUDGET_STRICT'] or self.app.testing:
+            raise QueryBudgetExceeded(message)
+        print('Warning:', message)
@@ -0,0 +1,123 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import click
+import markdown
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+_SAFE_SCHEMES = ('http:', 'https:', 'mailto:')
+
+
+class _StripUnsafeLinks(Treeprocessor):
+    """Drop href/src values that use anything but a known-safe URL scheme."""
+
+    def run(self, root):
+        for el in root.iter():
+            for attr in ('href', 'src'):
+                value = el.get(attr)
+                if value is None:
+                    continue
+                scheme = value.strip().lower().split('/', 1)[0]
+                if ':' in scheme and not scheme.startswith(_SAFE_SCHEMES):
+                    del el.attrib[attr]
+
+
+class _SafeMarkdown(Extension):
+    """Treat raw HTML in the source as text, so model output cannot inject markup."""
+
+    def extendMarkdown(self, md):
+        md.preprocessors.deregister('html_block')
+        md.inlinePatterns.deregister('html')
+        md.treeprocessors.register(_StripUnsafeLinks(md), 'strip_unsafe_links', 0)
+
+
+class MarkdownRenderer:
+    """Shared, sanitizing markdown-to-HTML renderer.
+
+    Each thread reuses one `markdown.Markdown` pipeline instead of building a
+    new one per call, and rendered HTML is kept in a bounded LRU keyed by a
+    hash of the source text (MARKDOWN_CACHE_SIZE entries per process), so
+    re-rendering the same content is a dictionary lookup.
+    """
+
+    def __init__(self, app=None):
+        self.max_entries = 1024
+        self.hits = 0
+        self.misses = 0
+        self._cache = OrderedDict()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('MARKDOWN_CACHE_SIZE', 1024)
+        self.max_entries = int(app.config['MARKDOWN_CACHE_SIZE'])
+        app.extensions['markdown_renderer'] = self
+
+        @app.cli.command('markdown-backfill')
+        @click.option('--all', 'rerender', is_flag=True, help='Re-render rows that already have HTML.')
+        @click.option('--batch-size', default=500, show_default=True)
+        def markdown_backfill_command(rerender, batch_size):
+            """Store rendered HTML for existing AI chat messages."""
+            count = backfill_chat_html(self, rerender=rerender, batch_size=batch_size)
+            print(f'Rendered {count} chat messages.')
+
+    def _markdown(self):
+        md = getattr(self._local, 'md', None)
+        if md is None:
+            md = markdown.Markdown(extensions=[_SafeMarkdown()])
+            self._local.md = md
+        return md
+
+    def render(self, text):
+        """Return sanitized HTML for `text` (a plain string, not Markup)."""
+        if not text:
+            return ''
+        key = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        with self._lock:
+            html = self._cache.get(key)
+            if html is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return html
+            self.misses += 1
+        md = self._markdown()
+        try:
+            html = md.convert(text)
+        finally:
+            md.reset()
+        with self._lock:
+            self._cache[key] = html
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return html
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
+
+def backfill_chat_html(renderer, rerender=False, batch_size=500):
+    """Render `content_html` for stored AI messages, walking the table by id."""
+    from app import db
+    from app.models import ChatMessage
+
+    count = 0
+    last_id = 0
+    while True:
+        query = ChatMessage.query.filter(ChatMessage.sender == 'ai', ChatMessage.id > last_id)
+        if not rerender:
+            query = query.filter(ChatMessage.content_html.is_(None))
+        rows = query.order_by(ChatMessage.id).limit(batch_size).all()
+        if not rows:
+            break
+        for message in rows:
+            message.content_html = renderer.render(message.content)
+        db.session.commit()
+        count += len(rows)
+        last_id = rows[-1].id
+    return count
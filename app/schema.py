@@ -0,0 +1,363 @@
+"""Schema migrations.
+
+Each schema change is a numbered entry in MIGRATIONS. `flask db-upgrade`
+applies the ones not yet recorded in the `schema_migrations` table, in
+order; `flask db-status` lists them. SQLite databases are upgraded on startup
+as well (DB_AUTO_MIGRATE), so local setups need no extra step. Multi-node
+PostgreSQL deployments run `flask db-upgrade` once per release instead, and
+concurrent runs are serialized with an advisory lock.
+
+Migrations never look at the current models: each creates the tables as
+they were when it was written (the frozen MetaData below), so a database
+migrated today ends up like one migrated back then. A model change needs a
+new migration.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+
+import click
+from flask import current_app
+from sqlalchemy import (JSON, Boolean, Column, Date, DateTime, ForeignKey, Index, Integer, MetaData, String,
+                        Table, Text, inspect, text)
+from sqlalchemy.dialects.postgresql import JSONB
+
+_JSON = JSON().with_variant(JSONB(), 'postgresql')
+
+# Schema created by 0001_baseline
+_BASELINE = MetaData()
+
+Table(
+    'user', _BASELINE,
+    Column('id', Integer, primary_key=True),
+    Column('username', String(20), unique=True, nullable=False),
+    Column('email', String(120), unique=True, nullable=False),
+    Column('password', String(60), nullable=False),
+)
+
+Table(
+    'profile', _BASELINE,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('place', String(100), nullable=False),
+    Column('user_type', String(20), nullable=False),
+    Column('organization_name', String(100)),
+    Column('details', Text),
+    Column('resume_path', String(200)),
+    Column('interests', Text),
+    Column('hobbies', Text),
+    Column('additional_info', Text),
+    Column('user_id', Integer, ForeignKey('user.id'), unique=True, nullable=False),
+)
+
+Table(
+    'career_plan', _BASELINE,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('career_goal', String(200), nullable=False),
+    Column('created_date', DateTime, nullable=False),
+    Column('last_updated', DateTime, nullable=False),
+    Column('is_active', Boolean, nullable=False),
+    Column('total_tasks', Integer, nullable=False, server_default='0'),
+    Column('completed_count', Integer, nullable=False, server_default='0'),
+    Column('streak', Integer, nullable=False, server_default='0'),
+    Column('last_completed_on', Date),
+    Column('next_due_day', Integer),
+    Index('ix_career_plan_user_active', 'user_id', 'is_active'),
+    Index('uq_career_plan_one_active', 'user_id', unique=True,
+          sqlite_where=text('is_active = 1'), postgresql_where=text('is_active')),
+)
+
+Table(
+    'daily_task', _BASELINE,
+    Column('id', Integer, primary_key=True),
+    Column('career_plan_id', Integer, ForeignKey('career_plan.id'), nullable=False),
+    Column('day_number', Integer, nullable=False),
+    Column('task_description', Text, nullable=False),
+    Column('resources', _JSON),
+    Column('is_completed', Boolean, nullable=False),
+    Column('completed_date', DateTime),
+    Index('ix_daily_task_plan_day', 'career_plan_id', 'day_number'),
+)
+
+Table(
+    'chat_session', _BASELINE,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('session_name', String(100)),
+    Column('created_date', DateTime, nullable=False),
+    Column('has_career_plan', Boolean, nullable=False),
+    Column('history_summary', Text),
+    Column('summarized_through_id', Integer, nullable=False, server_default='0'),
+    Column('plan_draft', _JSON),
+    Column('plan_draft_status', String(20)),
+    Column('plan_draft_message_id', Integer),
+    Index('ix_chat_session_user_created', 'user_id', 'created_date'),
+)
+
+Table(
+    'chat_message', _BASELINE,
+    Column('id', Integer, primary_key=True),
+    Column('session_id', Integer, ForeignKey('chat_session.id'), nullable=False),
+    Column('timestamp', DateTime),
+    Column('sender', String(50), nullable=False),
+    Column('content', Text, nullable=False),
+    Column('content_html', Text),
+    Index('ix_chat_message_session_timestamp', 'session_id', 'timestamp'),
+    Index('ix_chat_message_session_id', 'session_id', 'id'),
+)
+
+Table(
+    'background_job', _BASELINE,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id')),
+    Column('kind', String(50), nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('error', Text),
+    Column('created_date', DateTime, nullable=False),
+    Column('started_date', DateTime),
+    Column('finished_date', DateTime),
+    Index('ix_background_job_user_kind', 'user_id', 'kind', 'id'),
+)
+
+# Table added by 0003_resume_documents ('user' is only there for the foreign key)
+_RESUME_DOCUMENTS = MetaData()
+
+Table('user', _RESUME_DOCUMENTS, Column('id', Integer, primary_key=True))
+
+_resume_document = Table(
+    'resume_document', _RESUME_DOCUMENTS,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('version', Integer, nullable=False),
+    Column('sha256', String(64)),
+    Column('extracted_text', Text, nullable=False),
+    Column('sections', _JSON),
+    Column('parsed', _JSON),
+    Column('parse_status', String(20), nullable=False),
+    Column('uploaded_at', DateTime, nullable=False),
+    Column('parsed_at', DateTime),
+    Index('uq_resume_document_user_version', 'user_id', 'version', unique=True),
+    Index('ix_resume_document_sha256', 'sha256'),
+)
+
+# Column added by 0004_background_job_ref (an ADD COLUMN on the existing table)
+_JOB_REF = MetaData()
+
+Table(
+    'background_job', _JOB_REF,
+    Column('id', Integer, primary_key=True),
+    Column('kind', String(50), nullable=False),
+    Column('ref', String(64)),
+    Index('ix_background_job_kind_ref', 'kind', 'ref'),
+)
+
+
+def _deactivate_duplicate_active_plans(conn):
+    # Older databases may hold several active plans per user; keep the newest
+    conn.execute(text(
+        "UPDATE career_plan SET is_active = :inactive "
+        "WHERE is_active = :active AND id NOT IN ("
+        " SELECT MAX(id) FROM career_plan WHERE is_active = :active GROUP BY user_id)"
+    ), {'active': True, 'inactive': False})
+
+
+def _backfill_plan_stats(conn):
+    # Progress aggregates start at zero on existing plans; derive them from the tasks
+    from app.career_advisor.plans import compute_streak
+    conn.execute(text(
+        "UPDATE career_plan SET"
+        " total_tasks = (SELECT COUNT(*) FROM daily_task WHERE career_plan_id = career_plan.id),"
+        " completed_count = (SELECT COUNT(*) FROM daily_task"
+        "  WHERE career_plan_id = career_plan.id AND is_completed = :done),"
+        " next_due_day = (SELECT MIN(day_number) FROM daily_task"
+        "  WHERE career_plan_id = career_plan.id AND is_completed = :open)"
+    ), {'done': True, 'open': False})
+    dates = defaultdict(list)
+    rows = conn.execute(text(
+        "SELECT career_plan_id, completed_date FROM daily_task"
+        " WHERE is_completed = :done AND completed_date IS NOT NULL"
+    ).columns(completed_date=DateTime), {'done': True})
+    for plan_id, completed in rows:
+        dates[plan_id].append(completed.date())
+    for plan_id, days in dates.items():
+        conn.execute(text("UPDATE career_plan SET streak = :streak, last_completed_on = :last WHERE id = :id"),
+                     {'streak': compute_streak(days), 'last': max(days), 'id': plan_id})
+
+
+# Data fixes that must run before an index can be created on existing rows
+_BEFORE_INDEX = {
+    'uq_career_plan_one_active': _deactivate_duplicate_active_plans,
+}
+
+# Data fixes that fill a newly added column on existing rows (run once per table)
+_AFTER_COLUMN = {
+    ('career_plan', 'total_tasks'): _backfill_plan_stats,
+}
+
+
+def upgrade_schema(engine, metadata):
+    """Bring an existing database up to the tables in `metadata`.
+
+    Creating tables skips those that exist, so databases created by an older
+    release lack columns and indexes added since. This adds each missing
+    column with ALTER TABLE ... ADD COLUMN and creates each missing index.
+    New columns must be nullable or carry a server_default so existing rows
+    stay valid; columns listed in _AFTER_COLUMN are then backfilled.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer  # quotes names like "user" on PostgreSQL
+    with engine.begin() as conn:
+        for table in metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {col['name'] for col in inspector.get_columns(table.name)}
+            fixups = []
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                ddl = f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.quote(column.name)} {col_type}'
+                if column.server_default is not None:
+                    default = str(column.server_default.arg).replace("'", "''")
+                    ddl += f" DEFAULT '{default}'"
+                conn.execute(text(ddl))
+                fixup = _AFTER_COLUMN.get((table.name, column.name))
+                if fixup and fixup not in fixups:
+                    fixups.append(fixup)
+            for fixup in fixups:
+                fixup(conn)
+
+            indexes = {ix['name'] for ix in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name in indexes:
+                    continue
+                fixup = _BEFORE_INDEX.get(index.name)
+                if fixup:
+                    fixup(conn)
+                index.create(bind=conn)
+
+
+def _baseline(db):
+    # Databases from before versioned migrations: create what is missing
+    _BASELINE.create_all(bind=db.engine)
+    upgrade_schema(db.engine, _BASELINE)
+
+
+def _postgres_jsonb(db):
+    # JSON documents stored as TEXT or JSON by earlier releases become JSONB
+    engine = db.engine
+    if engine.dialect.name != 'postgresql':
+        return
+    inspector = inspect(engine)
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        for table in _BASELINE.sorted_tables:
+            current = {col['name']: col['type'] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                wanted = column.type.dialect_impl(engine.dialect)
+                if not isinstance(wanted, JSONB) or isinstance(current.get(column.name), (JSONB, type(None))):
+                    continue
+                name = preparer.quote(column.name)
+                conn.execute(text(
+                    f'ALTER TABLE {preparer.format_table(table)} ALTER COLUMN {name} '
+                    f"TYPE JSONB USING NULLIF({name}::text, '')::jsonb"
+                ))
+
+
+def _resume_documents(db):
+    # Resumes move from JSON files in instance/user_data into the database
+    from app.profile.resume_store import import_resume_files
+    _resume_document.create(bind=db.engine, checkfirst=True)
+    imported = import_resume_files()
+    if imported:
+        current_app.logger.info('Imported %d resume version(s) from instance/user_data.', imported)
+
+
+def _background_job_ref(db):
+    upgrade_schema(db.engine, _JOB_REF)
+
+
+# (version, description, function(db)); append new entries, never reorder or edit applied ones
+MIGRATIONS = [
+    ('0001_baseline', 'Create missing tables, columns and indexes', _baseline),
+    ('0002_postgres_jsonb', 'Store JSON columns as JSONB on PostgreSQL', _postgres_jsonb),
+    ('0003_resume_documents', 'Move resume JSON files into the resume_document table', _resume_documents),
+    ('0004_background_job_ref', 'Record what each background job works on', _background_job_ref),
+]
+
+_versions = Table(
+    'schema_migrations', MetaData(),
+    Column('version', String(64), primary_key=True),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+_LOCK_ID = 7342001  # pg_advisory_lock key for migration runs
+
+
+def applied_migrations(db):
+    """Versions recorded as applied (empty for a database that predates versioning)."""
+    if not inspect(db.engine).has_table(_versions.name):
+        return set()
+    with db.engine.connect() as conn:
+        return {row[0] for row in conn.execute(_versions.select())}
+
+
+def pending_migrations(db):
+    applied = applied_migrations(db)
+    return [(version, description) for version, description, _ in MIGRATIONS if version not in applied]
+
+
+def migrate(db):
+    """Apply pending migrations in order; returns the versions applied."""
+    engine = db.engine
+    postgres = engine.dialect.name == 'postgresql'
+    done = []
+    with engine.connect() as lock_conn:
+        if postgres:
+            # Another node may be migrating at the same moment; wait for it
+            lock_conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': _LOCK_ID})
+            lock_conn.commit()
+        try:
+            _versions.create(bind=engine, checkfirst=True)
+            applied = applied_migrations(db)
+            for version, _, apply in MIGRATIONS:
+                if version in applied:
+                    continue
+                apply(db)
+                with engine.begin() as conn:
+                    conn.execute(_versions.insert().values(version=version, applied_at=datetime.utcnow()))
+                done.append(version)
+        finally:
+            if postgres:
+                lock_conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': _LOCK_ID})
+                lock_conn.commit()
+    return done
+
+
+def init_migrations(app, db):
+    """Register the migration commands and, with DB_AUTO_MIGRATE, upgrade on startup."""
+
+    @app.cli.command('db-upgrade')
+    def db_upgrade_command():
+        """Apply pending schema migrations."""
+        applied = migrate(db)
+        print(f"Applied: {', '.join(applied)}" if applied else 'Database schema is up to date.')
+
+    @app.cli.command('db-status')
+    @click.option('--all', 'show_all', is_flag=True, help='List applied migrations too.')
+    def db_status_command(show_all):
+        """List pending schema migrations."""
+        applied = applied_migrations(db)
+        for version, description, _ in MIGRATIONS:
+            if show_all or version not in applied:
+                print(f"{'applied' if version in applied else 'pending'}  {version}  {description}")
+
+    with app.app_context():
+        if app.config['DB_AUTO_MIGRATE']:
+            migrate(db)
+        else:
+            pending = pending_migrations(db)
+            if pending:
+                print(f"Warning: {len(pending)} schema migration(s) pending; run `flask db-upgrade`.")
@@ -0,0 +1,117 @@
+"""Benchmark the hot chat/plan queries with and without the model indexes.
+
+Seeds a throwaway SQLite database with 100k chat messages (plus sessions,
+plans and tasks), then times each hot query and prints SQLite's query plan,
+first with every model index dropped and then with them in place.
+
+    python benchmarks/chat_queries.py [--messages 100000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text  # noqa: E402
+
+from config import Config  # noqa: E402
+from app import create_app, db  # noqa: E402
+
+QUERIES = {
+    'messages by session (timestamp order)':
+        ("SELECT * FROM chat_message WHERE session_id = :sid ORDER BY timestamp", 'sid'),
+    'newest messages by session (id order)':
+        ("SELECT * FROM chat_message WHERE session_id = :sid ORDER BY id DESC LIMIT 12", 'sid'),
+    'sessions by user':
+        ("SELECT * FROM chat_session WHERE user_id = :uid", 'uid'),
+    'active plan by user':
+        ("SELECT * FROM career_plan WHERE user_id = :uid AND is_active = 1 LIMIT 1", 'uid'),
+    'tasks by plan':
+        ("SELECT * FROM daily_task WHERE career_plan_id = :pid", 'pid'),
+}
+
+
+def seed(conn, n_messages, n_users=500, sessions_per_user=4, plans_per_user=3):
+    now = datetime.utcnow()
+    conn.execute(text("INSERT INTO user (id, username, email, password) VALUES (:id, :u, :e, 'x')"),
+                 [{'id': u, 'u': f'user{u}', 'e': f'user{u}@example.com'} for u in range(1, n_users + 1)])
+    sessions = [{'id': i + 1, 'user_id': i // sessions_per_user + 1, 'created': now}
+                for i in range(n_users * sessions_per_user)]
+    conn.execute(text("INSERT INTO chat_session (id, user_id, session_name, created_date, has_career_plan, summarized_through_id) "
+                      "VALUES (:id, :user_id, 'Bench', :created, 0, 0)"), sessions)
+    conn.execute(text("INSERT INTO chat_message (session_id, timestamp, sender, content) VALUES (:sid, :ts, :sender, :content)"),
+                 [{'sid': random.randint(1, len(sessions)), 'ts': now + timedelta(seconds=i),
+                   'sender': 'user' if i % 2 == 0 else 'ai', 'content': f'message {i} ' + 'lorem ipsum ' * 8}
+                  for i in range(n_messages)])
+    plan_id = 0
+    plans, tasks = [], []
+    for u in range(1, n_users + 1):
+        for p in range(plans_per_user):
+            plan_id += 1
+            plans.append({'id': plan_id, 'user_id': u, 'active': p == plans_per_user - 1, 'now': now})
+            tasks.extend({'pid': plan_id, 'day': d} for d in range(1, 31))
+    conn.execute(text("INSERT INTO career_plan (id, user_id, career_goal, created_date, last_updated, is_active) "
+                      "VALUES (:id, :user_id, 'Goal', :now, :now, :active)"), plans)
+    conn.execute(text("INSERT INTO daily_task (career_plan_id, day_number, task_description, resources, is_completed) "
+                      "VALUES (:pid, :day, 'Task', '[]', 0)"), tasks)
+    return len(sessions), n_users, plan_id
+
+
+def run(conn, limits, repeats):
+    results = {}
+    for label, (sql, param) in QUERIES.items():
+        plan = conn.execute(text('EXPLAIN QUERY PLAN ' + sql), {param: 1}).fetchall()
+        started = time.perf_counter()
+        for _ in range(repeats):
+            conn.execute(text(sql), {param: random.randint(1, limits[param])}).fetchall()
+        elapsed_ms = (time.perf_counter() - started) * 1000 / repeats
+        results[label] = (elapsed_ms, ' | '.join(row[-1] for row in plan))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100_000)
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        LLM_CACHE_ENABLED = False
+
+    app = create_app(BenchConfig)
+    with app.app_context(), db.engine.begin() as conn:
+        started = time.perf_counter()
+        n_sessions, n_users, n_plans = seed(conn, args.messages)
+        print(f'Seeded {args.messages} messages in {time.perf_counter() - started:.1f}s ({path})\n')
+        limits = {'sid': n_sessions, 'uid': n_users, 'pid': n_plans}
+
+        # Every index the models declare, including the partial unique one on active plans
+        # (which the active-plan query can use as well); automatic constraint indexes stay
+        model_indexes = {index.name for table in db.metadata.tables.values() for index in table.indexes}
+        index_ddl = [(name, ddl) for name, ddl in conn.execute(text(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+        )) if name in model_indexes]
+        for name, _ in index_ddl:
+            conn.execute(text(f'DROP INDEX {name}'))
+        conn.execute(text('ANALYZE'))
+        before = run(conn, limits, args.repeats)
+
+        for _, ddl in index_ddl:
+            conn.execute(text(ddl))
+        conn.execute(text('ANALYZE'))
+        after = run(conn, limits, args.repeats)
+
+    for label in QUERIES:
+        (b_ms, b_plan), (a_ms, a_plan) = before[label], after[label]
+        print(f'{label}\n  without indexes: {b_ms:8.3f} ms  {b_plan}\n  with indexes:    {a_ms:8.3f} ms  {a_plan}\n')
+
+
+if __name__ == '__main__':
+    main()
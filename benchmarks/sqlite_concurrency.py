@@ -0,0 +1,143 @@
+"""Benchmark concurrent chat-turn writes against SQLite, default vs tuned engine.
+
+Each worker process (like a gunicorn worker) runs threads that repeat a chat
+turn: read the newest messages of a random session, insert a user and an AI
+message, commit. The same workload runs twice on fresh database files:
+once with SQLite's defaults (rollback journal, FULL sync, 5 s lock timeout)
+and once with the engine profile from config.py (SQLITE_PRAGMAS, pool
+sizing). Prints throughput, latency percentiles and "database is locked"
+failures for both.
+
+    python benchmarks/sqlite_concurrency.py [--processes 4] [--threads 4] [--turns 150]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, text  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from config import Config  # noqa: E402
+
+N_SESSIONS = 200
+
+TURN_READ = "SELECT id, sender, content FROM chat_message WHERE session_id = :sid ORDER BY id DESC LIMIT 12"
+TURN_WRITE = ("INSERT INTO chat_message (session_id, timestamp, sender, content) "
+              "VALUES (:sid, :ts, :sender, :content)")
+
+
+def create_database(path, tuned):
+    """Create the app schema in a fresh file, in the journal mode the run will use."""
+    from app import create_app, db
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        LLM_CACHE_ENABLED = False
+        SQLITE_PRAGMAS = Config.SQLITE_PRAGMAS if tuned else {}
+
+    app = create_app(BenchConfig)
+    with app.app_context(), db.engine.begin() as conn:
+        conn.execute(text("INSERT INTO user (id, username, email, password) VALUES (1, 'bench', 'bench@example.com', 'x')"))
+        conn.execute(text("INSERT INTO chat_session (id, user_id, session_name, created_date, has_career_plan, "
+                          "summarized_through_id) VALUES (:id, 1, 'Bench', :now, 0, 0)"),
+                     [{'id': i, 'now': datetime.utcnow()} for i in range(1, N_SESSIONS + 1)])
+    with app.app_context():
+        db.engine.dispose()
+
+
+def make_engine(path, tuned):
+    url = f'sqlite:///{path}'
+    if not tuned:
+        return create_engine(url)
+    from app.database import engine_options, _sqlite_pragma_listener
+    config = {k: getattr(Config, k) for k in dir(Config) if k.isupper()}
+    config['SQLALCHEMY_DATABASE_URI'] = url
+    engine = create_engine(url, **engine_options(config))
+    event.listen(engine, 'connect', _sqlite_pragma_listener(Config.SQLITE_PRAGMAS))
+    return engine
+
+
+def worker(path, tuned, threads, turns, seed):
+    """Run in a separate process; returns (turn latencies in seconds, locked failures, start, end)."""
+    engine = make_engine(path, tuned)
+    latencies, failures = [], [0]
+    lock = threading.Lock()
+
+    def run(thread_seed):
+        rng = random.Random(thread_seed)
+        for i in range(turns):
+            sid = rng.randint(1, N_SESSIONS)
+            started = time.perf_counter()
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(TURN_READ), {'sid': sid}).fetchall()
+                    now = datetime.utcnow()
+                    conn.execute(text(TURN_WRITE), [
+                        {'sid': sid, 'ts': now, 'sender': 'user', 'content': f'question {i} ' + 'lorem ' * 20},
+                        {'sid': sid, 'ts': now, 'sender': 'ai', 'content': f'answer {i} ' + 'ipsum ' * 60},
+                    ])
+            except OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                with lock:
+                    failures[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    pool = [threading.Thread(target=run, args=(seed * 1000 + t,)) for t in range(threads)]
+    started = time.time()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    finished = time.time()
+    engine.dispose()
+    return latencies, failures[0], started, finished
+
+
+def bench(tuned, processes, threads, turns):
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    create_database(path, tuned)
+    ctx = multiprocessing.get_context('spawn')
+    with ctx.Pool(processes) as pool:
+        results = pool.starmap(worker, [(path, tuned, threads, turns, p) for p in range(processes)])
+    # Wall time while workers were running, excluding process start-up
+    elapsed = max(r[3] for r in results) - min(r[2] for r in results)
+    latencies = sorted(l for r in results for l in r[0])
+    failures = sum(r[1] for r in results)
+    return {
+        'turns/s': len(latencies) / elapsed,
+        'p50 ms': statistics.median(latencies) * 1000 if latencies else 0.0,
+        'p95 ms': latencies[int(len(latencies) * 0.95) - 1] * 1000 if latencies else 0.0,
+        'locked': failures,
+        'ok': len(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--turns', type=int, default=150, help='chat turns per thread')
+    args = parser.parse_args()
+
+    total = args.processes * args.threads * args.turns
+    print(f'{args.processes} processes x {args.threads} threads x {args.turns} turns = {total} chat turns\n')
+    print(f"{'engine':<10}{'turns/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'locked':>9}")
+    for label, tuned in (('default', False), ('tuned', True)):
+        r = bench(tuned, args.processes, args.threads, args.turns)
+        print(f"{label:<10}{r['turns/s']:>10.1f}{r['p50 ms']:>10.2f}{r['p95 ms']:>10.2f}{r['locked']:>9}")
+
+
+if __name__ == '__main__':
+    main()
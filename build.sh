@@ -10,5 +10,5 @@ mkdir -p instance
 mkdir -p instance/uploads
 mkdir -p instance/user_data
 
-# Create database tables
-python -c "from app import create_app, db; app = create_app(); app.app_context().push(); db.create_all(); print('Database tables created successfully')"
\ No newline at end of file
+# Create or upgrade database tables
+flask --app main db-upgrade
\ No newline at end of file
@@ -7,10 +7,100 @@ DB_PATH = os.path.join(DB_DIR, 'site.db')
 # Ensure instance directory exists (for SQLite file)
 os.makedirs(DB_DIR, exist_ok=True)
 
+
+def _database_url():
+    url = os.environ.get('DATABASE_URL') or f"sqlite:///{DB_PATH}"
+    # Hosting providers hand out postgres:// URLs, which SQLAlchemy no longer accepts
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'you-will-never-guess'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or f"sqlite:///{DB_PATH}"
+    SQLALCHEMY_DATABASE_URI = _database_url()
+    # Schema changes are applied by `flask db-upgrade`; SQLite databases are also
+    # upgraded on startup so local setups need no extra step
+    DB_AUTO_MIGRATE = os.environ.get(
+        'DB_AUTO_MIGRATE', '1' if SQLALCHEMY_DATABASE_URI.startswith('sqlite') else '0'
+    ).lower() in ('1', 'true', 'yes')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Database engine profile (applied by app/database.py). The SQLite pragmas run on
+    # every new connection: WAL so readers never wait for the writer, NORMAL sync
+    # (safe with WAL), a busy timeout instead of "database is locked" errors, and
+    # larger page cache / memory-mapped I/O
+    SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 10000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': -int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024)),  # negative means KiB
+        'temp_store': 'MEMORY',
+    }
+    # Connection pool per worker process; SQLite may overflow freely, other backends
+    # (PostgreSQL) are capped, and connections are checked before use
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1').lower() not in ('0', 'false', 'no')
+    # Background jobs (resume parsing) run on an in-process thread pool
+    JOB_QUEUE_WORKERS = int(os.environ.get('JOB_QUEUE_WORKERS', 2))
+    JOB_QUEUE_EAGER = os.environ.get('JOB_QUEUE_EAGER', '').lower() in ('1', 'true', 'yes')
+    # Jobs still queued or running after this many seconds are reported as failed
+    JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 300))
+    # Gemini access; AI_BACKEND=fake serves canned replies without network access
+    GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
+    GEMINI_MODEL = os.environ.get('GEMINI_MODEL', 'gemini-1.5-flash')
+    AI_BACKEND = os.environ.get('AI_BACKEND', 'gemini')
+    AI_MAX_CONCURRENCY = int(os.environ.get('AI_MAX_CONCURRENCY', 8))
+    AI_RATE_PER_MINUTE = int(os.environ.get('AI_RATE_PER_MINUTE', 60))
+    AI_MAX_RETRIES = int(os.environ.get('AI_MAX_RETRIES', 3))
+    # Chat memory: verbatim turns kept per prompt, token budget for the history
+    # block, and how many older messages accumulate before the summary is refreshed
+    CHAT_MEMORY_TURNS = int(os.environ.get('CHAT_MEMORY_TURNS', 6))
+    CHAT_HISTORY_TOKEN_BUDGET = int(os.environ.get('CHAT_HISTORY_TOKEN_BUDGET', 1500))
+    CHAT_SUMMARY_BATCH = int(os.environ.get('CHAT_SUMMARY_BATCH', 4))
+    # Most messages one summary refresh folds in (a long backlog is caught up over several refreshes)
+    CHAT_SUMMARY_MAX_MESSAGES = int(os.environ.get('CHAT_SUMMARY_MAX_MESSAGES', 16))
+    # Chat history pagination (messages per page for the chat view and load_messages API)
+    CHAT_PAGE_SIZE = int(os.environ.get('CHAT_PAGE_SIZE', 50))
+    CHAT_PAGE_SIZE_MAX = 200
+    # Plans longer than PLAN_CHUNK_DAYS are generated as concurrent chunks of that size
+    PLAN_CHUNK_DAYS = int(os.environ.get('PLAN_CHUNK_DAYS', 7))
+    PLAN_MAX_PARALLEL_CHUNKS = int(os.environ.get('PLAN_MAX_PARALLEL_CHUNKS', 9))
+    # Tries per chunk; a failed or unusable chunk is regenerated on its own
+    PLAN_CHUNK_ATTEMPTS = int(os.environ.get('PLAN_CHUNK_ATTEMPTS', 2))
+    # Draft a plan in the background as soon as the AI proposes one; a consent
+    # turn that arrives while it is still running leaves the saving to that job
+    PLAN_PREFETCH_ENABLED = os.environ.get('PLAN_PREFETCH_ENABLED', '1').lower() not in ('0', 'false', 'no')
+    # Shared on-disk cache of model responses keyed on (model, config, prompt)
+    LLM_CACHE_ENABLED = os.environ.get('LLM_CACHE_ENABLED', '1').lower() not in ('0', 'false', 'no')
+    LLM_CACHE_PATH = os.environ.get('LLM_CACHE_PATH') or os.path.join(DB_DIR, 'llm_cache.db')
+    LLM_CACHE_TTL = int(os.environ.get('LLM_CACHE_TTL', 7 * 24 * 3600))
+    LLM_CACHE_MAX_ENTRIES = int(os.environ.get('LLM_CACHE_MAX_ENTRIES', 5000))
+    # Resume tailoring runs one request per resume section, up to this many at once
+    TAILOR_MAX_PARALLEL_SECTIONS = int(os.environ.get('TAILOR_MAX_PARALLEL_SECTIONS', 6))
+    # Only the bullets that best match the job (local BM25 ranking) are sent for rewriting
+    TAILOR_TOP_K_BULLETS = int(os.environ.get('TAILOR_TOP_K_BULLETS', 8))
+    # PDF text extraction (see app/pdf_text.py)
+    PDF_BACKEND = os.environ.get('PDF_BACKEND', 'pypdf2')  # 'pypdf2' (faster) or 'pdfminer' (keeps layout)
+    PDF_EXTRACT_WORKERS = int(os.environ.get('PDF_EXTRACT_WORKERS', 2))
+    PDF_EXTRACT_TIMEOUT = float(os.environ.get('PDF_EXTRACT_TIMEOUT', 20))
+    PDF_MAX_PAGES = int(os.environ.get('PDF_MAX_PAGES', 30))
+    PDF_PARALLEL_MIN_PAGES = 4
+    # SQL statements allowed per request on hot endpoints; going over raises in
+    # testing or with QUERY_BUDGET_STRICT, and is logged otherwise
+    QUERY_BUDGETS = {
+        'career_advisor.api_chat': 12,
+        'career_advisor.api_chat_stream': 12,
+    }
+    QUERY_BUDGET_STRICT = os.environ.get('QUERY_BUDGET_STRICT', '').lower() in ('1', 'true', 'yes')
+    # Rendered markdown kept in memory per worker (entries)
+    MARKDOWN_CACHE_SIZE = int(os.environ.get('MARKDOWN_CACHE_SIZE', 1024))
+    # Prompt profile data cached per worker (seconds, entries); saving a profile drops its entry
+    PROFILE_CACHE_TTL = int(os.environ.get('PROFILE_CACHE_TTL', 30))
+    PROFILE_CACHE_SIZE = int(os.environ.get('PROFILE_CACHE_SIZE', 1024))
     RESUME_UPLOAD_FOLDER = os.path.join(instance_path := os.path.join(BASE_DIR, 'instance'), 'uploads')
     
     # Ensure upload directories exist
@@ -5,11 +5,25 @@ bind = f"0.0.0.0:{os.environ.get('PORT', 10000)}"
 backlog = 2048
 
 # Worker processes
-workers = 4
-worker_class = "sync"
+# GUNICORN_PROFILE selects the serving mode:
+#   "sync" - one request per worker process (default)
+#   "io"   - threaded workers for the AI-bound endpoints; each process holds up to
+#            GUNICORN_THREADS requests waiting on Gemini (chat, plan generation,
+#            tailoring, auto-name), each on its own thread. Waiting threads hold no
+#            DB connection; model calls are still capped per process by
+#            AI_MAX_CONCURRENCY / AI_RATE_PER_MINUTE (see README)
+profile = os.environ.get('GUNICORN_PROFILE', 'sync').lower()
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
 worker_connections = 1000
-timeout = 30
 keepalive = 2
+if profile == 'io':
+    worker_class = "gthread"
+    threads = int(os.environ.get('GUNICORN_THREADS', 100))
+    # Threaded workers heartbeat independently of requests, so slow LLM calls are not killed
+    timeout = 120
+else:
+    worker_class = "sync"
+    timeout = 30
 
 # Restart workers after this many requests, to help prevent memory leaks
 max_requests = 1000
@@ -25,6 +39,14 @@ proc_name = 'career_advisor_app'
 
 # Server mechanics
 preload_app = True
+
+
+def post_fork(server, worker):
+    # The app (and its connection pool) was created in the master before forking;
+    # give each worker its own connections
+    from app.database import dispose_engines
+    dispose_engines(server.app.wsgi())
+
 daemon = False
 pidfile = '/tmp/gunicorn.pid'
 user = None
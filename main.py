@@ -1,11 +1,26 @@
 from app import create_app, db, login_manager
 from app.models import User, Profile, CareerPlan, DailyTask
 
-app = create_app()
 
-@app.shell_context_processor
-def make_shell_context():
-    return {'db': db, 'User': User, 'Profile': Profile, 'CareerPlan': CareerPlan, 'DailyTask': DailyTask}
+def _create_main_app():
+    app = create_app()
+
+    @app.shell_context_processor
+    def make_shell_context():
+        return {'db': db, 'User': User, 'Profile': Profile, 'CareerPlan': CareerPlan, 'DailyTask': DailyTask}
+
+    return app
+
+
+def __getattr__(name):
+    # `app` is created on first use (gunicorn main:app, flask --app main) rather than at import:
+    # PDF extraction workers are spawned processes that re-import this script, and must not
+    # run create_app (migrations, stale-job cleanup, DB and cache setup) each time
+    if name == 'app':
+        globals()['app'] = _create_main_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    _create_main_app().run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+from app import create_app, db
+from app.models import BackgroundJob, Profile, User
+from config import Config
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Factory for test apps, on a SQLite file in tmp_path unless `url` is given.
+
+    Creating one migrates its database unless `auto_migrate` is False.
+    """
+    apps = []
+
+    def make(database='test.db', url=None, auto_migrate=True):
+        class TestConfig(Config):
+            TESTING = True
+            AI_BACKEND = 'fake'
+            AI_RATE_PER_MINUTE = 0  # no rate limit for the offline backend
+            SQLALCHEMY_DATABASE_URI = url or f"sqlite:///{tmp_path / database}"
+            DB_AUTO_MIGRATE = auto_migrate
+            LLM_CACHE_ENABLED = False
+            LLM_CACHE_PATH = str(tmp_path / 'llm_cache.db')
+            JOB_QUEUE_EAGER = False
+            WTF_CSRF_ENABLED = False
+
+        apps.append(create_app(TestConfig))
+        return apps[-1]
+
+    yield make
+    for app in apps:
+        wait_for_jobs(app)
+        with app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+
+
+@pytest.fixture
+def app(make_app):
+    app = make_app()
+    with app.app_context():
+        db.session.add(User(username='tester', email='tester@example.com', password='x'))
+        db.session.flush()
+        db.session.add(Profile(name='Tess', place='Pune', user_type='student', user_id=1))
+        db.session.commit()
+    return app
+
+
+@pytest.fixture
+def client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = '1'
+        session['_fresh'] = True
+    return client
+
+
+def wait_for_jobs(app, timeout=10):
+    """Block until no background job is queued or running."""
+    deadline = time.monotonic() + timeout
+    with app.app_context():
+        while time.monotonic() < deadline:
+            pending = BackgroundJob.query.filter(BackgroundJob.status.in_(('queued', 'running'))).count()
+            db.session.remove()
+            if not pending:
+                return
+            time.sleep(0.05)
+    raise AssertionError('background jobs did not finish')
@@ -0,0 +1,56 @@
+import threading
+
+from app import ai_client, db
+from app.career_advisor.memory import SUMMARY_LINE_CHARS, schedule_summary_update, summarize_session
+from app.models import BackgroundJob, ChatMessage, ChatSession
+from tests.conftest import wait_for_jobs
+
+
+def _legacy_session(count):
+    """A long session from before summaries existed (summarized_through_id is 0)."""
+    chat_session = ChatSession(user_id=1)
+    db.session.add(chat_session)
+    db.session.flush()
+    db.session.add_all(ChatMessage(session_id=chat_session.id, sender='user' if i % 2 == 0 else 'ai',
+                                   content=f'message {i} ' + 'x' * 200)
+                       for i in range(count))
+    db.session.commit()
+    return chat_session
+
+
+def _message_ids(session_id):
+    return [i for (i,) in db.session.query(ChatMessage.id).filter_by(session_id=session_id).order_by(ChatMessage.id)]
+
+
+def test_summary_refresh_sends_a_bounded_batch(app):
+    prompts = []
+    ai_client.use_fake(lambda prompt, config: prompts.append(prompt) or 'The user is exploring data roles.')
+    with app.app_context():
+        chat_session = _legacy_session(2000)
+        session_id = chat_session.id
+        ids = _message_ids(session_id)
+        limit = app.config['CHAT_SUMMARY_MAX_MESSAGES']
+
+        summarize_session(session_id)
+        summarize_session(session_id)
+
+        assert len(prompts) == 2
+        for prompt in prompts:
+            assert prompt.count('\nUser: ') + prompt.count('\nAI: ') == limit
+            assert len(prompt) < limit * (SUMMARY_LINE_CHARS + 10) + 1000
+        # Each run continues where the previous one stopped
+        assert 'message 0 ' in prompts[0] and f'message {limit} ' in prompts[1]
+        assert db.session.get(ChatSession, session_id).summarized_through_id == ids[2 * limit - 1]
+
+
+def test_only_one_summary_job_per_session(app):
+    release = threading.Event()
+    ai_client.use_fake(lambda prompt, config: release.wait(5) and 'Summary.')
+    with app.app_context():
+        chat_session = _legacy_session(60)
+        for _ in range(3):
+            schedule_summary_update(chat_session, _message_ids(chat_session.id))
+        jobs = BackgroundJob.query.filter_by(kind='summarize_chat').count()
+    release.set()
+    wait_for_jobs(app)
+    assert jobs == 1
@@ -0,0 +1,39 @@
+import pytest
+
+from app.ai.jsonstream import JsonStreamParser, parse_json_text
+
+
+@pytest.mark.parametrize('text, expect, parsed', [
+    ('[{"day": 1}]', None, [{'day': 1}]),
+    ('Here is the plan [as requested]:\n[{"day": 1}]', list, [{'day': 1}]),
+    ('Result [see below:\n[{"day": 1}]', None, [{'day': 1}]),
+    ('Notes {unclosed and [also:\n{"goal": "Data Scientist", "days": 7}', dict, {'goal': 'Data Scientist', 'days': 7}),
+    ('(see {below}) {"edits": []}', dict, {'edits': []}),
+    ('[1, 2] then {"a": 1}', dict, {'a': 1}),
+    ('[]', list, []),
+    ('no json here', None, None),
+])
+def test_parse_json_text(text, expect, parsed):
+    assert parse_json_text(text, expect=expect) == parsed
+
+
+def test_truncated_reply_keeps_completed_members():
+    text = 'Plan:\n[{"day": 1, "task": "a"}, {"day": 2, "task": "b"}, {"day": 3, "ta'
+    assert parse_json_text(text) == [{'day': 1, 'task': 'a'}, {'day': 2, 'task': 'b'}]
+    # Without partial results a cut-off reply is not mistaken for one of its inner objects
+    assert parse_json_text(text, allow_partial=False) is None
+    assert parse_json_text('{"summary": "x", "edits": [{"original": "a"}, {"orig', allow_partial=False,
+                           expect=dict) is None
+
+
+def test_truncated_before_first_member():
+    assert parse_json_text('{"edits": [{"orig', expect=dict) == {}
+
+
+def test_feed_in_chunks_matches_single_pass():
+    text = '[{"day": 1}, {"day": 2}, [3, 4], "five"]'
+    parser = JsonStreamParser()
+    completed = []
+    for i in range(0, len(text), 3):
+        completed.extend(value for _, value in parser.feed(text[i:i + 3]))
+    assert parser.complete and completed == parser.result == parse_json_text(text)
@@ -0,0 +1,137 @@
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from flask import request
+
+from app import ai_client, db, query_counter
+from app.models import BackgroundJob, CareerPlan, ChatSession
+from tests.conftest import wait_for_jobs
+
+PROPOSAL = 'Here is a 3-day roadmap: Python, statistics, ML. Shall I schedule this plan in your Tracker?'
+
+
+def responder(prompt, config):
+    if 'infer the user' in prompt:
+        return json.dumps({'goal': 'Data Scientist', 'days': 3})
+    if 'array' in prompt and 'day' in prompt:
+        return json.dumps([{'day': day, 'task': f'Task {day}', 'resources': []} for day in range(1, 4)])
+    if 'running summary' in prompt:
+        return 'The user is exploring data science.'
+    last = prompt.split('Current user message:')[-1].lower()
+    if 'data science' in last:
+        return PROPOSAL
+    return 'Sounds good. Tell me more about what you enjoy.'
+
+
+@pytest.fixture
+def statements(app):
+    """Statements each request ran, recorded just before the budget check."""
+    counts = []
+
+    @app.teardown_request
+    def record(exc=None):
+        counts.append((request.endpoint, query_counter.count()))
+
+    ai_client.use_fake(responder)
+    return counts
+
+
+def _send(client, message, session_id=None, stream=False):
+    body = {'message': message, 'session_id': session_id}
+    if not stream:
+        return client.post('/career/api/chat', json=body).get_json()
+    events = {}
+    for chunk in client.post('/career/api/chat/stream', json=body).get_data(as_text=True).split('\n\n'):
+        lines = chunk.split('\n')
+        if lines[0].startswith('event: '):
+            events[lines[0][len('event: '):]] = json.loads(lines[1][len('data: '):])
+    return events['done']
+
+
+@pytest.mark.parametrize('stream', [False, True])
+def test_chat_turns_stay_within_budget(app, client, statements, stream):
+    endpoint = 'career_advisor.api_chat_stream' if stream else 'career_advisor.api_chat'
+    budget = app.config['QUERY_BUDGETS'][endpoint]
+    assert budget == 12
+
+    session_id = _send(client, 'hi')['session_id']
+    for i in range(8):
+        _send(client, f'message {i}', session_id)
+    wait_for_jobs(app)
+
+    turns = [('just chatting', False), ('I want to move into data science', False), ('yes please', True)]
+    for message, plan_expected in turns:
+        statements.clear()
+        reply = _send(client, message, session_id, stream=stream)
+        assert reply['plan_generated'] is plan_expected
+        assert [endpoint] == [name for name, _ in statements]
+        assert statements[0][1] <= budget, f'{message!r} ran {statements[0][1]} statements'
+        wait_for_jobs(app)  # the proposal's plan draft is ready before the consent turn
+
+    with app.app_context():
+        assert CareerPlan.query.filter_by(user_id=1, is_active=True).count() == 1
+        assert db.session.get(ChatSession, session_id).plan_draft_status is None
+
+
+@pytest.fixture
+def held_draft(statements):
+    """Holds the first plan draft in its model call until `release` is set; counts goal extractions."""
+    release, extractions = threading.Event(), []
+
+    def held(prompt, config):
+        if 'infer the user' in prompt:
+            extractions.append(prompt)
+            if len(extractions) == 1:
+                release.wait(10)
+        return responder(prompt, config)
+
+    ai_client.use_fake(held)
+    return release, extractions
+
+
+def _accept_held_draft(client, held_draft):
+    session_id = _send(client, 'I want to move into data science')['session_id']
+    first = _send(client, 'yes please', session_id)
+    assert first['plan_generated'] is False and 'being prepared' in first['response']
+    return session_id
+
+
+def test_repeated_consent_waits_for_the_running_draft(app, client, statements, held_draft):
+    release, extractions = held_draft
+    session_id = _accept_held_draft(client, held_draft)
+
+    statements.clear()
+    again = _send(client, 'yes, go ahead', session_id)
+    assert again['plan_generated'] is False and 'being prepared' in again['response']
+    assert statements[0][1] <= app.config['QUERY_BUDGETS']['career_advisor.api_chat']
+    release.set()
+    wait_for_jobs(app)
+
+    assert len(extractions) == 1
+    with app.app_context():
+        assert CareerPlan.query.filter_by(user_id=1).count() == 1
+        assert db.session.get(ChatSession, session_id).plan_draft_status is None
+
+
+def test_consent_after_the_draft_job_died_drafts_again(app, client, statements, held_draft):
+    release, extractions = held_draft
+    session_id = _accept_held_draft(client, held_draft)
+    with app.app_context():
+        # As if the worker running it had stopped long ago
+        job = BackgroundJob.query.filter_by(kind='plan_draft').one()
+        job.created_date = datetime.utcnow() - timedelta(seconds=app.config['JOB_TIMEOUT'] + 60)
+        db.session.commit()
+
+    statements.clear()
+    again = _send(client, 'yes, go ahead', session_id)
+    assert again['plan_generated'] is True
+    assert statements[0][1] <= app.config['QUERY_BUDGETS']['career_advisor.api_chat']
+    release.set()
+    wait_for_jobs(app)
+
+    assert len(extractions) == 2
+    with app.app_context():
+        assert CareerPlan.query.filter_by(user_id=1).count() == 1
+        assert db.session.get(ChatSession, session_id).plan_draft_status is None
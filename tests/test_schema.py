@@ -0,0 +1,158 @@
+import os
+import threading
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app import db
+from app.schema import MIGRATIONS, applied_migrations, migrate
+
+# Tables as the first release created them, before any migration existed.
+# {pk} and the literals are written so the same script runs on SQLite and PostgreSQL.
+ORIGINAL_SCHEMA = """
+CREATE TABLE "user" (
+    id {pk}, username VARCHAR(20) NOT NULL UNIQUE, email VARCHAR(120) NOT NULL UNIQUE,
+    password VARCHAR(60) NOT NULL);
+CREATE TABLE profile (
+    id {pk}, name VARCHAR(100) NOT NULL, place VARCHAR(100) NOT NULL,
+    user_type VARCHAR(20) NOT NULL, organization_name VARCHAR(100), details TEXT, resume_path VARCHAR(200),
+    interests TEXT, hobbies TEXT, additional_info TEXT, user_id INTEGER NOT NULL UNIQUE REFERENCES "user" (id));
+CREATE TABLE career_plan (
+    id {pk}, user_id INTEGER NOT NULL REFERENCES "user" (id), career_goal VARCHAR(200) NOT NULL,
+    created_date TIMESTAMP NOT NULL, last_updated TIMESTAMP NOT NULL, is_active BOOLEAN NOT NULL);
+CREATE TABLE daily_task (
+    id {pk}, career_plan_id INTEGER NOT NULL REFERENCES career_plan (id),
+    day_number INTEGER NOT NULL, task_description TEXT NOT NULL, resources TEXT,
+    is_completed BOOLEAN NOT NULL, completed_date TIMESTAMP);
+CREATE TABLE chat_session (
+    id {pk}, user_id INTEGER NOT NULL REFERENCES "user" (id), session_name VARCHAR(100),
+    created_date TIMESTAMP NOT NULL, has_career_plan BOOLEAN NOT NULL);
+CREATE TABLE chat_message (
+    id {pk}, session_id INTEGER NOT NULL REFERENCES chat_session (id), timestamp TIMESTAMP,
+    sender VARCHAR(50) NOT NULL, content TEXT NOT NULL);
+
+INSERT INTO "user" (id, username, email, password) VALUES (7, 'old', 'old@example.com', 'x');
+INSERT INTO career_plan VALUES (1, 7, 'Analyst', '2024-01-01 00:00:00', '2024-01-01 00:00:00', TRUE);
+INSERT INTO career_plan VALUES (2, 7, 'Data Scientist', '2024-02-01 00:00:00', '2024-02-01 00:00:00', TRUE);
+INSERT INTO daily_task VALUES (1, 2, 1, 'Python', '["https://docs.python.org"]', TRUE, '2024-02-02 09:00:00');
+INSERT INTO daily_task VALUES (2, 2, 2, 'Statistics', '[]', TRUE, '2024-02-03 09:00:00');
+INSERT INTO daily_task VALUES (3, 2, 3, 'Machine learning', '', FALSE, NULL);
+INSERT INTO chat_session VALUES (1, 7, 'Old chat', '2024-02-01 00:00:00', TRUE);
+INSERT INTO chat_message VALUES (1, 1, '2024-02-01 00:00:00', 'user', 'hello');
+"""
+
+PRIMARY_KEYS = {'sqlite': 'INTEGER PRIMARY KEY', 'postgresql': 'SERIAL PRIMARY KEY'}
+
+
+@pytest.fixture(params=['sqlite', 'postgresql'])
+def database_url(request, tmp_path):
+    """A database to migrate: a SQLite file, or the throwaway PostgreSQL database in TEST_DATABASE_URL.
+
+    The PostgreSQL database is emptied first, so never point it at real data.
+    """
+    if request.param == 'sqlite':
+        return f"sqlite:///{tmp_path / 'schema.db'}"
+    url = os.environ.get('TEST_DATABASE_URL')
+    if not url:
+        pytest.skip('TEST_DATABASE_URL is not set')
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text('DROP SCHEMA public CASCADE'))
+        conn.execute(text('CREATE SCHEMA public'))
+    engine.dispose()
+    return url
+
+
+def _create_original_schema(url):
+    engine = create_engine(url)
+    script = ORIGINAL_SCHEMA.replace('{pk}', PRIMARY_KEYS[engine.dialect.name])
+    with engine.begin() as conn:
+        for statement in filter(str.strip, script.split(';')):
+            conn.execute(text(statement))
+    engine.dispose()
+
+
+def _schema(engine):
+    inspector = inspect(engine)
+    return {table: ({column['name'] for column in inspector.get_columns(table)},
+                    {index['name'] for index in inspector.get_indexes(table)})
+            for table in inspector.get_table_names()}
+
+
+def _assert_matches_models(engine):
+    schema = _schema(engine)
+    for table in db.metadata.sorted_tables:
+        columns, indexes = schema[table.name]
+        assert {column.name for column in table.columns} <= columns, table.name
+        assert {index.name for index in table.indexes} <= indexes, table.name
+    if engine.dialect.name == 'postgresql':
+        inspector = inspect(engine)
+        for table in db.metadata.sorted_tables:
+            types = {column['name']: column['type'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                wanted = type(column.type.dialect_impl(engine.dialect))
+                if wanted.__name__ == 'JSONB':
+                    assert type(types[column.name]).__name__ == 'JSONB', f'{table.name}.{column.name}'
+        partial = {index['name']: index for index in inspector.get_indexes('career_plan')}['uq_career_plan_one_active']
+        assert partial['unique'] and 'is_active' in partial['dialect_options']['postgresql_where']
+
+
+def test_fresh_database_gets_every_migration(make_app, database_url):
+    app = make_app(url=database_url)
+    with app.app_context():
+        assert applied_migrations(db) == {version for version, _, _ in MIGRATIONS}
+        _assert_matches_models(db.engine)
+
+
+def test_migrate_again_is_a_no_op(make_app, database_url):
+    app = make_app(url=database_url)
+    with app.app_context():
+        before = _schema(db.engine)
+        assert migrate(db) == []
+        assert _schema(db.engine) == before
+
+
+def test_concurrent_migrate_applies_each_migration_once(make_app, database_url):
+    if not database_url.startswith('postgresql'):
+        pytest.skip('concurrent runs are serialized with an advisory lock on PostgreSQL only')
+    app = make_app(url=database_url, auto_migrate=False)
+    results, errors = [], []
+
+    def run():
+        with app.app_context():
+            try:
+                results.append(migrate(db))
+            except Exception as e:
+                errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert sorted(version for applied in results for version in applied) == sorted(v for v, _, _ in MIGRATIONS)
+    with app.app_context():
+        _assert_matches_models(db.engine)
+
+
+def test_upgrades_original_schema(make_app, database_url):
+    _create_original_schema(database_url)
+
+    app = make_app(url=database_url)
+    with app.app_context():
+        assert applied_migrations(db) == {version for version, _, _ in MIGRATIONS}
+        _assert_matches_models(db.engine)
+        with db.engine.connect() as conn:
+            plans = conn.execute(text(
+                'SELECT id, is_active, total_tasks, completed_count, next_due_day, streak FROM career_plan ORDER BY id'
+            )).all()
+            summarized = conn.execute(text('SELECT summarized_through_id FROM chat_session')).scalar()
+            resources = conn.execute(text('SELECT resources FROM daily_task ORDER BY id')).scalars().all()
+        # Only the newest plan stays active, and its progress comes from its tasks
+        assert [tuple(plan) for plan in plans] == [(1, False, 0, 0, None, 0), (2, True, 3, 2, 3, 2)]
+        assert summarized == 0
+        if db.engine.dialect.name == 'postgresql':
+            # TEXT became JSONB; an empty string became NULL
+            assert resources == [['https://docs.python.org'], [], None]
+        assert migrate(db) == []